@@ -1,6 +1,7 @@
 from django.db.models.signals import post_save
 from django.dispatch import receiver
 from appointments.models import Appointment
+from notifications.outbox import enqueue_notification
 from notifications.tasks import send_appointment_notifications
 
 
@@ -8,11 +9,5 @@ from notifications.tasks import send_appointment_notifications
 def appointment_post_save(sender, instance: Appointment, created: bool, **kwargs):
     # Notify on creation or when status changes / doctor assigned
     if created or kwargs.get('update_fields'):
-        try:
-            send_appointment_notifications.delay(instance.pk)
-        except Exception:
-            # Fallback: call synchronously if broker unavailable
-            try:
-                send_appointment_notifications(instance.pk)
-            except Exception:
-                pass
\ No newline at end of file
+        # Written in the same transaction; the outbox drainer delivers it
+        enqueue_notification(send_appointment_notifications, instance.pk)
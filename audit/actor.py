@@ -0,0 +1,53 @@
+"""Carry the acting user from the code that queues a Celery task to the task itself.
+
+The user id travels in the ``audit_actor`` message header: it is added
+automatically when a task is queued inside a request (or an ``acting_as`` block),
+or explicitly with ``task.apply_async(..., headers=actor_headers(user))``. The
+worker then runs the task as that user, so its audit rows are attributed correctly.
+"""
+from celery.signals import before_task_publish, task_postrun, task_prerun
+from django.contrib.auth import get_user_model
+from django.utils.functional import SimpleLazyObject
+
+from .middleware import acting_as, get_current_user
+
+
+ACTOR_HEADER = 'audit_actor'
+
+
+def actor_headers(user) -> dict:
+    return {ACTOR_HEADER: user.pk} if getattr(user, 'is_authenticated', False) else {}
+
+
+def _attach_actor(headers=None, **kwargs):
+    if headers is None or headers.get(ACTOR_HEADER):
+        return
+    headers.update(actor_headers(get_current_user()))
+
+
+def _load_actor(actor_id):
+    # Only queried if the task actually writes an audit row
+    return SimpleLazyObject(lambda: get_user_model()._default_manager.filter(pk=actor_id).first())
+
+
+def _enter_actor(task=None, **kwargs):
+    request = getattr(task, 'request', None)
+    actor_id = getattr(request, ACTOR_HEADER, None)
+    if actor_id is None:
+        # Eager tasks simply inherit the caller's context
+        return
+    context = acting_as(_load_actor(actor_id))
+    context.__enter__()
+    request._audit_actor_context = context
+
+
+def _exit_actor(task=None, **kwargs):
+    context = getattr(getattr(task, 'request', None), '_audit_actor_context', None)
+    if context is not None:
+        context.__exit__(None, None, None)
+        task.request._audit_actor_context = None
+
+
+before_task_publish.connect(_attach_actor, weak=False, dispatch_uid='audit_actor_publish')
+task_prerun.connect(_enter_actor, weak=False, dispatch_uid='audit_actor_prerun')
+task_postrun.connect(_exit_actor, weak=False, dispatch_uid='audit_actor_postrun')
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import ActivityLog
+from .models import ActivityDailyRollup, ActivityLog
 
 
 @admin.register(ActivityLog)
@@ -15,12 +15,15 @@ class ActivityLogAdmin(admin.ModelAdmin):
         'mother_name', 'mother_member_id', 'baby_name', 'baby_hospital_id', 'vaccine_name'
     )
     ordering = ('-action_datetime',)
+    # Drill down by date (prunes partitions on PostgreSQL) and skip the unfiltered COUNT(*)
+    date_hierarchy = 'action_date'
+    show_full_result_count = False
     readonly_fields = (
         'action_type', 'module', 'model', 'object_id', 'action_description',
         'user', 'staff_name', 'staff_id', 'hospital_clinic_id',
         'action_datetime', 'action_date', 'action_time',
         'mother_name', 'mother_member_id', 'baby_name', 'baby_hospital_id',
-        'vaccine_name', 'scheduled_date', 'completed_date',
+        'vaccine_name', 'scheduled_date', 'completed_date', 'changes',
     )
 
     def has_view_permission(self, request, obj=None):
@@ -28,4 +31,22 @@ class ActivityLogAdmin(admin.ModelAdmin):
         return bool(request.user and (request.user.is_superuser or request.user.has_perm('audit.view_activitylog')))
 
     def has_module_permission(self, request):
-        return self.has_view_permission(request)
\ No newline at end of file
+        return self.has_view_permission(request)
+
+
+@admin.register(ActivityDailyRollup)
+class ActivityDailyRollupAdmin(admin.ModelAdmin):
+    list_display = ('action_date', 'hospital_clinic_id', 'staff_id', 'staff_name', 'module', 'model', 'action_type', 'count')
+    list_filter = ('action_type', 'module', 'model')
+    search_fields = ('hospital_clinic_id', 'staff_id', 'staff_name')
+    date_hierarchy = 'action_date'
+
+    # Maintained by audit.rollups only
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -7,4 +7,6 @@ class AuditConfig(AppConfig):
 
     def ready(self):
         # Import signal handlers and register targets dynamically
-        from . import signals  # noqa: F401
\ No newline at end of file
+        from . import signals  # noqa: F401
+        # Propagate the acting user to Celery tasks
+        from . import actor  # noqa: F401
\ No newline at end of file
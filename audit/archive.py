@@ -0,0 +1,213 @@
+"""Monthly archival of old ActivityLog rows to gzip'd JSON Lines files, and restore.
+
+Each archived month becomes ``activitylog-YYYY-MM.jsonl.gz`` in ``AUDIT_ARCHIVE_DIR``
+(one row per line, all concrete fields including ``id``). ``manifest.json`` in the
+same directory lists every archive with its row count, id range and sha256.
+Rows are only removed from the database once the file has been written and
+recorded in the manifest. Restored months are left alone by the retention task
+for ``AUDIT_RESTORE_HOLD_DAYS``, and months with events not yet counted in the
+daily rollups (``audit.rollups``) are not archived.
+"""
+import gzip
+import hashlib
+import json
+import os
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import partitioning, rollups
+from .models import ActivityLog
+
+
+def archive_dir() -> Path:
+    return Path(getattr(settings, 'AUDIT_ARCHIVE_DIR', Path(settings.BASE_DIR) / 'archive' / 'audit'))
+
+
+def archive_path(month: date) -> Path:
+    return archive_dir() / f"activitylog-{month:%Y-%m}.jsonl.gz"
+
+
+def read_manifest() -> dict:
+    path = archive_dir() / 'manifest.json'
+    if not path.exists():
+        return {'archives': {}}
+    with open(path, encoding='utf-8') as fh:
+        return json.load(fh)
+
+
+def _write_manifest(manifest: dict):
+    path = archive_dir() / 'manifest.json'
+    tmp = path.with_suffix('.json.tmp')
+    with open(tmp, 'w', encoding='utf-8') as fh:
+        json.dump(manifest, fh, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def retention_cutoff(today: date | None = None) -> date:
+    """First day that must stay in the database: the start of the month containing today - AUDIT_RETENTION_DAYS."""
+    days = int(getattr(settings, 'AUDIT_RETENTION_DAYS', 365))
+    return partitioning.month_start((today or date.today()) - timedelta(days=days))
+
+
+def archivable_months(before: date | None = None) -> list[date]:
+    """Months (first day) that have rows and end before ``before`` (default: the retention cutoff).
+
+    Months holding events past the rollup watermark wait until they have been counted.
+    """
+    before = partitioning.month_start(before or retention_cutoff())
+    qs = ActivityLog.objects.filter(action_date__lt=before)
+    pending = set(qs.filter(rollups.uncounted()).dates('action_date', 'month'))
+    return [month for month in qs.dates('action_date', 'month') if month not in pending]
+
+
+def _month_queryset(month: date):
+    start = partitioning.month_start(month)
+    return ActivityLog.objects.filter(action_date__gte=start, action_date__lt=partitioning.add_months(start, 1))
+
+
+def archive_month(month: date, delete: bool = True, chunk_size: int = 2000) -> dict:
+    """Write one month of ActivityLog rows to its archive file, then (optionally) remove them.
+
+    Returns the manifest entry. Rows already held by one of the month's archive
+    files (e.g. brought back by ``restore_month``) are not written again; only rows
+    added since go into a new part file. When there are none, nothing is written
+    and the month's latest existing entry is returned.
+    """
+    month = partitioning.month_start(month)
+    qs = _month_queryset(month)
+    if not qs.exists():
+        return {}
+    fields = [f.attname for f in ActivityLog._meta.concrete_fields]
+    directory = archive_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    manifest = read_manifest()
+    existing = _archived_parts(month, manifest)
+    covered = Q()
+    for entry in existing:
+        covered |= Q(id__gte=entry['min_id'], id__lte=entry['max_id'])
+    pending = qs.exclude(covered) if existing else qs
+    if not pending.exists():
+        if delete:
+            _delete_archived(month, qs.filter(covered), chunk_size)
+        return existing[-1]
+    path = archive_path(month)
+    part = 1
+    while path.exists():
+        part += 1
+        path = directory / f"activitylog-{month:%Y-%m}.part{part}.jsonl.gz"
+
+    tmp = path.with_name(path.name + '.tmp')
+    rows = 0
+    min_id = max_id = None
+    digest = hashlib.sha256()
+    with gzip.open(tmp, 'wt', encoding='utf-8') as fh:
+        for row in pending.order_by('id').values(*fields).iterator(chunk_size=chunk_size):
+            line = json.dumps(row, cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+            fh.write(line)
+            digest.update(line.encode('utf-8'))
+            rows += 1
+            min_id = row['id'] if min_id is None else min_id
+            max_id = row['id']
+        fh.flush()
+        os.fsync(fh.fileno())
+    os.replace(tmp, path)
+
+    entry = {
+        'month': f"{month:%Y-%m}",
+        'file': path.name,
+        'rows': rows,
+        'min_id': min_id,
+        'max_id': max_id,
+        'sha256': digest.hexdigest(),
+        'archived_at': timezone.now().isoformat(),
+        'deleted': bool(delete),
+    }
+    manifest.setdefault('archives', {})[path.name] = entry
+    _write_manifest(manifest)
+
+    if delete:
+        _delete_archived(month, qs.filter(covered | Q(id__gte=min_id, id__lte=max_id)), chunk_size)
+    return entry
+
+
+def _archived_parts(month: date, manifest: dict) -> list[dict]:
+    """Manifest entries for ``month`` whose files are still on disk, oldest part first."""
+    key = f"{month:%Y-%m}"
+    return sorted(
+        (entry for name, entry in manifest.get('archives', {}).items()
+         if entry.get('month') == key and entry.get('min_id') is not None and (archive_dir() / name).exists()),
+        key=lambda entry: entry['archived_at'],
+    )
+
+
+def _delete_archived(month: date, archived, chunk_size: int):
+    # A dedicated partition is dropped whole; otherwise delete exactly the archived id ranges
+    if partitioning.drop_partition(month):
+        return
+    while True:
+        ids = list(archived.values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            break
+        with transaction.atomic():
+            ActivityLog.objects.filter(id__in=ids).delete()
+
+
+def archive_expired(before: date | None = None, delete: bool = True) -> list[dict]:
+    """Archive every month older than the retention horizon; returns the manifest entries written."""
+    entries = []
+    manifest = read_manifest()
+    hold = timedelta(days=int(getattr(settings, 'AUDIT_RESTORE_HOLD_DAYS', 30)))
+    for month in archivable_months(before):
+        restored_at = manifest.get('restored', {}).get(f"{month:%Y-%m}")
+        if restored_at and timezone.now() - datetime.fromisoformat(restored_at) < hold:
+            # Restored for an investigation; leave it in the database for a while
+            continue
+        entry = archive_month(month, delete=delete)
+        if entry:
+            entries.append(entry)
+    return entries
+
+
+def restore_month(month: date, batch_size: int = 1000) -> int:
+    """Load an archived month back into ActivityLog (rows already present are skipped).
+
+    Returns the number of rows read from the archive files.
+    """
+    month = partitioning.month_start(month)
+    names = sorted(
+        name for name, entry in read_manifest().get('archives', {}).items()
+        if entry.get('month') == f"{month:%Y-%m}"
+    )
+    if not names:
+        raise FileNotFoundError(f"No archive for {month:%Y-%m} in {archive_dir()}")
+    if partitioning.is_partitioned() and not partitioning.partition_exists(month):
+        with connection.cursor() as cursor:
+            cursor.execute(partitioning.create_partition_sql(month))
+    fields = {f.attname: f for f in ActivityLog._meta.concrete_fields}
+    restored = 0
+    for name in names:
+        batch = []
+        with gzip.open(archive_dir() / name, 'rt', encoding='utf-8') as fh:
+            for line in fh:
+                row = json.loads(line)
+                batch.append(ActivityLog(**{
+                    key: fields[key].to_python(value) if value is not None else None
+                    for key, value in row.items() if key in fields
+                }))
+                if len(batch) >= batch_size:
+                    ActivityLog.objects.bulk_create(batch, ignore_conflicts=True)
+                    restored += len(batch)
+                    batch = []
+        if batch:
+            ActivityLog.objects.bulk_create(batch, ignore_conflicts=True)
+            restored += len(batch)
+    manifest = read_manifest()
+    manifest.setdefault('restored', {})[f"{month:%Y-%m}"] = timezone.now().isoformat()
+    _write_manifest(manifest)
+    return restored
@@ -0,0 +1,97 @@
+import time
+
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+
+from .models import ActivityLog
+from .utils import extract_domain_snapshot
+
+
+SNAPSHOT_FIELDS = (
+    'mother_name', 'mother_member_id', 'baby_name', 'baby_hospital_id',
+    'vaccine_name', 'scheduled_date', 'completed_date',
+)
+
+# Relations extract_domain_snapshot() walks, per model that has a snapshot
+SNAPSHOT_RELATIONS = {
+    ('immunization', 'immunizationschedule'): ('baby__mother',),
+    ('immunization', 'vaccinationeventlog'): ('schedule__baby__mother',),
+    ('patients', 'babyprofile'): ('mother',),
+    ('patients', 'motherprofile'): (),
+}
+
+
+def snapshot_content_types() -> dict:
+    """``{content_type_id: (model, select_related)}`` for the models that carry a domain snapshot."""
+    types = {}
+    for (app_label, model_name), related in SNAPSHOT_RELATIONS.items():
+        try:
+            ct = ContentType.objects.get_by_natural_key(app_label, model_name)
+        except ContentType.DoesNotExist:
+            continue
+        model = ct.model_class()
+        if model is not None:
+            types[ct.pk] = (model, related)
+    return types
+
+
+def _load_targets(logs, types: dict) -> dict:
+    """``{(content_type_id, object_id): instance}`` with one query per content type."""
+    wanted = {}
+    for log in logs:
+        wanted.setdefault(log.content_type_id, set()).add(log.object_id)
+    targets = {}
+    for ct_id, object_ids in wanted.items():
+        model, related = types[ct_id]
+        pks = []
+        for object_id in object_ids:
+            try:
+                pks.append(model._meta.pk.to_python(object_id))
+            except Exception:
+                continue
+        for pk, obj in model._default_manager.select_related(*related).in_bulk(pks).items():
+            targets[(ct_id, str(pk))] = obj
+    return targets
+
+
+def backfill_snapshots(start_id: int = 0, limit: int | None = None, chunk_size: int = 500, dry_run: bool = False, on_chunk=None) -> dict:
+    """Fill the denormalized snapshot columns of ActivityLog rows from their target objects.
+
+    Walks logs by ascending id from ``start_id`` (exclusive) in chunks. Each chunk
+    loads its targets with one query per content type and is written with a single
+    ``bulk_update`` in its own transaction, so the job can run while the system is
+    live and be resumed from the last id reported to ``on_chunk(stats)``.
+    """
+    types = snapshot_content_types()
+    stats = {'processed': 0, 'updated': 0, 'last_id': start_id, 'started': time.monotonic()}
+    if not types:
+        return stats
+    base = ActivityLog.objects.filter(content_type_id__in=list(types)).order_by('id')\
+        .only('id', 'content_type_id', 'object_id', *SNAPSHOT_FIELDS)
+    while limit is None or stats['processed'] < limit:
+        size = chunk_size if limit is None else min(chunk_size, limit - stats['processed'])
+        logs = list(base.filter(id__gt=stats['last_id'])[:size])
+        if not logs:
+            break
+        targets = _load_targets(logs, types)
+        dirty = []
+        for log in logs:
+            obj = targets.get((log.content_type_id, log.object_id))
+            if obj is None:
+                continue
+            changed = False
+            for field, value in extract_domain_snapshot(obj).items():
+                if value is not None and getattr(log, field, None) != value:
+                    setattr(log, field, value)
+                    changed = True
+            if changed:
+                dirty.append(log)
+        if dirty and not dry_run:
+            with transaction.atomic():
+                ActivityLog.objects.bulk_update(dirty, SNAPSHOT_FIELDS)
+        stats['processed'] += len(logs)
+        stats['updated'] += len(dirty)
+        stats['last_id'] = logs[-1].id
+        if on_chunk is not None:
+            on_chunk(stats)
+    return stats
@@ -0,0 +1,101 @@
+"""Streaming ActivityLog exports (CSV or NDJSON, optionally gzip'd) with constant memory.
+
+Rows are read with ``values_list().iterator()`` (a server-side cursor on
+PostgreSQL), formatted one at a time and handed out in ~64 KB chunks, so the same
+generator can feed a ``StreamingHttpResponse`` or a file.
+"""
+import csv
+import json
+import zlib
+from datetime import date
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import ActivityLog
+
+
+FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+}
+CHUNK_BYTES = 64 * 1024
+
+
+def export_fields() -> list[str]:
+    return [f.attname for f in ActivityLog._meta.concrete_fields]
+
+
+def export_queryset(start: date | None = None, end: date | None = None, facility: str | None = None):
+    qs = ActivityLog.objects.all()
+    if start:
+        qs = qs.filter(action_date__gte=start)
+    if end:
+        qs = qs.filter(action_date__lte=end)
+    if facility:
+        qs = qs.filter(hospital_clinic_id=facility)
+    return qs.order_by('id')
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def _csv_lines(rows, fields):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fields)
+    for row in rows:
+        yield writer.writerow([
+            json.dumps(value, cls=DjangoJSONEncoder) if isinstance(value, (dict, list)) else value
+            for value in row
+        ])
+
+
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), cls=DjangoJSONEncoder, separators=(',', ':')) + '\n'
+
+
+def _batched(lines, size: int = CHUNK_BYTES):
+    """Join small lines into chunks of roughly ``size`` characters."""
+    parts, length = [], 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts)
+            parts, length = [], 0
+    if parts:
+        yield ''.join(parts)
+
+
+def _gzipped(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits 31 = gzip container
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(qs, fmt: str = 'csv', gzip: bool = False, chunk_size: int = 2000):
+    """Yield the export of ``qs`` as str chunks (bytes when ``gzip``)."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}'")
+    fields = export_fields()
+    rows = qs.values_list(*fields).iterator(chunk_size=chunk_size)
+    lines = _csv_lines(rows, fields) if fmt == 'csv' else _ndjson_lines(rows, fields)
+    chunks = _batched(lines)
+    return _gzipped(chunks) if gzip else chunks
+
+
+def export_filename(fmt: str, gzip: bool = False, start: date | None = None, end: date | None = None, facility: str | None = None) -> str:
+    parts = ['activitylog']
+    if facility:
+        parts.append(''.join(ch if ch.isalnum() or ch in '-_' else '_' for ch in facility))
+    if start or end:
+        parts.append(f"{start:%Y%m%d}" if start else 'start')
+        parts.append(f"{end:%Y%m%d}" if end else 'now')
+    return '-'.join(parts) + '.' + FORMATS[fmt][1] + ('.gz' if gzip else '')
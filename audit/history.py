@@ -0,0 +1,92 @@
+import datetime
+import decimal
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ActivityLog
+from .tracking import snapshot
+from .utils import content_type_id_for
+
+
+def compact_value(value):
+    """JSON-safe, size-bounded form of a field value for ActivityLog.changes.
+
+    Text longer than ``AUDIT_DIFF_MAX_TEXT`` characters is stored as its hash and
+    length only, so notes and rich text do not bloat every audit row.
+    """
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, uuid.UUID)):
+        return str(value)
+    if hasattr(value, 'name') and hasattr(value, 'storage'):
+        # FieldFile: the stored path is what changes
+        value = value.name or ''
+    if isinstance(value, (dict, list)):
+        return value
+    value = str(value)
+    limit = int(getattr(settings, 'AUDIT_DIFF_MAX_TEXT', 200))
+    if len(value) > limit:
+        return {'sha1': hashlib.sha1(value.encode('utf-8')).hexdigest()[:16], 'len': len(value)}
+    return value
+
+
+def compact_changes(changes: dict) -> dict | None:
+    """``{field: (old, new)}`` -> ``{field: [old, new]}`` with compacted values; None when empty."""
+    if not changes:
+        return None
+    return {name: [compact_value(old), compact_value(new)] for name, (old, new) in changes.items()}
+
+
+def initial_state(instance) -> dict | None:
+    """Compact ``{field: [None, value]}`` of a new object's non-empty fields, for create events."""
+    fields = {f.attname: f.name for f in instance._meta.concrete_fields if not f.primary_key}
+    state = {
+        fields[attname]: [None, compact_value(value)]
+        for attname, value in snapshot(instance).items()
+        if attname in fields and value not in (None, '')
+    }
+    return state or None
+
+
+def object_history(model, object_id):
+    """ActivityLog rows for one object, oldest first."""
+    return ActivityLog.objects.filter(content_type_id=content_type_id_for(model), object_id=str(object_id)).order_by('action_datetime', 'id')
+
+
+def reconstruct_state(model, object_id, at=None) -> dict | None:
+    """Field values (by field name, in compacted form) of an object as of ``at``.
+
+    Returns None if the object did not exist at that time. While the object still
+    exists the diffs recorded after ``at`` are undone from its current row; for
+    deleted objects the diffs are replayed forward from the create event. Hashed
+    long text stays hashed, and changes made before diffs were recorded (or via
+    ``QuerySet.update``) cannot be reflected.
+    """
+    at = at or timezone.now()
+    history = object_history(model, object_id)
+    current = model._default_manager.filter(pk=object_id).first()
+    if current is not None:
+        state = {f.name: compact_value(getattr(current, f.attname)) for f in model._meta.concrete_fields}
+        later = history.filter(action_datetime__gt=at).exclude(changes__isnull=True).order_by('-action_datetime', '-id')
+        for log in later.iterator():
+            if log.action_type == 'create':
+                return None
+            for name, (old, _new) in log.changes.items():
+                state[name] = old
+        return state
+
+    state = None
+    for log in history.filter(action_datetime__lte=at).iterator():
+        if log.action_type == 'create':
+            state = {name: new for name, (_old, new) in (log.changes or {}).items()}
+        elif log.action_type == 'delete':
+            state = None
+        elif state is not None:
+            for name, (_old, new) in (log.changes or {}).items():
+                state[name] = new
+    return state
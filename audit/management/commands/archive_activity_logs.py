@@ -0,0 +1,41 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from audit.archive import archive_dir, archive_month, archivable_months, retention_cutoff
+
+
+class Command(BaseCommand):
+    help = "Archive ActivityLog months older than AUDIT_RETENTION_DAYS to gzip'd JSONL files and remove them."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Archive only this month (YYYY-MM)')
+        parser.add_argument('--before', help='Archive every month before this one (YYYY-MM); default is the retention cutoff')
+        parser.add_argument('--keep', action='store_true', help='Write the archive but keep the rows in the database')
+        parser.add_argument('--dry-run', action='store_true', help='List the months that would be archived')
+
+    def handle(self, *args, **options):
+        if options.get('month'):
+            months = [_parse_month(options['month'])]
+        else:
+            before = _parse_month(options['before']) if options.get('before') else retention_cutoff()
+            months = archivable_months(before)
+        if not months:
+            self.stdout.write(self.style.NOTICE("Nothing to archive"))
+            return
+        if options.get('dry_run'):
+            for month in months:
+                self.stdout.write(f"Would archive {month:%Y-%m}")
+            return
+        for month in months:
+            entry = archive_month(month, delete=not options.get('keep'))
+            if entry:
+                self.stdout.write(self.style.SUCCESS(f"Archived {entry['rows']} rows for {entry['month']} to {archive_dir() / entry['file']}"))
+
+
+def _parse_month(value: str) -> date:
+    try:
+        year, month = value.split('-')
+        return date(int(year), int(month), 1)
+    except ValueError:
+        raise CommandError(f"Invalid month '{value}', expected YYYY-MM")
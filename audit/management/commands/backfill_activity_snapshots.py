@@ -1,7 +1,9 @@
+import time
+from pathlib import Path
+
 from django.core.management.base import BaseCommand
-from django.db import transaction
 
-from audit.models import ActivityLog
+from audit.backfill import backfill_snapshots
 
 
 class Command(BaseCommand):
@@ -9,62 +11,38 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument('--dry-run', action='store_true', help='Show changes without saving')
-        parser.add_argument('--limit', type=int, default=1000, help='Max logs to process')
+        parser.add_argument('--limit', type=int, default=1000, help='Max logs to process (0 = no limit)')
+        parser.add_argument('--chunk-size', type=int, default=500, help='Logs loaded and updated per transaction')
+        parser.add_argument('--start-id', type=int, default=None, help='Resume after this ActivityLog id')
+        parser.add_argument('--checkpoint', help='File holding the last processed id; read on start, rewritten after every chunk')
 
     def handle(self, *args, **options):
         dry = options.get('dry_run', False)
-        limit = options.get('limit', 1000)
-        qs = ActivityLog.objects.order_by('id')
-        processed = 0
-        updated = 0
-        with transaction.atomic():
-            for log in qs.iterator():
-                if processed >= limit:
-                    break
-                processed += 1
-                snap = {}
-                obj = log.content_object
-                try:
-                    if obj is None:
-                        continue
-                    # VaccinationEventLog → schedule
-                    if obj.__class__.__name__ == 'VaccinationEventLog' and hasattr(obj, 'schedule') and obj.schedule:
-                        obj = obj.schedule
-                    if obj.__class__.__name__ == 'ImmunizationSchedule':
-                        baby = getattr(obj, 'baby', None)
-                        if baby:
-                            snap['baby_name'] = getattr(baby, 'name', None)
-                            snap['baby_hospital_id'] = getattr(baby, 'hospital_id', None)
-                            mother = getattr(baby, 'mother', None)
-                            if mother:
-                                snap['mother_name'] = getattr(mother, 'full_name', None)
-                                snap['mother_member_id'] = getattr(mother, 'member_id', None)
-                        snap['vaccine_name'] = getattr(obj, 'vaccine_name', None)
-                        snap['scheduled_date'] = getattr(obj, 'scheduled_date', None)
-                        snap['completed_date'] = getattr(obj, 'date_completed', None)
-                    elif obj.__class__.__name__ == 'BabyProfile':
-                        snap['baby_name'] = getattr(obj, 'name', None)
-                        snap['baby_hospital_id'] = getattr(obj, 'hospital_id', None)
-                        mother = getattr(obj, 'mother', None)
-                        if mother:
-                            snap['mother_name'] = getattr(mother, 'full_name', None)
-                            snap['mother_member_id'] = getattr(mother, 'member_id', None)
-                    elif obj.__class__.__name__ == 'MotherProfile':
-                        snap['mother_name'] = getattr(obj, 'full_name', None)
-                        snap['mother_member_id'] = getattr(obj, 'member_id', None)
-                except Exception:
-                    continue
+        limit = options.get('limit', 1000) or None
+        checkpoint = Path(options['checkpoint']) if options.get('checkpoint') else None
+        start_id = options.get('start_id')
+        if start_id is None:
+            start_id = int(checkpoint.read_text().strip() or 0) if checkpoint and checkpoint.exists() else 0
+        if start_id:
+            self.stdout.write(f"Resuming after id {start_id}")
 
-                # Apply if any snapshot data
-                if snap:
-                    dirty = False
-                    for k, v in snap.items():
-                        if getattr(log, k, None) != v and v is not None:
-                            setattr(log, k, v)
-                            dirty = True
-                    if dirty:
-                        updated += 1
-                        if not dry:
-                            log.save(update_fields=list(snap.keys()))
+        def progress(stats):
+            if checkpoint and not dry:
+                checkpoint.write_text(str(stats['last_id']))
+            elapsed = max(time.monotonic() - stats['started'], 1e-6)
+            self.stdout.write(
+                f"  … {stats['processed']} processed, {stats['updated']} updated, "
+                f"last id {stats['last_id']} ({stats['processed'] / elapsed:.0f} rows/s)"
+            )
 
-        self.stdout.write(self.style.SUCCESS(f"Processed {processed} logs; updated {updated} with snapshots"))
\ No newline at end of file
+        stats = backfill_snapshots(
+            start_id=start_id,
+            limit=limit,
+            chunk_size=max(1, options.get('chunk_size') or 500),
+            dry_run=dry,
+            on_chunk=progress,
+        )
+        verb = 'would update' if dry else 'updated'
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {stats['processed']} logs; {verb} {stats['updated']} with snapshots (last id {stats['last_id']})"
+        ))
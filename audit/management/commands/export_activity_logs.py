@@ -0,0 +1,47 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from audit.export import FORMATS, export_queryset, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream ActivityLog rows for a date range/facility to CSV or NDJSON (optionally gzip'd)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First action date to include (YYYY-MM-DD)')
+        parser.add_argument('--end', help='Last action date to include (YYYY-MM-DD)')
+        parser.add_argument('--facility', help='Only this hospital_clinic_id')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='csv')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output on the fly')
+        parser.add_argument('--output', '-o', help='Output file (default: stdout)')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Rows fetched from the cursor at a time')
+
+    def handle(self, *args, **options):
+        start, end = _parse_date(options.get('start')), _parse_date(options.get('end'))
+        qs = export_queryset(start, end, options.get('facility'))
+        chunks = stream_export(qs, fmt=options['format'], gzip=options['gzip'], chunk_size=max(1, options['chunk_size']))
+        out = open(options['output'], 'wb') if options.get('output') else sys.stdout.buffer
+        written = 0
+        try:
+            for chunk in chunks:
+                data = chunk if isinstance(chunk, bytes) else chunk.encode('utf-8')
+                out.write(data)
+                written += len(data)
+        finally:
+            if options.get('output'):
+                out.close()
+            else:
+                out.flush()
+        if options.get('output'):
+            self.stderr.write(self.style.SUCCESS(f"Wrote {written} bytes to {options['output']}"))
+
+
+def _parse_date(value):
+    if not value:
+        return None
+    try:
+        return date.fromisoformat(value)
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
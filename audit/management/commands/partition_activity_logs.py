@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from audit import partitioning
+
+
+class Command(BaseCommand):
+    help = "PostgreSQL only: convert ActivityLog to monthly partitions by action_date, or create upcoming partitions."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--convert', action='store_true', help='Convert the table to a partitioned table (prints the SQL unless --execute)')
+        parser.add_argument('--execute', action='store_true', help='Run the conversion (takes an exclusive lock; schedule downtime)')
+        parser.add_argument('--months-ahead', type=int, default=None, help='Partitions to keep ready beyond the current month')
+
+    def handle(self, *args, **options):
+        if not partitioning.is_postgres():
+            raise CommandError('ActivityLog partitioning requires the PostgreSQL backend')
+        if options.get('convert'):
+            statements = partitioning.convert(execute=options.get('execute'), months_ahead=options.get('months_ahead'))
+            if not statements:
+                self.stdout.write(self.style.NOTICE('ActivityLog is already partitioned'))
+                return
+            if not options.get('execute'):
+                for statement in statements:
+                    self.stdout.write(statement + ';')
+                return
+            self.stdout.write(self.style.SUCCESS(f"Converted {partitioning.TABLE} ({len(statements)} statements)"))
+            return
+        if not partitioning.is_partitioned():
+            raise CommandError('ActivityLog is not partitioned yet; run with --convert first')
+        created = partitioning.ensure_partitions(options.get('months_ahead'))
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} partitions") if created else 'Partitions up to date')
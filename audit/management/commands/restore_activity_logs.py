@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from audit.archive import read_manifest, restore_month
+from audit.management.commands.archive_activity_logs import _parse_month
+
+
+class Command(BaseCommand):
+    help = "Load an archived ActivityLog month back into the database for an investigation."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--month', help='Month to restore (YYYY-MM)')
+        parser.add_argument('--list', action='store_true', help='List the archived months')
+
+    def handle(self, *args, **options):
+        if options.get('list'):
+            for name, entry in sorted(read_manifest().get('archives', {}).items()):
+                self.stdout.write(f"{entry['month']}  {entry['rows']:>8} rows  {name}")
+            return
+        if not options.get('month'):
+            raise CommandError('Pass --month YYYY-MM (or --list)')
+        try:
+            restored = restore_month(_parse_month(options['month']))
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+        self.stdout.write(self.style.SUCCESS(f"Restored {restored} rows for {options['month']} (existing ids skipped)"))
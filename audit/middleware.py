@@ -1,24 +1,57 @@
-import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 
-_state = threading.local()
+
+# Context variables follow the request across await points and into
+# sync_to_async/async_to_sync threads, unlike thread-local storage
+_current_user = ContextVar('audit_current_user', default=None)
+_request_cache = ContextVar('audit_request_cache', default=None)
 
 
 def get_current_user():
-    return getattr(_state, 'current_user', None)
+    return _current_user.get()
+
+
+def get_request_cache():
+    """Per-request dict for values derived from the current user (None outside a request)."""
+    return _request_cache.get()
+
+
+@contextmanager
+def acting_as(user):
+    """Attribute audit events inside the block to ``user`` (a request, a task or a script)."""
+    user_token = _current_user.set(user)
+    cache_token = _request_cache.set({})
+    try:
+        yield user
+    finally:
+        _request_cache.reset(cache_token)
+        _current_user.reset(user_token)
 
 
 class CurrentUserMiddleware:
-    """Stores the authenticated user in thread-local storage for signals to access."""
+    """Stores the authenticated user in a context variable for signals to access.
+
+    Works as sync or async middleware, so ASGI deployments and async views keep
+    the right user on audit rows.
+    """
+
+    sync_capable = True
+    async_capable = True
 
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
     def __call__(self, request):
-        _state.current_user = getattr(request, 'user', None)
-        try:
-            response = self.get_response(request)
-        finally:
-            # Clean up to avoid leakage across requests (important on long-lived threads)
-            _state.current_user = None
-        return response
\ No newline at end of file
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with acting_as(getattr(request, 'user', None)):
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        with acting_as(getattr(request, 'user', None)):
+            return await self.get_response(request)
@@ -0,0 +1,25 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:59
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0002_activitylog_baby_hospital_id_activitylog_baby_name_and_more'),
+        ('contenttypes', '0002_remove_content_type_name'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='activitylog',
+            name='changes',
+            field=models.JSONField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='activitylog',
+            index=models.Index(fields=['content_type', 'object_id', 'action_datetime'], name='audit_activ_content_d7f2f8_idx'),
+        ),
+    ]
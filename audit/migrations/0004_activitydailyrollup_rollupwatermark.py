@@ -0,0 +1,44 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0003_activitylog_changes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ActivityDailyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('action_date', models.DateField()),
+                ('hospital_clinic_id', models.CharField(blank=True, default='', max_length=255)),
+                ('staff_id', models.CharField(blank=True, default='', max_length=255)),
+                ('module', models.CharField(max_length=64)),
+                ('model', models.CharField(max_length=64)),
+                ('action_type', models.CharField(choices=[('create', 'Create'), ('update', 'Update'), ('delete', 'Delete'), ('complete', 'Complete')], max_length=16)),
+                ('staff_name', models.CharField(blank=True, default='', max_length=255)),
+                ('count', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ('-action_date', 'hospital_clinic_id', 'staff_id'),
+                'indexes': [models.Index(fields=['hospital_clinic_id', 'action_date'], name='audit_activ_hospita_b60bb5_idx'), models.Index(fields=['module', 'model', 'action_type', 'action_date'], name='audit_activ_module_0fb7e0_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='activitydailyrollup',
+            constraint=models.UniqueConstraint(fields=('action_date', 'hospital_clinic_id', 'staff_id', 'module', 'model', 'action_type'), name='audit_rollup_unique_key'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('audit', '0004_activitydailyrollup_rollupwatermark'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='gaps',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
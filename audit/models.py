@@ -41,13 +41,64 @@ class ActivityLog(models.Model):
     action_date = models.DateField()
     action_time = models.TimeField()
 
+    # Changed fields only, as {field: [old, new]}; long text is stored as a hash (see audit.history)
+    changes = models.JSONField(blank=True, null=True)
+
     class Meta:
         ordering = ('-action_datetime',)
         indexes = [
             models.Index(fields=['module', 'model', 'action_type', 'action_date']),
             models.Index(fields=['staff_id', 'hospital_clinic_id', 'action_date']),
             models.Index(fields=['mother_member_id', 'baby_hospital_id', 'scheduled_date']),
+            models.Index(fields=['content_type', 'object_id', 'action_datetime']),
         ]
 
     def __str__(self):
-        return f"{self.action_type} {self.module}.{self.model} #{self.object_id} by {self.staff_id or self.user_id}"
\ No newline at end of file
+        return f"{self.action_type} {self.module}.{self.model} #{self.object_id} by {self.staff_id or self.user_id}"
+
+
+class ActivityDailyRollup(models.Model):
+    """ActivityLog counts per day, facility, staff member, module/model and action.
+
+    Maintained incrementally by ``audit.rollups.update_rollups``; reports read from
+    here instead of scanning raw events. Missing facility/staff ids are stored as ''.
+    """
+
+    action_date = models.DateField()
+    hospital_clinic_id = models.CharField(max_length=255, blank=True, default='')
+    staff_id = models.CharField(max_length=255, blank=True, default='')
+    module = models.CharField(max_length=64)
+    model = models.CharField(max_length=64)
+    action_type = models.CharField(max_length=16, choices=ActivityLog.ACTION_CHOICES)
+    # Name recorded for staff_id, for display only
+    staff_name = models.CharField(max_length=255, blank=True, default='')
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ('-action_date', 'hospital_clinic_id', 'staff_id')
+        constraints = [
+            models.UniqueConstraint(
+                fields=['action_date', 'hospital_clinic_id', 'staff_id', 'module', 'model', 'action_type'],
+                name='audit_rollup_unique_key',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['hospital_clinic_id', 'action_date']),
+            models.Index(fields=['module', 'model', 'action_type', 'action_date']),
+        ]
+
+    def __str__(self):
+        return f"{self.action_date} {self.hospital_clinic_id or '-'} {self.staff_id or '-'} {self.module}.{self.model} {self.action_type}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """Highest ActivityLog id already folded into the rollups (one row per rollup)."""
+
+    name = models.CharField(max_length=64, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    # [[first_id, last_id, seen_at], ...]: ids below last_id not yet visible when passed
+    gaps = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
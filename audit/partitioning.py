@@ -0,0 +1,149 @@
+"""PostgreSQL range partitioning of ActivityLog by ``action_date`` (one partition per month).
+
+Everything here is a no-op on other backends. The table is converted once with
+``manage.py partition_activity_logs --convert --execute``; afterwards the daily
+retention task keeps partitions for the coming months in place and archiving a
+month drops its partition instead of deleting row by row.
+"""
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import ActivityLog
+
+
+TABLE = ActivityLog._meta.db_table
+
+
+def is_postgres() -> bool:
+    return connection.vendor == 'postgresql'
+
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+
+def add_months(day: date, months: int) -> date:
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned() -> bool:
+    if not is_postgres():
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table pt JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = %s",
+            [TABLE],
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_exists(month: date) -> bool:
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT to_regclass(%s)", [partition_name(month)])
+        return cursor.fetchone()[0] is not None
+
+
+def create_partition_sql(month: date) -> str:
+    start, end = month_start(month), add_months(month, 1)
+    return (
+        f'CREATE TABLE IF NOT EXISTS "{partition_name(start)}" PARTITION OF "{TABLE}" '
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    )
+
+
+def ensure_partitions(months_ahead: int | None = None, today: date | None = None) -> list[str]:
+    """Create missing partitions for the current and the next ``months_ahead`` months."""
+    if not is_partitioned():
+        return []
+    months_ahead = int(months_ahead if months_ahead is not None else getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3))
+    first = month_start(today or date.today())
+    created = []
+    with connection.cursor() as cursor:
+        for offset in range(months_ahead + 1):
+            month = add_months(first, offset)
+            if not partition_exists(month):
+                cursor.execute(create_partition_sql(month))
+                created.append(partition_name(month))
+    return created
+
+
+def drop_partition(month: date) -> bool:
+    """Detach and drop one month's partition; False when there is no such partition."""
+    if not is_partitioned() or not partition_exists(month):
+        return False
+    name = partition_name(month)
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f'ALTER TABLE "{TABLE}" DETACH PARTITION "{name}"')
+        cursor.execute(f'DROP TABLE "{name}"')
+    return True
+
+
+def conversion_sql(first_month: date, last_month: date) -> list[str]:
+    """Statements that turn the plain ActivityLog table into a partitioned one.
+
+    The primary key becomes (id, action_date), as PostgreSQL requires the partition
+    key in every unique constraint; ids stay unique through the identity sequence.
+    Existing indexes are recreated with their original names so later migrations
+    still find them.
+    """
+    old = f"{TABLE}_unpartitioned"
+    statements = [
+        f'ALTER TABLE "{TABLE}" RENAME TO "{old}"',
+        # Free the primary key name for the new table
+        f'ALTER TABLE "{old}" RENAME CONSTRAINT "{TABLE}_pkey" TO "{old}_pkey"',
+        f'CREATE TABLE "{TABLE}" (LIKE "{old}" INCLUDING DEFAULTS INCLUDING IDENTITY INCLUDING CONSTRAINTS) '
+        f'PARTITION BY RANGE (action_date)',
+        f'ALTER TABLE "{TABLE}" ADD PRIMARY KEY (id, action_date)',
+    ]
+    month = month_start(first_month)
+    while month <= last_month:
+        statements.append(create_partition_sql(month))
+        month = add_months(month, 1)
+    statements += [
+        f'CREATE TABLE IF NOT EXISTS "{TABLE}_default" PARTITION OF "{TABLE}" DEFAULT',
+        f'INSERT INTO "{TABLE}" SELECT * FROM "{old}"',
+        f"SELECT setval(pg_get_serial_sequence('\"{TABLE}\"', 'id'), COALESCE((SELECT MAX(id) FROM \"{TABLE}\"), 1))",
+    ]
+    for field in ActivityLog._meta.concrete_fields:
+        if field.is_relation:
+            target = field.related_model._meta
+            statements.append(
+                f'ALTER TABLE "{TABLE}" ADD FOREIGN KEY ("{field.column}") '
+                f'REFERENCES "{target.db_table}" ("{target.pk.column}") DEFERRABLE INITIALLY DEFERRED'
+            )
+    return statements
+
+
+def convert(execute: bool = False, months_ahead: int | None = None) -> list[str]:
+    """Return (and with ``execute`` run, in one transaction) the conversion statements."""
+    if not is_postgres():
+        raise RuntimeError('Partitioning is only supported on PostgreSQL')
+    if is_partitioned():
+        return []
+    months_ahead = int(months_ahead if months_ahead is not None else getattr(settings, 'AUDIT_PARTITION_MONTHS_AHEAD', 3))
+    oldest = ActivityLog.objects.order_by('action_date').values_list('action_date', flat=True).first()
+    first = month_start(oldest or date.today())
+    last = add_months(month_start(date.today()), months_ahead)
+    statements = conversion_sql(first, last)
+    old = f"{TABLE}_unpartitioned"
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexdef FROM pg_indexes WHERE tablename = %s AND indexname <> %s", [TABLE, f"{TABLE}_pkey"])
+        index_defs = [row[0] for row in cursor.fetchall()]
+    # Recreated once the old table (and its index names) are gone
+    statements.append(f'DROP TABLE "{old}"')
+    statements += [
+        definition.replace(f' ON public.{TABLE} ', f' ON "{TABLE}" ').replace(f' ON {TABLE} ', f' ON "{TABLE}" ')
+        for definition in index_defs
+    ]
+    if execute:
+        with transaction.atomic(), connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+    return statements
@@ -0,0 +1,71 @@
+"""Writing ActivityLog rows for single-object saves and deletes, batched per transaction.
+
+Signals build each row when the change happens. Inside an ``audit.pipeline.atomic``
+block (a drop-in for ``transaction.atomic``) the rows are held in memory and written
+with one ``bulk_create`` just before the block exits, still inside its transaction:
+they commit together with the data, and a block that raises or is rolled back takes
+them with it. Outside such a block, or inside a plain ``transaction.atomic`` nested in
+one (whose savepoint may roll back on its own), each row is inserted at once on the
+same connection. Set-based writes batch their rows with
+``audit.utils.bulk_log_activity`` in the same way.
+"""
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, router, transaction
+
+from .models import ActivityLog
+
+
+_local = threading.local()
+
+
+def _scopes(using: str) -> list:
+    """Open buffering blocks on ``using`` in this thread: ``[atomic depth, pending rows]``, innermost last."""
+    if not hasattr(_local, 'scopes'):
+        _local.scopes = {}
+    return _local.scopes.setdefault(using, [])
+
+
+class AuditAtomic(transaction.Atomic):
+    """``transaction.Atomic`` that writes the audit rows recorded directly inside it on exit.
+
+    Per-entry state lives in a thread-local stack rather than on the instance, so one
+    instance can decorate a view that runs in many threads (or recursively).
+    """
+
+    def __enter__(self):
+        super().__enter__()
+        connection = transaction.get_connection(self.using)
+        _scopes(connection.alias).append([len(connection.atomic_blocks), []])
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        connection = transaction.get_connection(self.using)
+        _, logs = _scopes(connection.alias).pop()
+        if exc_type is None and logs and not connection.needs_rollback:
+            try:
+                ActivityLog.objects.using(connection.alias).bulk_create(logs)
+            except Exception as exc:
+                super().__exit__(type(exc), exc, exc.__traceback__)
+                raise
+        return super().__exit__(exc_type, exc_value, traceback)
+
+
+def atomic(using=None, savepoint=True, durable=False):
+    """Like ``transaction.atomic`` (context manager or decorator), with audit rows written in one batch."""
+    if callable(using):
+        return AuditAtomic(DEFAULT_DB_ALIAS, savepoint, durable)(using)
+    return AuditAtomic(using, savepoint, durable)
+
+
+def record_activity(log: ActivityLog, using=None):
+    """Write an unsaved ActivityLog as part of the current transaction.
+
+    Held for the enclosing ``atomic`` block's batch when that block is the innermost
+    one; inserted now otherwise.
+    """
+    using = using or router.db_for_write(ActivityLog)
+    scopes = _scopes(using)
+    if scopes and scopes[-1][0] == len(transaction.get_connection(using).atomic_blocks):
+        scopes[-1][1].append(log)
+    else:
+        log.save(using=using)
@@ -0,0 +1,98 @@
+"""Which models are audited, which of their fields matter, and how often each event is kept.
+
+Configured from settings::
+
+    AUDIT_TRACKED_APPS = ('immunization', 'patients', ...)   # every model in these apps
+    AUDIT_EXCLUDED_MODELS = ('casefiles.CaseActivityLog', ...)  # except these
+    AUDIT_MODEL_OPTIONS = {
+        'immunization.ImmunizationSchedule': {
+            'fields': ('status', 'scheduled_date', 'date_completed'),  # other changes are not logged
+            'events': {'update': 0.25},  # keep a quarter of plain updates; 0 skips the event
+            'skip_unchanged': True,      # saves that change nothing are not logged (the default)
+        },
+    }
+
+Event names are ``create``, ``update``, ``complete`` and ``delete``; rates default to 1.
+"""
+import random
+from dataclasses import dataclass, field
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+EVENTS = ('create', 'update', 'complete', 'delete')
+
+
+@dataclass(frozen=True)
+class AuditSpec:
+    label: str
+    fields: frozenset | None = None
+    rates: dict = field(default_factory=dict)
+    skip_unchanged: bool = True
+
+    def rate(self, event: str) -> float:
+        return float(self.rates.get(event, 1.0))
+
+    def should_record(self, event: str) -> bool:
+        rate = self.rate(event)
+        return rate >= 1 or (rate > 0 and random.random() < rate)
+
+    def filter_changes(self, changes: dict) -> dict:
+        """Only the tracked fields of ``{field_name: (old, new)}``."""
+        if self.fields is None or not changes:
+            return changes
+        return {name: value for name, value in changes.items() if name in self.fields}
+
+
+_registry: dict | None = None
+
+
+def _spec_for(model, options: dict) -> AuditSpec:
+    label = model._meta.label
+    opts = options.get(label) or options.get(label.lower()) or {}
+    fields = opts.get('fields')
+    return AuditSpec(
+        label=label,
+        fields=frozenset(fields) if fields is not None else None,
+        rates=dict(opts.get('events') or {}),
+        skip_unchanged=opts.get('skip_unchanged', True),
+    )
+
+
+def build_registry() -> dict:
+    """``{model: AuditSpec}`` for every audited model, from the AUDIT_* settings."""
+    excluded = {label.lower() for label in getattr(settings, 'AUDIT_EXCLUDED_MODELS', ())}
+    options = getattr(settings, 'AUDIT_MODEL_OPTIONS', {})
+    registry = {}
+    for app_label in getattr(settings, 'AUDIT_TRACKED_APPS', ()):
+        try:
+            models = apps.get_app_config(app_label).get_models()
+        except LookupError:
+            # app may not exist in the project
+            continue
+        for model in models:
+            if model._meta.label_lower not in excluded:
+                registry[model] = _spec_for(model, options)
+    return registry
+
+
+def registry() -> dict:
+    global _registry
+    if _registry is None:
+        _registry = build_registry()
+    return _registry
+
+
+def get_spec(model) -> AuditSpec | None:
+    """The audit options for ``model``, or None when it is not audited."""
+    return registry().get(model)
+
+
+@receiver(setting_changed)
+def _reset_registry(setting, **kwargs):
+    global _registry
+    if setting.startswith('AUDIT_'):
+        _registry = None
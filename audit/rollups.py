@@ -0,0 +1,177 @@
+"""Incremental daily rollups of ActivityLog for reporting.
+
+``update_rollups`` folds events with an id above the stored watermark into
+``ActivityDailyRollup`` (one row per day, facility, staff member, module/model and
+action) and advances the watermark in the same transaction, so each event is
+counted exactly once however often the job runs. Events newer than
+``AUDIT_ROLLUP_LAG_SECONDS`` (and any event after the first such one) are left for
+the next run. Ids the watermark passes while they are not yet visible (a
+transaction still open, or rolled back) are kept as gaps on the watermark row.
+Gap ids that commit later are folded on a following run, and gaps are dropped
+after ``AUDIT_ROLLUP_GAP_SECONDS``.
+"""
+import time
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Min, Q
+from django.utils import timezone
+
+from .models import ActivityDailyRollup, ActivityLog, RollupWatermark
+
+
+WATERMARK = 'activity_daily'
+KEY_FIELDS = ('action_date', 'hospital_clinic_id', 'staff_id', 'module', 'model', 'action_type')
+
+
+def watermark() -> int:
+    """Highest ActivityLog id already counted in the rollups (0 before the first run)."""
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('last_id', flat=True).first() or 0
+
+
+def _key(row: dict) -> tuple:
+    # NULL facility/staff ids fold into ''
+    return (row['action_date'],) + tuple(row[field] or '' for field in KEY_FIELDS[1:])
+
+
+def _fold(rows: list[dict]) -> int:
+    """Add aggregated ``rows`` to the rollup table; returns the number of rollup rows touched."""
+    days = {row['action_date'] for row in rows}
+    existing = {
+        _key(vars(rollup)): rollup
+        for rollup in ActivityDailyRollup.objects.filter(action_date__in=days)
+    }
+    created, updated = [], {}
+    for row in rows:
+        key = _key(row)
+        rollup = existing.get(key)
+        if rollup is None:
+            rollup = ActivityDailyRollup(**dict(zip(KEY_FIELDS, key)), count=0)
+            existing[key] = rollup
+            created.append(rollup)
+        elif rollup.pk is not None:
+            updated[rollup.pk] = rollup
+        rollup.count += row['events']
+        if row['name']:
+            rollup.staff_name = row['name']
+    ActivityDailyRollup.objects.bulk_create(created)
+    ActivityDailyRollup.objects.bulk_update(list(updated.values()), ['count', 'staff_name'])
+    return len(created) + len(updated)
+
+
+def _aggregate(events) -> list[dict]:
+    """Group ActivityLog rows (dicts with KEY_FIELDS and ``staff_name``) the way ``_fold`` expects."""
+    groups = {}
+    for event in events:
+        key = tuple(event[field] for field in KEY_FIELDS)
+        group = groups.setdefault(key, {**dict(zip(KEY_FIELDS, key)), 'events': 0, 'name': None})
+        group['events'] += 1
+        if event['staff_name'] and (group['name'] is None or event['staff_name'] > group['name']):
+            group['name'] = event['staff_name']
+    return list(groups.values())
+
+
+def _missing(after: int, ids: list[int], last: int) -> list[list[int]]:
+    """``[first, last]`` id ranges in ``(after, last]`` absent from the sorted ``ids``."""
+    ranges = []
+    expected = after + 1
+    for pk in ids + [last + 1]:
+        if pk > expected:
+            ranges.append([expected, pk - 1])
+        expected = pk + 1
+    return ranges
+
+
+def uncounted() -> Q:
+    """ActivityLog filter for events not yet folded: past the watermark or inside a recorded gap."""
+    mark = RollupWatermark.objects.filter(name=WATERMARK).first()
+    condition = Q(id__gt=mark.last_id if mark else 0)
+    for first, last, _ in (mark.gaps if mark else []):
+        condition |= Q(id__gte=first, id__lte=last)
+    return condition
+
+
+def _fold_gaps(mark, now) -> dict:
+    """Fold events that committed inside recorded gaps; drop gaps older than AUDIT_ROLLUP_GAP_SECONDS."""
+    stats = {'events': 0, 'rollups': 0}
+    if not mark.gaps:
+        return stats
+    ranges = Q()
+    for first, last, _ in mark.gaps:
+        ranges |= Q(id__gte=first, id__lte=last)
+    events = list(ActivityLog.objects.filter(ranges).order_by('id').values('id', 'staff_name', *KEY_FIELDS))
+    if events:
+        stats['rollups'] = _fold(_aggregate(events))
+        stats['events'] = len(events)
+    ids = [event['id'] for event in events]
+    expiry = timedelta(seconds=int(getattr(settings, 'AUDIT_ROLLUP_GAP_SECONDS', 86400)))
+    gaps = []
+    for first, last, seen in mark.gaps:
+        if now - datetime.fromisoformat(seen) > expiry:
+            # Long enough for any transaction to finish: these ids were rolled back
+            continue
+        inside = ids[bisect_left(ids, first):bisect_right(ids, last)]
+        gaps += [[lo, hi, seen] for lo, hi in _missing(first - 1, inside, last)]
+    mark.gaps = gaps
+    return stats
+
+
+def update_rollups(batch_size: int = 5000, lag_seconds: int | None = None, on_batch=None) -> dict:
+    """Fold every ActivityLog event past the watermark into the daily rollups.
+
+    Events are taken in id windows of ``batch_size``, read with one query each and
+    applied, together with the new watermark, in one transaction that holds the
+    watermark row locked so concurrent runs queue up. Audit rows are inserted inside
+    the transaction of the change they describe, so a long transaction can commit
+    ids below the watermark after it has moved on. Every id a window passes over
+    without seeing it is therefore kept as a gap. Gap ids that show up on a later
+    run are folded then.
+    """
+    lag = int(lag_seconds if lag_seconds is not None else getattr(settings, 'AUDIT_ROLLUP_LAG_SECONDS', 300))
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=lag)
+    stats = {'events': 0, 'rollups': 0, 'last_id': watermark(), 'started': time.monotonic()}
+    RollupWatermark.objects.get_or_create(name=WATERMARK)
+    with transaction.atomic():
+        mark = RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+        late = _fold_gaps(mark, now)
+        mark.save(update_fields=['gaps', 'updated_at'])
+        stats['events'] += late['events']
+        stats['rollups'] += late['rollups']
+    while True:
+        with transaction.atomic():
+            mark = RollupWatermark.objects.select_for_update().get(name=WATERMARK)
+            window = ActivityLog.objects.filter(id__gt=mark.last_id)
+            # Stop below the first event inside the lag, so the watermark never passes it
+            newer = window.filter(action_datetime__gt=cutoff).aggregate(first=Min('id'))['first']
+            if newer is not None:
+                window = window.filter(id__lt=newer)
+            # One query for both the counts and the ids, so the gaps match what was counted
+            events = list(window.order_by('id').values('id', 'staff_name', *KEY_FIELDS)[:batch_size])
+            if not events:
+                stats['last_id'] = mark.last_id
+                break
+            ids = [event['id'] for event in events]
+            stats['rollups'] += _fold(_aggregate(events))
+            stats['events'] += len(events)
+            mark.gaps += [[lo, hi, now.isoformat()] for lo, hi in _missing(mark.last_id, ids, ids[-1])]
+            mark.last_id = ids[-1]
+            mark.save(update_fields=['last_id', 'gaps', 'updated_at'])
+            stats['last_id'] = mark.last_id
+        if on_batch is not None:
+            on_batch(stats)
+    return stats
+
+
+def rebuild_rollups(**kwargs) -> dict:
+    """Recount the rollups from the events still in the database.
+
+    Only days that still have events are reset, so archived months keep their counts.
+    """
+    with transaction.atomic():
+        days = list(ActivityLog.objects.dates('action_date', 'day'))
+        ActivityDailyRollup.objects.filter(action_date__in=days).delete()
+        RollupWatermark.objects.update_or_create(name=WATERMARK, defaults={'last_id': 0, 'gaps': []})
+    return update_rollups(**kwargs)
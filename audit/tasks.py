@@ -0,0 +1,19 @@
+from celery import shared_task
+
+
+@shared_task
+def archive_activity_logs():
+    """Daily retention job: archive months past AUDIT_RETENTION_DAYS and pre-create partitions."""
+    from .archive import archive_expired
+    from .partitioning import ensure_partitions
+    entries = archive_expired()
+    created = ensure_partitions()
+    return {'archived': [entry['file'] for entry in entries], 'rows': sum(entry['rows'] for entry in entries), 'partitions': created}
+
+
+@shared_task
+def update_activity_rollups():
+    """Fold ActivityLog events recorded since the last run into the daily rollups."""
+    from .rollups import update_rollups
+    stats = update_rollups()
+    return {'events': stats['events'], 'rollups': stats['rollups'], 'last_id': stats['last_id']}
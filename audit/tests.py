@@ -0,0 +1,218 @@
+import tempfile
+from datetime import date, timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.db import connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from patients.models import MotherProfile
+
+from . import archive, pipeline, rollups
+from .models import ActivityDailyRollup, ActivityLog, RollupWatermark
+from .tracking import original_values
+
+
+def make_mother(email='mother@example.com', **fields):
+    user = get_user_model().objects.create_user(email, 'pass')
+    return MotherProfile.objects.create(user=user, full_name=fields.pop('full_name', 'Ada Mother'), **fields)
+
+
+class WritePipelineTests(TestCase):
+    def test_event_is_written_inside_the_changing_transaction(self):
+        with transaction.atomic():
+            mother = make_mother()
+            # Already in the table before commit: audit and data commit together
+            self.assertTrue(ActivityLog.objects.filter(model='MotherProfile', object_id=str(mother.pk), action_type='create').exists())
+
+    def test_rolled_back_change_leaves_no_event(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            make_mother()
+            raise RuntimeError
+        self.assertFalse(ActivityLog.objects.filter(model='MotherProfile').exists())
+
+    def test_events_in_an_audit_block_are_written_in_one_batch_before_it_exits(self):
+        with pipeline.atomic():
+            mother = make_mother()
+            mother.full_name = 'Ada Renamed'
+            mother.save()
+            self.assertFalse(ActivityLog.objects.filter(model='MotherProfile').exists())
+        actions = list(ActivityLog.objects.filter(model='MotherProfile').order_by('id').values_list('action_type', flat=True))
+        self.assertEqual(actions, ['create', 'update'])
+
+    def test_audit_block_issues_a_single_insert(self):
+        table = ActivityLog._meta.db_table
+        with CaptureQueriesContext(connection) as queries, pipeline.atomic():
+            make_mother()
+            make_mother('second@example.com')
+        inserts = [q['sql'] for q in queries if q['sql'].startswith(f'INSERT INTO "{table}"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(ActivityLog.objects.filter(model='MotherProfile').count(), 2)
+
+    def test_failed_audit_block_writes_nothing(self):
+        with self.assertRaises(RuntimeError), pipeline.atomic():
+            make_mother()
+            raise RuntimeError
+        self.assertFalse(ActivityLog.objects.filter(model='MotherProfile').exists())
+
+    def test_rolled_back_savepoint_inside_an_audit_block_keeps_its_events_out(self):
+        with pipeline.atomic():
+            make_mother()
+            with self.assertRaises(RuntimeError), transaction.atomic():
+                make_mother('second@example.com')
+                raise RuntimeError
+        self.assertEqual(ActivityLog.objects.filter(model='MotherProfile', action_type='create').count(), 1)
+
+    def test_events_keep_their_order(self):
+        mother = make_mother()
+        mother.full_name = 'Ada Renamed'
+        mother.save()
+        mother.delete()
+        actions = list(ActivityLog.objects.filter(model='MotherProfile').order_by('id').values_list('action_type', flat=True))
+        self.assertEqual(actions, ['create', 'update', 'delete'])
+
+
+class ChangeTrackingTests(TestCase):
+    def test_loading_records_the_stored_row(self):
+        make_mother()
+        mother = MotherProfile.objects.get()
+        self.assertEqual(mother._audit_original['full_name'], 'Ada Mother')
+        mother.full_name = 'Ada Renamed'
+        self.assertEqual(original_values(mother)['full_name'], 'Ada Mother')
+
+    def test_refresh_does_not_report_changes_made_elsewhere(self):
+        make_mother()
+        mother = MotherProfile.objects.get()
+        MotherProfile.objects.update(full_name='Renamed Elsewhere')
+        mother.refresh_from_db()
+        mother.phone_number = '08012345678'
+        mother.save()
+        log = ActivityLog.objects.get(model='MotherProfile', action_type='update')
+        self.assertEqual(set(log.changes), {'phone_number'})
+
+    def test_update_records_only_the_changed_field(self):
+        make_mother()
+        mother = MotherProfile.objects.get()
+        mother.full_name = 'Ada Renamed'
+        mother.save()
+        log = ActivityLog.objects.get(model='MotherProfile', action_type='update')
+        self.assertEqual(set(log.changes), {'full_name'})
+
+    def test_bulk_created_rows_have_no_stale_snapshot(self):
+        user = get_user_model().objects.create_user('bulk@example.com', 'pass')
+        mother, = MotherProfile.objects.bulk_create([MotherProfile(user=user, full_name='Bulk Mother', member_id='MED-BULK0001')])
+        self.assertEqual(original_values(mother)['id'], mother.pk)
+        mother.full_name = 'Bulk Renamed'
+        mother.save()
+        log = ActivityLog.objects.get(model='MotherProfile', action_type='update')
+        self.assertEqual(set(log.changes), {'full_name'})
+
+    def test_unchanged_save_records_nothing(self):
+        make_mother()
+        MotherProfile.objects.get().save()
+        self.assertFalse(ActivityLog.objects.filter(model='MotherProfile', action_type='update').exists())
+
+
+@override_settings(AUDIT_ARCHIVE_DIR=tempfile.mkdtemp())
+class ArchiveTests(TestCase):
+    month = date(2024, 3, 1)
+
+    def setUp(self):
+        for path in archive.archive_dir().glob('*'):
+            path.unlink()
+        make_mother()
+        ActivityLog.objects.update(action_date=date(2024, 3, 5))
+
+    def test_rearchiving_a_restored_month_writes_no_duplicate(self):
+        first = archive.archive_month(self.month)
+        self.assertFalse(ActivityLog.objects.exists())
+        archive.restore_month(self.month)
+        again = archive.archive_month(self.month)
+        self.assertEqual(again['file'], first['file'])
+        self.assertEqual(list(archive.read_manifest()['archives']), [first['file']])
+        self.assertFalse(ActivityLog.objects.exists())
+
+    def test_rows_added_later_go_to_a_new_part(self):
+        first = archive.archive_month(self.month)
+        archive.restore_month(self.month)
+        make_mother('late@example.com')
+        ActivityLog.objects.filter(id__gt=first['max_id']).update(action_date=date(2024, 3, 9))
+        late = archive.archive_month(self.month)
+        self.assertNotEqual(late['file'], first['file'])
+        self.assertEqual(late['min_id'], first['max_id'] + 1)
+        self.assertEqual(archive.restore_month(self.month), first['rows'] + late['rows'])
+
+
+class RollupTests(TestCase):
+    def test_events_inside_the_lag_are_not_counted_or_passed(self):
+        make_mother()
+        make_mother('second@example.com')
+        first, second = ActivityLog.objects.order_by('id').values_list('id', flat=True)
+        ActivityLog.objects.filter(id=second).update(action_datetime=timezone.now() - timedelta(hours=1))
+
+        # The lower id is still inside the lag: neither event may be folded yet
+        stats = rollups.update_rollups(lag_seconds=300)
+        self.assertEqual((stats['events'], rollups.watermark()), (0, 0))
+
+        ActivityLog.objects.filter(id=first).update(action_datetime=timezone.now() - timedelta(hours=1))
+        stats = rollups.update_rollups(lag_seconds=300)
+        self.assertEqual((stats['events'], rollups.watermark()), (2, second))
+        self.assertEqual(sum(ActivityDailyRollup.objects.values_list('count', flat=True)), 2)
+
+
+class ExportPermissionTests(TestCase):
+    urls = ('audit_activity_report', 'audit_activity_report_export', 'audit_export_logs')
+
+    def setUp(self):
+        self.admin = get_user_model().objects.create_user('admin@example.com', 'pass', role='ADMIN')
+
+    def statuses(self):
+        self.client.force_login(self.admin)
+        return [self.client.get(reverse(name)).status_code for name in self.urls]
+
+    def test_admin_role_alone_is_not_enough(self):
+        self.assertEqual(self.statuses(), [403, 403, 403])
+
+    def test_view_permission_grants_access(self):
+        self.admin.user_permissions.add(Permission.objects.get(content_type__app_label='audit', codename='view_activitylog'))
+        self.assertEqual(self.statuses(), [200, 200, 200])
+
+    def test_superuser_has_access(self):
+        self.admin.is_superuser = True
+        self.admin.save()
+        self.assertEqual(self.statuses(), [200, 200, 200])
+
+    def test_events_committed_below_the_watermark_are_counted_later(self):
+        for n in range(3):
+            make_mother(f'mother{n}@example.com')
+        ActivityLog.objects.update(action_datetime=timezone.now() - timedelta(hours=1))
+        first, late, last = ActivityLog.objects.order_by('id')
+        # The middle event belongs to a transaction that has not committed yet
+        ActivityLog.objects.filter(pk=late.pk).delete()
+        stats = rollups.update_rollups(lag_seconds=300)
+        self.assertEqual((stats['events'], rollups.watermark()), (2, last.pk))
+        self.assertEqual(ActivityLog.objects.filter(rollups.uncounted()).count(), 0)
+
+        late.save(force_insert=True)
+        self.assertEqual(list(ActivityLog.objects.filter(rollups.uncounted()).values_list('pk', flat=True)), [late.pk])
+        stats = rollups.update_rollups(lag_seconds=300)
+        self.assertEqual(stats['events'], 1)
+        self.assertEqual(sum(ActivityDailyRollup.objects.values_list('count', flat=True)), 3)
+        self.assertEqual(RollupWatermark.objects.get().gaps, [])
+
+        # Nothing is counted twice on later runs
+        self.assertEqual(rollups.update_rollups(lag_seconds=300)['events'], 0)
+
+    def test_gaps_expire(self):
+        make_mother()
+        make_mother('second@example.com')
+        ActivityLog.objects.update(action_datetime=timezone.now() - timedelta(hours=1))
+        ActivityLog.objects.order_by('id').first().delete()
+        rollups.update_rollups(lag_seconds=0)
+        self.assertEqual(len(RollupWatermark.objects.get().gaps), 1)
+        with override_settings(AUDIT_ROLLUP_GAP_SECONDS=0):
+            rollups.update_rollups(lag_seconds=0)
+        self.assertEqual(RollupWatermark.objects.get().gaps, [])
@@ -0,0 +1,117 @@
+import copy
+
+from django.db.models.signals import post_save
+
+
+def snapshot(instance) -> dict:
+    """Concrete field values (by attname) currently loaded on ``instance``."""
+    # Only values already on the instance: touching a deferred field would cost a query
+    values = {}
+    loaded = instance.__dict__
+    for field in instance._meta.concrete_fields:
+        if field.attname in loaded:
+            value = loaded[field.attname]
+            # JSON/list values can be mutated in place; keep our own copy
+            values[field.attname] = copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+    return values
+
+
+def _loaded_values(field_names, values) -> dict:
+    # Same copying rule as snapshot(), straight from the row from_db() received
+    return {
+        name: copy.deepcopy(value) if isinstance(value, (dict, list)) else value
+        for name, value in zip(field_names, values)
+    }
+
+
+def _refresh(sender, instance, update_fields=None, **kwargs):
+    original = instance.__dict__.get('_audit_original')
+    if update_fields and original is not None:
+        fresh = snapshot(instance)
+        for field in instance._meta.concrete_fields:
+            if field.name in update_fields and field.attname in fresh:
+                original[field.attname] = fresh[field.attname]
+        return
+    instance._audit_original = snapshot(instance)
+
+
+def track(model):
+    """Remember the field values each ``model`` instance was loaded with (no extra queries later).
+
+    ``model.from_db`` is wrapped to record the row it was built from, so objects built
+    in memory (including ``bulk_create`` input) never carry a snapshot and are read
+    back once on their next save instead. ``refresh_from_db`` drops the snapshot, as
+    the instance then holds values someone else may have written.
+    """
+    if '_audit_tracked' in model.__dict__:
+        return
+    own_from_db = model.__dict__.get('from_db')
+    own_refresh = model.__dict__.get('refresh_from_db')
+
+    def from_db(cls, db, field_names, values):
+        if own_from_db is not None:
+            instance = own_from_db.__func__(cls, db, field_names, values)
+        else:
+            instance = super(model, cls).from_db(db, field_names, values)
+        instance._audit_original = _loaded_values(field_names, values)
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        if own_refresh is not None:
+            own_refresh(self, *args, **kwargs)
+        else:
+            super(model, self).refresh_from_db(*args, **kwargs)
+        self.__dict__.pop('_audit_original', None)
+
+    model.from_db = classmethod(from_db)
+    model.refresh_from_db = refresh_from_db
+    model._audit_tracked = True
+    post_save.connect(_refresh, sender=model, weak=False, dispatch_uid=f'audit_track_save_{model._meta.label_lower}')
+
+
+def original_values(instance) -> dict:
+    """Field values (by attname) as last loaded from or saved to the database.
+
+    Empty for unsaved objects. Instances that carry a primary key but were not loaded
+    (``Model(pk=...)``, ``bulk_create`` results) or were refreshed fall back to one query.
+    """
+    if getattr(instance, 'pk', None) is None:
+        return {}
+    original = instance.__dict__.get('_audit_original')
+    if original is not None and not instance._state.adding:
+        return original
+    row = type(instance)._default_manager.filter(pk=instance.pk).values(*[f.attname for f in instance._meta.concrete_fields]).first()
+    return row or {}
+
+
+def _same_stored_value(field, old, new) -> bool:
+    # A row read back from the database holds stored forms (e.g. '' for an empty
+    # FieldFile), so compare what each value would be saved as
+    try:
+        return field.get_prep_value(old) == field.get_prep_value(new)
+    except Exception:
+        return False
+
+
+def changed_fields(instance, fields=None, original: dict | None = None) -> dict:
+    """``{field_name: (old, new)}`` for concrete fields whose value differs from the original.
+
+    Limit the comparison with ``fields`` (e.g. a save's ``update_fields``). Fields
+    that were never loaded (deferred) are skipped. Pass ``original`` when it was
+    already fetched with :func:`original_values`.
+    """
+    if original is None:
+        original = original_values(instance)
+    if not original:
+        return {}
+    loaded = instance.__dict__
+    changes = {}
+    for field in instance._meta.concrete_fields:
+        if fields is not None and field.name not in fields and field.attname not in fields:
+            continue
+        if field.attname not in original or field.attname not in loaded:
+            continue
+        old, new = original[field.attname], loaded[field.attname]
+        if old != new and not _same_stored_value(field, old, new):
+            changes[field.name] = (old, new)
+    return changes
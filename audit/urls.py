@@ -0,0 +1,8 @@
+from django.urls import path
+from . import views
+
+urlpatterns = [
+    path('activity/', views.activity_report, name='audit_activity_report'),
+    path('activity/export/', views.export_activity_report_csv, name='audit_activity_report_export'),
+    path('logs/export/', views.export_activity_logs, name='audit_export_logs'),
+]
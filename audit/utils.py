@@ -1,36 +1,159 @@
-from typing import Optional
+from typing import Iterable, Optional
 from django.apps import apps
+from django.db.models.signals import post_migrate
 from django.utils import timezone
 
 from .models import ActivityLog
-from .middleware import get_current_user
+from .middleware import get_current_user, get_request_cache
 
 
-def log_completion(instance, description: Optional[str] = None):
-    """Utility to log an explicit completion event from views/services when needed."""
-    ct = apps.get_model('contenttypes', 'ContentType').objects.get_for_model(instance.__class__)
-    user = get_current_user()
-    staff_name = None
-    staff_id = None
-    hospital_id = None
+_CURRENT_USER = object()
+
+# model class -> ContentType id, filled on first use; ids never change while the process runs
+_content_type_ids = {}
+
+
+def content_type_id_for(model) -> int:
+    try:
+        return _content_type_ids[model]
+    except KeyError:
+        ct = apps.get_model('contenttypes', 'ContentType').objects.get_for_model(model)
+        _content_type_ids[model] = ct.pk
+        return ct.pk
+
+
+def _clear_content_type_ids(**kwargs):
+    # Content types can be recreated by migrate/flush (e.g. between test runs)
+    _content_type_ids.clear()
+
+
+post_migrate.connect(_clear_content_type_ids, dispatch_uid='audit_clear_content_type_ids')
+
+
+def staff_context(user) -> dict:
+    """Staff name/ID/clinic stamped on ActivityLog rows; empty for patients and anonymous users."""
     if user and hasattr(user, 'role') and user.role != 'PATIENT':
-        staff_name = f"{user.first_name} {user.last_name}".strip() or user.email
-        staff_id = getattr(user, 'staff_id', None)
-        hospital_id = getattr(user, 'hospital_clinic_id', None)
+        return {
+            'staff_name': f"{user.first_name} {user.last_name}".strip() or user.email,
+            'staff_id': getattr(user, 'staff_id', None),
+            'hospital_clinic_id': getattr(user, 'hospital_clinic_id', None),
+        }
+    return {'staff_name': None, 'staff_id': None, 'hospital_clinic_id': None}
 
-    now = timezone.localtime()
-    ActivityLog.objects.create(
-        action_type='complete',
+
+def _staff_context_cached(user) -> dict:
+    # The request user's context is built once per request by way of CurrentUserMiddleware
+    cache = get_request_cache()
+    if cache is None or user is not get_current_user():
+        return staff_context(user)
+    if 'staff_context' not in cache:
+        cache['staff_context'] = staff_context(user)
+    return cache['staff_context']
+
+
+def extract_domain_snapshot(instance):
+    """Safely extract Mother/Baby/Vaccine context and dates from known models.
+
+    Works for:
+    - immunization.ImmunizationSchedule (direct fields)
+    - immunization.VaccinationEventLog (via .schedule)
+    - patients.BabyProfile (via mother)
+    - patients.MotherProfile
+    Returns a dict for ActivityLog.create(**snapshot).
+    """
+    snap = {}
+    try:
+        # VaccinationEventLog → schedule
+        if instance.__class__.__name__ == 'VaccinationEventLog' and hasattr(instance, 'schedule') and instance.schedule:
+            sched = instance.schedule
+            instance = sched  # reuse handling below
+        # ImmunizationSchedule
+        if instance.__class__.__name__ == 'ImmunizationSchedule':
+            baby = getattr(instance, 'baby', None)
+            if baby:
+                snap['baby_name'] = getattr(baby, 'name', None)
+                snap['baby_hospital_id'] = getattr(baby, 'hospital_id', None)
+                mother = getattr(baby, 'mother', None)
+                if mother:
+                    snap['mother_name'] = getattr(mother, 'full_name', None)
+                    snap['mother_member_id'] = getattr(mother, 'member_id', None)
+            snap['vaccine_name'] = getattr(instance, 'vaccine_name', None)
+            snap['scheduled_date'] = getattr(instance, 'scheduled_date', None)
+            snap['completed_date'] = getattr(instance, 'date_completed', None)
+            return snap
+        # BabyProfile
+        if instance.__class__.__name__ == 'BabyProfile':
+            snap['baby_name'] = getattr(instance, 'name', None)
+            snap['baby_hospital_id'] = getattr(instance, 'hospital_id', None)
+            mother = getattr(instance, 'mother', None)
+            if mother:
+                snap['mother_name'] = getattr(mother, 'full_name', None)
+                snap['mother_member_id'] = getattr(mother, 'member_id', None)
+            return snap
+        # MotherProfile
+        if instance.__class__.__name__ == 'MotherProfile':
+            snap['mother_name'] = getattr(instance, 'full_name', None)
+            snap['mother_member_id'] = getattr(instance, 'member_id', None)
+            return snap
+    except Exception:
+        # Avoid breaking logging if relations are missing
+        pass
+    return snap
+
+
+def build_activity(action_type: str, instance, description: Optional[str] = None, user=_CURRENT_USER, content_type=None, now=None, changes: Optional[dict] = None) -> ActivityLog:
+    """Unsaved ActivityLog for ``instance``, stamped with the acting user and domain snapshot.
+
+    ``user`` defaults to the request user from the audit middleware. The content
+    type comes from a per-process cache unless ``content_type`` is given; pass
+    ``now`` to stamp many rows with the same time.
+    ``changes`` is an already compacted diff (see audit.history.compact_changes).
+    """
+    if user is _CURRENT_USER:
+        user = get_current_user()
+    now = now or timezone.localtime()
+    log = ActivityLog(
+        action_type=action_type,
         module=instance._meta.app_label,
         model=instance.__class__.__name__,
         action_description=description,
-        content_type=ct,
+        content_type_id=content_type.pk if content_type is not None else content_type_id_for(instance.__class__),
         object_id=str(getattr(instance, 'pk', '')),
         user=user if getattr(user, 'is_authenticated', False) else None,
-        staff_name=staff_name,
-        staff_id=staff_id,
-        hospital_clinic_id=hospital_id,
         action_datetime=now,
         action_date=now.date(),
         action_time=now.time(),
-    )
\ No newline at end of file
+        changes=changes or None,
+        **_staff_context_cached(user),
+    )
+    # Merge domain snapshot fields
+    for field, value in extract_domain_snapshot(instance).items():
+        setattr(log, field, value)
+    return log
+
+
+def bulk_log_activity(action_type: str, instances: Iterable, description: Optional[str] = None, user=_CURRENT_USER, batch_size: int = 500, changes=None) -> int:
+    """Write one ActivityLog per instance with ``bulk_create``; for set-based writes that bypass signals.
+
+    Related objects used by the snapshot (baby, mother) should already be loaded
+    via ``select_related``. ``changes`` is the diff shared by every row (e.g. the
+    UPDATE's status change), or a callable returning each instance's own diff.
+    Returns the number of rows written.
+    """
+    instances = list(instances)
+    if not instances:
+        return 0
+    if user is _CURRENT_USER:
+        user = get_current_user()
+    now = timezone.localtime()
+    logs = [
+        build_activity(action_type, obj, description, user=user, now=now, changes=changes(obj) if callable(changes) else changes)
+        for obj in instances
+    ]
+    ActivityLog.objects.bulk_create(logs, batch_size=batch_size)
+    return len(logs)
+
+
+def log_completion(instance, description: Optional[str] = None):
+    """Utility to log an explicit completion event from views/services when needed."""
+    build_activity('complete', instance, description).save()
@@ -0,0 +1,140 @@
+import csv
+from datetime import date
+from functools import wraps
+
+from django.db.models import Max, Sum
+from django.http import HttpResponse, HttpResponseBadRequest, HttpResponseForbidden, StreamingHttpResponse
+from django.shortcuts import render
+from django.utils import timezone
+
+from accounts.decorators import role_required
+from .export import FORMATS, export_filename, export_queryset, stream_export
+from .models import ActivityDailyRollup, ActivityLog, RollupWatermark
+from .rollups import WATERMARK
+
+
+# Report grouping -> rollup columns it is broken down by
+GROUPINGS = {
+    'facility': ('hospital_clinic_id', 'module', 'model', 'action_type'),
+    'staff': ('hospital_clinic_id', 'staff_id', 'module', 'model', 'action_type'),
+    'day': ('action_date', 'hospital_clinic_id', 'module', 'model', 'action_type'),
+}
+HEADERS = {
+    'action_date': 'Date',
+    'hospital_clinic_id': 'Facility',
+    'staff_id': 'Staff ID',
+    'staff_name': 'Staff Name',
+    'module': 'Module',
+    'model': 'Model',
+    'action_type': 'Action',
+    'total': 'Count',
+}
+
+
+def audit_viewer_required(view_func):
+    """Same rule as ActivityLogAdmin: superusers or users granted ``audit.view_activitylog``."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        user = request.user
+        if not (user.is_superuser or user.has_perm('audit.view_activitylog')):
+            return HttpResponseForbidden("You do not have permission to view activity logs")
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def _parse_date(value, default):
+    try:
+        return date.fromisoformat(value) if value else default
+    except ValueError:
+        return default
+
+
+def _report(request):
+    """Filters from the query string and the matching rollup totals (never touches raw events)."""
+    today = timezone.localdate()
+    start = _parse_date(request.GET.get('start'), today.replace(day=1))
+    end = _parse_date(request.GET.get('end'), today)
+    group = request.GET.get('group') if request.GET.get('group') in GROUPINGS else 'facility'
+    filters = {
+        'facility': (request.GET.get('facility') or '').strip(),
+        'staff': (request.GET.get('staff') or '').strip(),
+        'module': (request.GET.get('module') or '').strip(),
+        'action': (request.GET.get('action') or '').strip(),
+    }
+    qs = ActivityDailyRollup.objects.filter(action_date__gte=start, action_date__lte=end)
+    if filters['facility']:
+        qs = qs.filter(hospital_clinic_id=filters['facility'])
+    if filters['staff']:
+        qs = qs.filter(staff_id=filters['staff'])
+    if filters['module']:
+        qs = qs.filter(module=filters['module'])
+    if filters['action']:
+        qs = qs.filter(action_type=filters['action'])
+    columns = GROUPINGS[group]
+    rows = qs.order_by().values(*columns).annotate(total=Sum('count'))
+    if group == 'staff':
+        rows = rows.annotate(staff_name=Max('staff_name'))
+        columns = columns[:2] + ('staff_name',) + columns[2:]
+    rows = rows.order_by(*columns)
+    return {
+        'start': start,
+        'end': end,
+        'group': group,
+        'filters': filters,
+        'columns': columns + ('total',),
+        'rows': rows,
+    }
+
+
+@role_required('ADMIN')
+@audit_viewer_required
+def activity_report(request):
+    context = _report(request)
+    context.update({
+        'headers': [HEADERS[column] for column in context['columns']],
+        'table': [[row[column] for column in context['columns']] for row in context['rows']],
+        'grand_total': sum(row['total'] for row in context['rows']),
+        'groupings': list(GROUPINGS),
+        'actions': ActivityLog.ACTION_CHOICES,
+        'watermark': RollupWatermark.objects.filter(name=WATERMARK).first(),
+    })
+    return render(request, 'audit/activity_report.html', context)
+
+
+@role_required('ADMIN')
+@audit_viewer_required
+def export_activity_report_csv(request):
+    context = _report(request)
+    response = HttpResponse(content_type='text/csv')
+    response['Content-Disposition'] = (
+        f'attachment; filename="activity-{context["group"]}-{context["start"]:%Y%m%d}-{context["end"]:%Y%m%d}.csv"'
+    )
+    writer = csv.writer(response)
+    writer.writerow([HEADERS[column] for column in context['columns']])
+    for row in context['rows']:
+        writer.writerow([row[column] for column in context['columns']])
+    return response
+
+
+@role_required('ADMIN')
+@audit_viewer_required
+def export_activity_logs(request):
+    """Full ActivityLog dump for a date range/facility, streamed as CSV or NDJSON (``?gzip=1``)."""
+    fmt = request.GET.get('format') or 'csv'
+    if fmt not in FORMATS:
+        return HttpResponseBadRequest("format must be csv or ndjson")
+    try:
+        start = date.fromisoformat(request.GET['start']) if request.GET.get('start') else None
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else None
+    except ValueError:
+        return HttpResponseBadRequest("start/end must be YYYY-MM-DD")
+    facility = (request.GET.get('facility') or '').strip() or None
+    gzip = request.GET.get('gzip') in ('1', 'true', 'yes')
+    response = StreamingHttpResponse(
+        stream_export(export_queryset(start, end, facility), fmt=fmt, gzip=gzip),
+        content_type='application/gzip' if gzip else FORMATS[fmt][0],
+    )
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(fmt, gzip, start, end, facility)}"'
+    # Ask nginx to pass chunks through instead of buffering the whole file
+    response['X-Accel-Buffering'] = 'no'
+    return response
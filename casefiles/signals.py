@@ -9,6 +9,7 @@ from .models import (
     BabyCaseFile,
     BabyCaseActivityLog,
 )
+from .timeline import immunization_activity
 
 
 @receiver(post_save, sender=BabyProfile)
@@ -41,30 +42,4 @@ def log_immunization_to_baby_casefile(sender, instance: ImmunizationSchedule, **
     except BabyCaseFile.DoesNotExist:
         return
 
-    status_action = {
-        'DUE': 'Immunization scheduled',
-        'DONE': 'Immunization completed',
-        'MISSED': 'Immunization missed',
-    }.get(instance.status, 'Immunization updated')
-
-    who = instance.administered_by or instance.approved_by
-    who_label = getattr(who, 'email', None) or getattr(who, 'full_name', '') or 'System'
-
-    note_bits = []
-    if instance.rescheduled_for:
-        note_bits.append(f"Rescheduled for {instance.rescheduled_for:%Y-%m-%d}")
-    if instance.batch_number:
-        note_bits.append(f"Batch {instance.batch_number}")
-    if instance.manufacturer:
-        note_bits.append(instance.manufacturer)
-    if instance.administration_site:
-        note_bits.append(f"Site {instance.administration_site}")
-    if instance.post_observation_notes:
-        note_bits.append("Observation notes added")
-
-    BabyCaseActivityLog.objects.create(
-        case_file=case_file,
-        user=who,
-        action=f"{status_action}: {instance.vaccine_name}",
-        notes=f"On {instance.scheduled_date:%Y-%m-%d}. " + ("; ".join(note_bits) if note_bits else "")
-    )
\ No newline at end of file
+    immunization_activity(case_file, instance).save()
@@ -0,0 +1,31 @@
+from .models import BabyCaseActivityLog
+
+
+def immunization_activity(case_file, instance) -> BabyCaseActivityLog:
+    """Unsaved timeline entry describing the current state of an ImmunizationSchedule."""
+    status_action = {
+        'DUE': 'Immunization scheduled',
+        'DONE': 'Immunization completed',
+        'MISSED': 'Immunization missed',
+    }.get(instance.status, 'Immunization updated')
+
+    who = instance.administered_by or instance.approved_by
+
+    note_bits = []
+    if instance.rescheduled_for:
+        note_bits.append(f"Rescheduled for {instance.rescheduled_for:%Y-%m-%d}")
+    if instance.batch_number:
+        note_bits.append(f"Batch {instance.batch_number}")
+    if instance.manufacturer:
+        note_bits.append(instance.manufacturer)
+    if instance.administration_site:
+        note_bits.append(f"Site {instance.administration_site}")
+    if instance.post_observation_notes:
+        note_bits.append("Observation notes added")
+
+    return BabyCaseActivityLog(
+        case_file=case_file,
+        user=who,
+        action=f"{status_action}: {instance.vaccine_name}",
+        notes=f"On {instance.scheduled_date:%Y-%m-%d}. " + ("; ".join(note_bits) if note_bits else "")
+    )
@@ -1,6 +1,6 @@
 from django.contrib import admin
 # Removed external RichTextAdmin import; using local definition below
-from .models import ImmunizationMaster, ImmunizationSchedule, ImmunizationApproval, VaccinationEventLog, AuditLog, ImmunizationRuleConfig, ImmunizationCertificate
+from .models import ImmunizationMaster, ImmunizationSchedule, ImmunizationApproval, VaccinationEventLog, AuditLog, ImmunizationRuleConfig, ImmunizationCertificate, ImmunizationSummary
 from django.contrib import messages
 from django.shortcuts import render, redirect
 
@@ -172,3 +172,16 @@ class ImmunizationRuleConfigAdmin(admin.ModelAdmin):
 class ImmunizationCertificateAdmin(admin.ModelAdmin):
     list_display = ('baby', 'generated_at', 'generated_by')
     search_fields = ('baby__name', 'generated_by__username')
+
+
+@admin.register(ImmunizationSummary)
+class ImmunizationSummaryAdmin(admin.ModelAdmin):
+    list_display = ('baby', 'due_count', 'done_count', 'missed_count', 'next_due_date', 'next_due_vaccine', 'last_completed_date', 'is_complete')
+    list_filter = ('is_complete',)
+    search_fields = ('baby__name', 'baby__hospital_id')
+    list_select_related = ('baby',)
+    # Derived from ImmunizationSchedule; use `manage.py rebuild_immunization_summaries` to recompute
+    readonly_fields = list_display + ('updated_at',)
+
+    def has_add_permission(self, request):
+        return False
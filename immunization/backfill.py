@@ -0,0 +1,170 @@
+"""Set-based backfill of ImmunizationSchedule entries from the active master list.
+
+Babies are processed in primary-key chunks. For each chunk, the existing
+(baby, vaccine) entries are loaded with one query and diffed against the masters
+in memory. The chunk is then written with ``bulk_create``/``bulk_update`` in its
+own transaction, so a long run never holds locks for more than one chunk and can
+be resumed from the last finished baby id. Chunks may be spread over a process
+pool; each worker opens its own database connection.
+"""
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.conf import settings
+from django.db import connections
+
+from audit.history import compact_changes
+from audit.pipeline import atomic as audit_atomic
+from audit.utils import bulk_log_activity
+from patients.models import BabyProfile
+
+from .due_dates import active_masters, due_dates
+from .models import ImmunizationSchedule
+from .services import record_created
+from .summary import deferred_refresh, refresh_summaries
+
+
+COUNTERS = ('babies', 'created', 'updated', 'deleted', 'skipped')
+
+
+def chunk_bounds(start_id: int = 0, chunk_size: int = 1000, baby_id: int | None = None) -> list[tuple[int, int]]:
+    """``(after_id, last_id)`` ranges of at most ``chunk_size`` babies, in id order."""
+    qs = BabyProfile.objects.filter(pk__gt=start_id).order_by('pk')
+    if baby_id is not None:
+        qs = qs.filter(pk=baby_id)
+    bounds = []
+    after = start_id
+    ids = list(qs.values_list('pk', flat=True))
+    for index in range(0, len(ids), chunk_size):
+        last = ids[min(index + chunk_size, len(ids)) - 1]
+        bounds.append((after, last))
+        after = last
+    return bounds
+
+
+def _plan(babies, masters, existing, recreate: bool):
+    """Diff one chunk: returns (to_create, to_update, delete_ids, skipped)."""
+    by_baby = {}
+    delete_ids = []
+    for row in existing:
+        if recreate and row['status'] == 'DUE':
+            # Only DUE entries are regenerated; DONE/MISSED history stays
+            delete_ids.append(row['id'])
+            continue
+        by_baby.setdefault(row['baby_id'], {}).setdefault(row['vaccine_name'], []).append(row)
+
+    to_create, to_update, skipped = [], [], 0
+    for baby, dates in zip(babies, due_dates([baby.date_of_birth for baby in babies], masters)):
+        by_vaccine = by_baby.get(baby.pk, {})
+        for master, due_date in zip(masters, dates):
+            candidates = by_vaccine.get(master.name, [])
+            # Prefer a single updatable DUE schedule if present
+            target = next((row for row in candidates if row['status'] == 'DUE'), None)
+            if target is None and candidates:
+                # If only DONE/MISSED exist, we do not create another schedule
+                skipped += 1
+            elif target is None:
+                to_create.append(ImmunizationSchedule(
+                    baby=baby,
+                    vaccine_name=master.name,
+                    scheduled_date=due_date,
+                    status='DUE',
+                    notes=master.description,
+                ))
+            else:
+                changes = {}
+                if target['scheduled_date'] != due_date:
+                    changes['scheduled_date'] = (target['scheduled_date'], due_date)
+                if (target['notes'] or '') != master.description:
+                    changes['notes'] = (target['notes'], master.description)
+                if not changes:
+                    skipped += 1
+                    continue
+                sched = ImmunizationSchedule(
+                    pk=target['id'], baby=baby, vaccine_name=master.name, status='DUE',
+                    scheduled_date=due_date, notes=master.description,
+                )
+                sched._backfill_changes = changes
+                to_update.append(sched)
+    return to_create, to_update, delete_ids, skipped
+
+
+def backfill_chunk(after_id: int, last_id: int, recreate: bool = False, dry_run: bool = False,
+                   notify: bool = False, baby_id: int | None = None) -> dict:
+    """Backfill the babies with ``after_id < id <= last_id`` in one transaction."""
+    masters = list(active_masters())
+    babies = BabyProfile.objects.select_related('mother').filter(pk__gt=after_id, pk__lte=last_id).order_by('pk')
+    if baby_id is not None:
+        babies = babies.filter(pk=baby_id)
+    babies = list(babies)
+    existing = list(
+        ImmunizationSchedule.objects.filter(baby_id__in=[baby.pk for baby in babies])
+        .values('id', 'baby_id', 'vaccine_name', 'status', 'scheduled_date', 'notes')
+    )
+    to_create, to_update, delete_ids, skipped = _plan(babies, masters, existing, recreate)
+    stats = {
+        'babies': len(babies), 'created': len(to_create), 'updated': len(to_update),
+        'deleted': len(delete_ids), 'skipped': skipped, 'last_id': last_id,
+    }
+    if dry_run:
+        return stats
+    batch_size = int(getattr(settings, 'IMMUNIZATION_BULK_BATCH_SIZE', 500))
+    # Per-row signals of the delete below are batched: audit rows into one INSERT, summaries into one refresh
+    with audit_atomic(), deferred_refresh():
+        if delete_ids:
+            # The collector cascades to event logs; the prefetch feeds the audit snapshots
+            ImmunizationSchedule.objects.filter(pk__in=delete_ids).prefetch_related('baby__mother').delete()
+        if to_update:
+            ImmunizationSchedule.objects.bulk_update(to_update, ['scheduled_date', 'notes'], batch_size=batch_size)
+            bulk_log_activity('update', to_update, 'Backfilled from master schedule', batch_size=batch_size,
+                              changes=lambda sched: compact_changes(sched._backfill_changes))
+        if to_create:
+            ImmunizationSchedule.objects.bulk_create(to_create, batch_size=batch_size)
+            record_created(to_create, 'Backfilled from master schedule', notify=notify)
+        if to_update or delete_ids:
+            refresh_summaries([baby.pk for baby in babies])
+    return stats
+
+
+def _init_worker():
+    # Fresh connections per worker (the parent closed its own before forking)
+    django.setup()
+    connections.close_all()
+
+
+def backfill_schedules(start_id: int = 0, chunk_size: int = 1000, workers: int = 1, on_chunk=None, **options) -> dict:
+    """Run :func:`backfill_chunk` over every baby after ``start_id``.
+
+    ``on_chunk(totals)`` is called after each finished chunk. ``totals['last_id']``
+    only advances past chunks that are all done, so it is always safe to resume from.
+    """
+    totals = dict.fromkeys(COUNTERS, 0)
+    totals.update(last_id=start_id, started=time.monotonic())
+    bounds = chunk_bounds(start_id, chunk_size, options.get('baby_id'))
+    if not bounds:
+        return totals
+
+    def finished(stats, done, pending):
+        for key in COUNTERS:
+            totals[key] += stats[key]
+        done.add(stats['last_id'])
+        # Contiguous prefix of finished chunks
+        while pending and pending[0][1] in done:
+            totals['last_id'] = pending.pop(0)[1]
+        if on_chunk is not None:
+            on_chunk(totals)
+
+    pending = list(bounds)
+    done = set()
+    if workers <= 1:
+        for after_id, last_id in bounds:
+            finished(backfill_chunk(after_id, last_id, **options), done, pending)
+        return totals
+
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = [pool.submit(backfill_chunk, after_id, last_id, **options) for after_id, last_id in bounds]
+        for future in as_completed(futures):
+            finished(future.result(), done, pending)
+    return totals
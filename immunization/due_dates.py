@@ -0,0 +1,91 @@
+"""Due-date engine shared by schedule generation, the staff views and the backfill.
+
+Intervals are applied with ``relativedelta``, so "1 month" after 31 January is
+the end of February rather than 30 days later (2 March).
+The active master list is compiled once per process and reused; it is dropped
+when an ``ImmunizationMaster`` is saved or deleted in this process, and at the
+latest after ``IMMUNIZATION_MASTER_CACHE_TTL`` seconds (for changes made in
+other processes).
+"""
+import time
+from dataclasses import dataclass
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from django.conf import settings
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import ImmunizationMaster
+
+
+_UNITS = {'days': 'days', 'weeks': 'weeks', 'months': 'months'}
+
+
+def interval_offset(interval_value: int, interval_unit: str) -> relativedelta:
+    """Offset from the date of birth; unknown units mean "at birth"."""
+    unit = _UNITS.get(interval_unit)
+    return relativedelta(**{unit: interval_value}) if unit else relativedelta()
+
+
+@dataclass(frozen=True)
+class CompiledMaster:
+    id: int
+    name: str
+    description: str
+    offset: relativedelta
+
+    def due(self, dob: date) -> date:
+        return dob + self.offset
+
+
+def compile_master(master) -> CompiledMaster:
+    if isinstance(master, CompiledMaster):
+        return master
+    return CompiledMaster(
+        id=master.pk,
+        name=master.name,
+        description=master.description or '',
+        offset=interval_offset(master.interval_value, master.interval_unit),
+    )
+
+
+_cache = {'masters': None, 'loaded_at': 0.0}
+
+
+def active_masters() -> tuple[CompiledMaster, ...]:
+    """Active masters in primary-key order, compiled; cached per process."""
+    ttl = float(getattr(settings, 'IMMUNIZATION_MASTER_CACHE_TTL', 300))
+    masters = _cache['masters']
+    if masters is None or time.monotonic() - _cache['loaded_at'] > ttl:
+        masters = tuple(compile_master(m) for m in ImmunizationMaster.objects.filter(is_active=True).order_by('pk'))
+        _cache['masters'], _cache['loaded_at'] = masters, time.monotonic()
+    return masters
+
+
+@receiver([post_save, post_delete], sender=ImmunizationMaster, dispatch_uid='immunization_master_cache_invalidate')
+def invalidate_masters(**kwargs):
+    _cache['masters'] = None
+
+
+def due_date(dob: date, master) -> date:
+    """Due date of one (date of birth, master) pair; ``master`` may be a model or CompiledMaster."""
+    return compile_master(master).due(dob)
+
+
+def due_dates(dobs, masters=None) -> list[list[date]]:
+    """Due dates for many babies at once: one row per date of birth, one column per master.
+
+    Each distinct date of birth is computed once, so large backfills (where many
+    babies share a birthday) cost far fewer date operations than babies x masters.
+    Rows are shared between equal dates of birth; do not modify them.
+    """
+    compiled = active_masters() if masters is None else [compile_master(m) for m in masters]
+    rows = {}
+    result = []
+    for dob in dobs:
+        row = rows.get(dob)
+        if row is None:
+            row = rows[dob] = [m.due(dob) for m in compiled]
+        result.append(row)
+    return result
@@ -1,9 +1,12 @@
+import time
+from pathlib import Path
+
 from django.core.management.base import BaseCommand, CommandError
-from django.db import transaction
-from datetime import timedelta
+from django.db import connection
 
 from patients.models import BabyProfile
-from immunization.models import ImmunizationMaster, ImmunizationSchedule
+from immunization.backfill import backfill_schedules
+from immunization.due_dates import active_masters
 
 
 class Command(BaseCommand):
@@ -32,116 +35,74 @@ class Command(BaseCommand):
                 "from the master list. DONE/MISSED schedules are preserved."
             ),
         )
-
-    def _due_date(self, dob, master: ImmunizationMaster):
-        if master.interval_unit == "days":
-            return dob + timedelta(days=master.interval_value)
-        elif master.interval_unit == "weeks":
-            return dob + timedelta(weeks=master.interval_value)
-        elif master.interval_unit == "months":
-            # Approximate months as 30 days to match signals implementation
-            return dob + timedelta(days=master.interval_value * 30)
-        # Fallback
-        return dob
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Babies per transaction.")
+        parser.add_argument("--start-id", type=int, default=None, help="Resume after this BabyProfile id.")
+        parser.add_argument(
+            "--checkpoint",
+            help="File holding the last finished baby id; read on start, rewritten after every chunk.",
+        )
+        parser.add_argument("--workers", type=int, default=1, help="Process chunks in this many worker processes.")
+        parser.add_argument(
+            "--notify",
+            action="store_true",
+            help="Send each mother one 'schedule created' message for the new entries.",
+        )
 
     def handle(self, *args, **options):
         baby_id = options.get("baby_id")
         dry_run = options.get("dry_run")
         recreate = options.get("recreate")
-
-        masters = list(ImmunizationMaster.objects.filter(is_active=True))
+        workers = max(1, options.get("workers") or 1)
+        if workers > 1 and connection.vendor == "sqlite":
+            # SQLite allows one writer at a time; parallel chunks would fail with "database is locked"
+            self.stdout.write(self.style.WARNING("SQLite does not support concurrent writers; using 1 worker."))
+            workers = 1
+
+        # Same engine as registration and the staff views, so dates match exactly
+        masters = active_masters()
         if not masters:
             raise CommandError("No active ImmunizationMaster entries found.")
+        if baby_id and not BabyProfile.objects.filter(id=baby_id).exists():
+            raise CommandError(f"BabyProfile with id={baby_id} not found.")
 
-        babies_qs = BabyProfile.objects.all()
-        if baby_id:
-            babies_qs = babies_qs.filter(id=baby_id)
-            if not babies_qs.exists():
-                raise CommandError(f"BabyProfile with id={baby_id} not found.")
-
-        total_created = 0
-        total_updated = 0
-        total_skipped = 0
-        total_deleted = 0
+        checkpoint = Path(options["checkpoint"]) if options.get("checkpoint") else None
+        start_id = options.get("start_id")
+        if start_id is None:
+            start_id = int(checkpoint.read_text().strip() or 0) if checkpoint and checkpoint.exists() else 0
+        if start_id:
+            self.stdout.write(f"Resuming after baby id {start_id}")
 
         self.stdout.write(self.style.NOTICE(
-            f"Processing {babies_qs.count()} baby(ies) • masters={len(masters)} • "
-            f"dry_run={dry_run} • recreate={recreate}"
+            f"Processing babies after id {start_id} • masters={len(masters)} • "
+            f"dry_run={dry_run} • recreate={recreate} • workers={workers}"
         ))
 
-        with transaction.atomic():
-            for baby in babies_qs.iterator():
-                if recreate:
-                    # Delete only DUE schedules; retain actual history
-                    qs_due = ImmunizationSchedule.objects.filter(baby=baby, status="DUE")
-                    deleted_count = qs_due.count()
-                    total_deleted += deleted_count
-                    if not dry_run:
-                        qs_due.delete()
-
-                # Build per-baby index of existing schedules by vaccine name
-                existing = (
-                    ImmunizationSchedule.objects.filter(baby=baby)
-                    .values("id", "vaccine_name", "status", "scheduled_date", "notes")
-                )
-                by_vaccine = {}
-                for item in existing:
-                    by_vaccine.setdefault(item["vaccine_name"], []).append(item)
-
-                for master in masters:
-                    due_date = self._due_date(baby.date_of_birth, master)
-                    vaccine_name = master.name
-                    description = master.description or ""
-
-                    candidates = by_vaccine.get(vaccine_name, [])
-                    # Prefer a single updatable DUE schedule if present
-                    target = None
-                    for c in candidates:
-                        if c["status"] == "DUE":
-                            target = c
-                            break
-                    if target is None and candidates:
-                        # If only DONE/MISSED exist, we do not create another schedule
-                        total_skipped += 1
-                        continue
-
-                    if target is None:
-                        # Create new schedule
-                        if not dry_run:
-                            ImmunizationSchedule.objects.create(
-                                baby=baby,
-                                vaccine_name=vaccine_name,
-                                scheduled_date=due_date,
-                                status="DUE",
-                                notes=description,
-                            )
-                        total_created += 1
-                    else:
-                        # Update the existing DUE schedule if details changed
-                        needs_update = False
-                        if target["scheduled_date"] != due_date:
-                            needs_update = True
-                        if (target["notes"] or "") != description:
-                            needs_update = True
-
-                        if needs_update:
-                            if not dry_run:
-                                ImmunizationSchedule.objects.filter(id=target["id"]).update(
-                                    scheduled_date=due_date,
-                                    notes=description,
-                                )
-                            total_updated += 1
-                        else:
-                            total_skipped += 1
-
-            if dry_run:
-                # Roll back the transaction for dry-run so DB remains unchanged
-                raise CommandError(
-                    f"Dry-run complete. Created={total_created}, Updated={total_updated}, "
-                    f"Deleted={total_deleted}, Skipped={total_skipped}. No changes applied."
-                )
+        def progress(totals):
+            if checkpoint and not dry_run:
+                checkpoint.write_text(str(totals["last_id"]))
+            elapsed = max(time.monotonic() - totals["started"], 1e-6)
+            rows = totals["created"] + totals["updated"] + totals["deleted"]
+            self.stdout.write(
+                f"  … {totals['babies']} babies, {rows} rows, safe to resume after id {totals['last_id']} "
+                f"({totals['babies'] / elapsed:.0f} babies/s, {rows / elapsed:.0f} rows/s)"
+            )
+
+        totals = backfill_schedules(
+            start_id=start_id,
+            chunk_size=max(1, options.get("chunk_size") or 1000),
+            workers=workers,
+            on_chunk=progress,
+            baby_id=baby_id,
+            recreate=recreate,
+            dry_run=dry_run,
+            notify=options.get("notify", False),
+        )
 
-        self.stdout.write(self.style.SUCCESS(
-            f"Backfill finished. Created={total_created}, Updated={total_updated}, "
-            f"Deleted={total_deleted}, Skipped={total_skipped}."
-        ))
\ No newline at end of file
+        summary = (
+            f"Created={totals['created']}, Updated={totals['updated']}, "
+            f"Deleted={totals['deleted']}, Skipped={totals['skipped']}"
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f"Dry-run complete. {summary}. No changes applied."))
+        else:
+            self.stdout.write(self.style.SUCCESS(f"Backfill finished. {summary}."))
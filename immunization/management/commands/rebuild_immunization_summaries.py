@@ -0,0 +1,22 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from immunization.summary import rebuild_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute every baby's ImmunizationSummary from its schedule entries."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=500, help='Babies recomputed per query')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+
+        def progress(processed, last_id):
+            elapsed = max(time.monotonic() - started, 1e-6)
+            self.stdout.write(f"  … {processed} babies, last id {last_id} ({processed / elapsed:.0f} babies/s)")
+
+        processed = rebuild_summaries(chunk_size=max(1, options.get('chunk_size') or 500), on_chunk=progress)
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt {processed} immunization summaries"))
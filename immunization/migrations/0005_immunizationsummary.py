@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:14
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('immunization', '0004_immunizationschedule_administered_hospital_clinic_id_and_more'),
+        ('patients', '0006_babyprofile_hospital_id'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImmunizationSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_count', models.PositiveIntegerField(default=0)),
+                ('done_count', models.PositiveIntegerField(default=0)),
+                ('missed_count', models.PositiveIntegerField(default=0)),
+                ('next_due_date', models.DateField(blank=True, null=True)),
+                ('next_due_vaccine', models.CharField(blank=True, max_length=100)),
+                ('last_completed_date', models.DateField(blank=True, null=True)),
+                ('is_complete', models.BooleanField(default=False)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('baby', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='immunization_summary', to='patients.babyprofile')),
+            ],
+        ),
+    ]
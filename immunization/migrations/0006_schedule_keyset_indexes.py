@@ -0,0 +1,21 @@
+# Generated by Django 5.0.14 on 2026-10-18 06:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('immunization', '0005_immunizationsummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='immunizationschedule',
+            index=models.Index(fields=['scheduled_date', 'id'], name='immunization_sched_date_id'),
+        ),
+        migrations.AddIndex(
+            model_name='immunizationschedule',
+            index=models.Index(fields=['status', 'scheduled_date', 'id'], name='immunization_status_date_id'),
+        ),
+    ]
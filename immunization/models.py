@@ -50,6 +50,13 @@ class ImmunizationSchedule(models.Model):
     rescheduled_for = models.DateField(null=True, blank=True)
     reschedule_reason = models.CharField(max_length=200, blank=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the schedule views: (scheduled_date, id), optionally per status
+            models.Index(fields=['scheduled_date', 'id'], name='immunization_sched_date_id'),
+            models.Index(fields=['status', 'scheduled_date', 'id'], name='immunization_status_date_id'),
+        ]
+
     def __str__(self):
         return f"{self.vaccine_name} for {self.baby.name} ({self.scheduled_date})"
 
@@ -122,3 +129,28 @@ class ImmunizationCertificate(models.Model):
 
     def __str__(self):
         return f"Certificate — {self.baby.name}"
+
+
+class ImmunizationSummary(models.Model):
+    """Per-baby schedule status, kept current by immunization.summary on every schedule change."""
+    baby = models.OneToOneField(BabyProfile, on_delete=models.CASCADE, related_name='immunization_summary')
+    due_count = models.PositiveIntegerField(default=0)
+    done_count = models.PositiveIntegerField(default=0)
+    missed_count = models.PositiveIntegerField(default=0)
+    # Earliest DUE entry
+    next_due_date = models.DateField(null=True, blank=True)
+    next_due_vaccine = models.CharField(max_length=100, blank=True)
+    last_completed_date = models.DateField(null=True, blank=True)
+    # Has schedules and every one is DONE (certificate eligibility)
+    is_complete = models.BooleanField(default=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def total(self):
+        return self.due_count + self.done_count + self.missed_count
+
+    def status_counts(self) -> dict:
+        return {'DUE': self.due_count, 'DONE': self.done_count, 'MISSED': self.missed_count}
+
+    def __str__(self):
+        return f"Immunization summary — {self.baby.name}"
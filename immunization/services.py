@@ -0,0 +1,130 @@
+from datetime import date
+
+from django.conf import settings
+from django.db import transaction
+
+from audit.history import initial_state
+from audit.registry import get_spec
+from audit.utils import bulk_log_activity
+from casefiles.models import BabyCaseActivityLog, BabyCaseFile
+from casefiles.timeline import immunization_activity
+from notifications.outbox import enqueue_notification
+from notifications.tasks import send_missed_immunization_digest, send_schedule_created_digest
+
+from .due_dates import active_masters, due_dates
+from .models import ImmunizationSchedule, VaccinationEventLog
+from .summary import refresh_summaries
+
+
+def generate_schedules(baby, masters=None, notify: bool = True) -> list[ImmunizationSchedule]:
+    """Create the baby's schedule entries for every active vaccine in one ``bulk_create``.
+
+    Vaccines the baby already has an entry for are skipped, so calling this again is
+    harmless. The audit rows and (when the baby already has a case file) timeline
+    entries that per-row ``create()`` signals would have written are bulk inserted
+    too, and the mother gets one "schedule created" message instead of one per
+    vaccine. Returns the new entries.
+    """
+    masters = list(active_masters() if masters is None else masters)
+    dates = due_dates([baby.date_of_birth], masters)[0]
+    existing = set(ImmunizationSchedule.objects.filter(baby=baby).values_list('vaccine_name', flat=True))
+    schedules = []
+    for master, scheduled_date in zip(masters, dates):
+        if master.name in existing:
+            continue
+        existing.add(master.name)
+        schedules.append(ImmunizationSchedule(
+            baby=baby,
+            vaccine_name=master.name,
+            scheduled_date=scheduled_date,
+            notes=master.description or '',
+        ))
+    if not schedules:
+        return []
+    with transaction.atomic():
+        ImmunizationSchedule.objects.bulk_create(schedules, batch_size=int(getattr(settings, 'IMMUNIZATION_BULK_BATCH_SIZE', 500)))
+        record_created(schedules, notify=notify)
+    return schedules
+
+
+def record_created(schedules, description: str | None = None, notify: bool = True):
+    """Audit rows, timeline entries, summaries and the "schedule created" digest for bulk-inserted schedules.
+
+    ``schedules`` must have primary keys and their ``baby`` (with mother) loaded.
+    Call inside the transaction that inserted them.
+    """
+    if not schedules:
+        return
+    batch_size = int(getattr(settings, 'IMMUNIZATION_BULK_BATCH_SIZE', 500))
+    spec = get_spec(ImmunizationSchedule)
+    if spec is not None:
+        audited = [sched for sched in schedules if spec.should_record('create')]
+        bulk_log_activity('create', audited, description, batch_size=batch_size,
+                          changes=lambda sched: spec.filter_changes(initial_state(sched)) or None)
+    _log_timeline(schedules, batch_size)
+    refresh_summaries({sched.baby_id for sched in schedules})
+    if notify:
+        enqueue_notification(send_schedule_created_digest, [sched.pk for sched in schedules])
+
+
+def _log_timeline(schedules, batch_size: int):
+    case_files = {
+        case_file.baby_id: case_file
+        for case_file in BabyCaseFile.objects.filter(baby_id__in={sched.baby_id for sched in schedules})
+    }
+    BabyCaseActivityLog.objects.bulk_create([
+        immunization_activity(case_files[sched.baby_id], sched)
+        for sched in schedules if sched.baby_id in case_files
+    ], batch_size=batch_size)
+
+
+def mark_overdue_missed(today: date | None = None, chunk_size: int | None = None, notify: bool = True) -> int:
+    """Set-based DUE -> MISSED transition for schedules whose date has passed.
+
+    Works in chunks of schedule IDs. Each chunk is one transaction: lock the rows,
+    one UPDATE, then the audit, VaccinationEventLog and case-file timeline rows
+    that the per-row save() signals would have written, via ``bulk_create``.
+    Instead of one notification per schedule, each chunk enqueues a single digest
+    job that groups the missed vaccines per mother. Returns the number of rows moved.
+    """
+    today = today or date.today()
+    chunk_size = max(1, int(chunk_size or getattr(settings, 'IMMUNIZATION_BULK_CHUNK_SIZE', 1000)))
+    batch_size = int(getattr(settings, 'IMMUNIZATION_BULK_BATCH_SIZE', 500))
+    overdue = ImmunizationSchedule.objects.filter(status='DUE', scheduled_date__lt=today)
+    updated = 0
+    last_id = 0
+    while True:
+        ids = list(overdue.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        last_id = ids[-1]
+        with transaction.atomic():
+            # Re-check the status under lock; rows completed since the ID scan are skipped
+            schedules = list(
+                ImmunizationSchedule.objects.select_for_update(of=('self',))
+                .select_related('baby', 'baby__mother', 'administered_by', 'approved_by')
+                .filter(pk__in=ids, status='DUE')
+                .order_by('pk')
+            )
+            if not schedules:
+                continue
+            locked_ids = [sched.pk for sched in schedules]
+            ImmunizationSchedule.objects.filter(pk__in=locked_ids).update(status='MISSED')
+            for sched in schedules:
+                sched.status = 'MISSED'
+            _log_missed(schedules, batch_size)
+            refresh_summaries({sched.baby_id for sched in schedules})
+            if notify:
+                enqueue_notification(send_missed_immunization_digest, locked_ids)
+        updated += len(schedules)
+    return updated
+
+
+def _log_missed(schedules, batch_size: int):
+    bulk_log_activity('update', schedules, 'Marked missed: scheduled date passed', batch_size=batch_size,
+                      changes={'status': ['DUE', 'MISSED']})
+    VaccinationEventLog.objects.bulk_create([
+        VaccinationEventLog(schedule=sched, event_type='STATUS_CHANGED', performed_by=None, details={'status': sched.status})
+        for sched in schedules
+    ], batch_size=batch_size)
+    _log_timeline(schedules, batch_size)
@@ -1,24 +1,20 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_delete, post_save
 from django.dispatch import receiver
 from django.utils import timezone
-from datetime import timedelta
-from patients.models import BabyProfile
-from immunization.models import ImmunizationSchedule, ImmunizationMaster, ImmunizationApproval, VaccinationEventLog, ImmunizationCertificate
+from patients.models import BabyProfile, MotherProfile
+from immunization.models import ImmunizationSchedule, ImmunizationApproval, VaccinationEventLog, ImmunizationCertificate
+from immunization.services import generate_schedules
+from immunization.summary import get_summary, refresh_summaries
+from notifications.outbox import enqueue_notification
 from notifications.tasks import send_immunization_notifications
 
 
 @receiver(post_save, sender=ImmunizationSchedule)
 def immunization_post_save(sender, instance: ImmunizationSchedule, created: bool, **kwargs):
-    # Notify on creation or meaningful updates
+    refresh_summaries([instance.baby_id])
+    # Notify on creation or meaningful updates; delivered later by the outbox drainer
     if created or kwargs.get('update_fields'):
-        try:
-            send_immunization_notifications.delay(instance.pk)
-        except Exception:
-            # Fallback: call synchronously if broker unavailable
-            try:
-                send_immunization_notifications(instance.pk)
-            except Exception:
-                pass
+        enqueue_notification(send_immunization_notifications, instance.pk)
     # Log status changes and completion
     if not created and kwargs.get('update_fields'):
         if 'status' in kwargs['update_fields']:
@@ -42,8 +38,7 @@ def immunization_post_save(sender, instance: ImmunizationSchedule, created: bool
                 }
             )
             # Generate certificate if all schedules for baby are DONE
-            remaining = ImmunizationSchedule.objects.filter(baby=instance.baby).exclude(status='DONE').exists()
-            if not remaining:
+            if get_summary(instance.baby).is_complete:
                 # Create or update certificate
                 snapshot = list(
                     ImmunizationSchedule.objects.filter(baby=instance.baby).values(
@@ -68,30 +63,21 @@ def immunization_post_save(sender, instance: ImmunizationSchedule, created: bool
                     details={'certificate_id': cert.pk}
                 )
 
+@receiver(post_delete, sender=ImmunizationSchedule)
+def immunization_post_delete(sender, instance: ImmunizationSchedule, origin=None, **kwargs):
+    # Deleting the baby (or mother) cascades here too; its summary goes with it
+    if isinstance(origin, (BabyProfile, MotherProfile)) or getattr(origin, 'model', None) in (BabyProfile, MotherProfile):
+        return
+    refresh_summaries([instance.baby_id])
+
+
 # Auto-create schedule entries when a baby is registered
 @receiver(post_save, sender=BabyProfile)
 def create_immunization_schedule(sender, instance: BabyProfile, created: bool, **kwargs):
     if not created:
         return
-    immunizations = ImmunizationMaster.objects.filter(is_active=True)
-    dob = instance.date_of_birth
-    for imm in immunizations:
-        # Calculate due date based on interval unit
-        if imm.interval_unit == 'days':
-            due_date = dob + timedelta(days=imm.interval_value)
-        elif imm.interval_unit == 'weeks':
-            due_date = dob + timedelta(weeks=imm.interval_value)
-        elif imm.interval_unit == 'months':
-            # Approximate months as 30 days; switch to relativedelta if needed later
-            due_date = dob + timedelta(days=imm.interval_value * 30)
-        else:
-            due_date = dob
-        ImmunizationSchedule.objects.create(
-            baby=instance,
-            vaccine_name=imm.name,
-            scheduled_date=due_date,
-            notes=imm.description or ''
-        )
+    # One bulk insert and one consolidated notification for the whole schedule
+    generate_schedules(instance)
 
 # When approval is created, expose schedules to mother and log event
 @receiver(post_save, sender=ImmunizationApproval)
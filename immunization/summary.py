@@ -0,0 +1,124 @@
+"""Maintenance of ImmunizationSummary, the per-baby status row read by dashboards and certificates.
+
+Summaries are recomputed from the baby's schedule entries (one grouped query for
+any number of babies) and upserted. Single-row saves and deletes refresh their
+baby through signals; bulk writers (``bulk_create``, ``QuerySet.update``) call
+:func:`refresh_summaries` with the babies they touched. Inside
+:func:`deferred_refresh` all of these are collected and run once at the end.
+"""
+import threading
+from contextlib import contextmanager
+
+from django.db.models import Count, Max, Min, OuterRef, Q, Subquery
+
+from patients.models import BabyProfile
+
+from .models import ImmunizationSchedule, ImmunizationSummary
+
+
+SUMMARY_FIELDS = (
+    'due_count', 'done_count', 'missed_count', 'next_due_date', 'next_due_vaccine',
+    'last_completed_date', 'is_complete', 'updated_at',
+)
+
+_local = threading.local()
+
+
+def _summaries(baby_ids) -> list[ImmunizationSummary]:
+    next_due = ImmunizationSchedule.objects.filter(baby=OuterRef('pk'), status='DUE').order_by('scheduled_date', 'pk')
+    rows = (
+        BabyProfile.objects.filter(pk__in=baby_ids)
+        .annotate(
+            due=Count('immunizations', filter=Q(immunizations__status='DUE')),
+            done=Count('immunizations', filter=Q(immunizations__status='DONE')),
+            missed=Count('immunizations', filter=Q(immunizations__status='MISSED')),
+            total=Count('immunizations'),
+            next_due=Min('immunizations__scheduled_date', filter=Q(immunizations__status='DUE')),
+            next_vaccine=Subquery(next_due.values('vaccine_name')[:1]),
+            last_completed=Max('immunizations__date_completed', filter=Q(immunizations__status='DONE')),
+        )
+        .values_list('pk', 'due', 'done', 'missed', 'total', 'next_due', 'next_vaccine', 'last_completed')
+    )
+    return [
+        ImmunizationSummary(
+            baby_id=pk, due_count=due, done_count=done, missed_count=missed,
+            next_due_date=next_due_date, next_due_vaccine=next_vaccine or '',
+            last_completed_date=last_completed, is_complete=bool(total) and done == total,
+        )
+        for pk, due, done, missed, total, next_due_date, next_vaccine, last_completed in rows
+    ]
+
+
+def refresh_summaries(baby_ids, batch_size: int = 500) -> int:
+    """Recompute and upsert the summaries of ``baby_ids``; returns the number written."""
+    pending = getattr(_local, 'pending', None)
+    if pending is not None:
+        pending.update(baby_id for baby_id in baby_ids if baby_id is not None)
+        return 0
+    baby_ids = list({baby_id for baby_id in baby_ids if baby_id is not None})
+    written = 0
+    for start in range(0, len(baby_ids), batch_size):
+        summaries = _summaries(baby_ids[start:start + batch_size])
+        ImmunizationSummary.objects.bulk_create(
+            summaries, update_conflicts=True, unique_fields=['baby'], update_fields=SUMMARY_FIELDS,
+        )
+        written += len(summaries)
+    return written
+
+
+@contextmanager
+def deferred_refresh():
+    """Collect the :func:`refresh_summaries` calls made in the block and run them once when it ends.
+
+    For set-based writes whose per-row signals would otherwise refresh the same babies
+    over and over. Use inside the transaction of the writes. Nothing is refreshed when
+    the block raises; nested blocks leave the refresh to the outermost one.
+    """
+    if getattr(_local, 'pending', None) is not None:
+        yield
+        return
+    _local.pending = pending = set()
+    try:
+        yield
+    finally:
+        _local.pending = None
+    refresh_summaries(pending)
+
+
+def get_summary(baby) -> ImmunizationSummary:
+    """The baby's current summary, computed on first use when it does not exist yet.
+
+    Always read from the table: ``baby.immunization_summary`` is cached on the
+    instance and goes stale as soon as a schedule changes.
+    """
+    summary = ImmunizationSummary.objects.filter(baby_id=baby.pk).first()
+    if summary is None:
+        refresh_summaries([baby.pk])
+        summary = ImmunizationSummary.objects.get(baby_id=baby.pk)
+    return summary
+
+
+def summaries_for(babies) -> dict:
+    """``{baby_id: ImmunizationSummary}`` for ``babies``, filling in any missing ones with one query."""
+    babies = list(babies)
+    found = {s.baby_id: s for s in ImmunizationSummary.objects.filter(baby__in=babies)}
+    missing = [baby.pk for baby in babies if baby.pk not in found]
+    if missing:
+        refresh_summaries(missing)
+        found.update({s.baby_id: s for s in ImmunizationSummary.objects.filter(baby_id__in=missing)})
+    return found
+
+
+def rebuild_summaries(chunk_size: int = 500, on_chunk=None) -> int:
+    """Recompute every baby's summary in id order; returns the number of babies processed."""
+    last_id = 0
+    processed = 0
+    while True:
+        ids = list(BabyProfile.objects.filter(pk__gt=last_id).order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not ids:
+            break
+        processed += refresh_summaries(ids, batch_size=chunk_size)
+        last_id = ids[-1]
+        if on_chunk is not None:
+            on_chunk(processed, last_id)
+    return processed
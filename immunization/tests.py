@@ -1,3 +1,182 @@
-from django.test import TestCase
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from audit.models import ActivityLog
+from patients.models import BabyProfile, MotherProfile
+
+from . import backfill, summary
+from .due_dates import due_date, due_dates
+from .models import ImmunizationMaster, ImmunizationSchedule, ImmunizationSummary, VaccinationEventLog
+from .services import mark_overdue_missed
+from .summary import get_summary
+from .views import _keyset_page, _parse_cursor
+
+
+def make_baby(date_of_birth, email='mother@example.com', name='Baby'):
+    user = get_user_model().objects.create_user(email, 'pass')
+    mother = MotherProfile.objects.create(user=user, full_name='Ada Mother')
+    return BabyProfile.objects.create(mother=mother, name=name, date_of_birth=date_of_birth)
+
+
+class DueDateTests(TestCase):
+    def master(self, value, unit):
+        return ImmunizationMaster(pk=1, name='Vaccine', interval_value=value, interval_unit=unit)
+
+    def test_months_end_on_the_last_day_of_short_months(self):
+        one_month = self.master(1, 'months')
+        self.assertEqual(due_date(date(2025, 1, 31), one_month), date(2025, 2, 28))
+        self.assertEqual(due_date(date(2024, 1, 31), one_month), date(2024, 2, 29))
+        self.assertEqual(due_date(date(2025, 3, 31), self.master(6, 'months')), date(2025, 9, 30))
+        self.assertEqual(due_date(date(2025, 12, 31), self.master(2, 'months')), date(2026, 2, 28))
+
+    def test_days_and_weeks_are_exact(self):
+        self.assertEqual(due_date(date(2025, 1, 31), self.master(6, 'weeks')), date(2025, 3, 14))
+        self.assertEqual(due_date(date(2025, 2, 27), self.master(2, 'days')), date(2025, 3, 1))
+
+    def test_unknown_unit_means_at_birth(self):
+        self.assertEqual(due_date(date(2025, 1, 31), self.master(3, 'years')), date(2025, 1, 31))
+
+    def test_many_babies_share_rows_per_birthday(self):
+        masters = [self.master(1, 'months'), self.master(10, 'weeks')]
+        rows = due_dates([date(2025, 1, 31), date(2025, 1, 30), date(2025, 1, 31)], masters)
+        self.assertEqual(rows[0], [date(2025, 2, 28), date(2025, 4, 11)])
+        self.assertEqual(rows[1], [date(2025, 2, 28), date(2025, 4, 10)])
+        self.assertIs(rows[0], rows[2])
+
+
+def make_masters():
+    ImmunizationMaster.objects.all().delete()
+    ImmunizationMaster.objects.create(name='BCG', interval_value=0, interval_unit='days')
+    ImmunizationMaster.objects.create(name='Penta 1', interval_value=1, interval_unit='months')
+    ImmunizationMaster.objects.create(name='Measles', interval_value=9, interval_unit='months')
+
+
+@override_settings(NOTIFICATIONS_OUTBOX_KICK=False)
+class ScheduleGenerationTests(TestCase):
+    def setUp(self):
+        make_masters()
+
+    def test_registered_baby_gets_calendar_month_due_dates(self):
+        baby = make_baby(date(2024, 5, 31))
+        self.assertEqual(
+            dict(ImmunizationSchedule.objects.filter(baby=baby).values_list('vaccine_name', 'scheduled_date')),
+            {'BCG': date(2024, 5, 31), 'Penta 1': date(2024, 6, 30), 'Measles': date(2025, 2, 28)},
+        )
+
+
+@override_settings(NOTIFICATIONS_OUTBOX_KICK=False)
+class BackfillTests(TestCase):
+    def setUp(self):
+        make_masters()
+        self.babies = [make_baby(date(2024, 1, 31), f'mother{n}@example.com', f'Baby {n}') for n in range(3)]
+
+    def dates(self, baby):
+        return dict(ImmunizationSchedule.objects.filter(baby=baby).values_list('vaccine_name', 'scheduled_date'))
+
+    def test_resume_only_touches_babies_after_the_start_id(self):
+        ImmunizationMaster.objects.filter(name='Penta 1').update(interval_value=2)
+        ImmunizationMaster.objects.first().save()  # clear the cached master list
+        seen = []
+        totals = backfill.backfill_schedules(start_id=self.babies[0].pk, chunk_size=1,
+                                             on_chunk=lambda totals: seen.append(totals['last_id']))
+        self.assertEqual(seen, [baby.pk for baby in self.babies[1:]])
+        self.assertEqual((totals['babies'], totals['updated'], totals['last_id']), (2, 2, self.babies[-1].pk))
+        self.assertEqual(self.dates(self.babies[0])['Penta 1'], date(2024, 2, 29))
+        self.assertEqual(self.dates(self.babies[1])['Penta 1'], date(2024, 3, 31))
+
+        # Resuming from the start picks up the remaining baby; the others are already current
+        totals = backfill.backfill_schedules(chunk_size=10)
+        self.assertEqual((totals['updated'], totals['skipped']), (1, 8))
+
+    def test_recreate_regenerates_due_entries_in_bulk(self):
+        baby = self.babies[0]
+        done = ImmunizationSchedule.objects.get(baby=baby, vaccine_name='BCG')
+        done.status = 'DONE'
+        done.save()
+        due = ImmunizationSchedule.objects.get(baby=baby, vaccine_name='Measles')
+        VaccinationEventLog.objects.create(schedule=due, event_type='STATUS_CHANGED', details={})
+        ActivityLog.objects.all().delete()
+
+        with mock.patch.object(summary, '_summaries', wraps=summary._summaries) as recompute, \
+                CaptureQueriesContext(connection) as queries:
+            stats = backfill.backfill_chunk(0, baby.pk, recreate=True)
+        # The audit snapshots of the deleted rows do not load their baby one by one
+        baby_reads = [q for q in queries if q['sql'].startswith('SELECT') and 'FROM "patients_babyprofile"' in q['sql']]
+        # Chunk load, the delete's prefetch and the summary refresh
+        self.assertEqual(len(baby_reads), 3)
+        # Per-row delete signals and the bulk writes share one summary refresh
+        recompute.assert_called_once()
+        self.assertEqual((stats['deleted'], stats['created']), (2, 2))
+        self.assertTrue(ImmunizationSchedule.objects.filter(pk=done.pk, status='DONE').exists())
+        self.assertFalse(ImmunizationSchedule.objects.filter(pk=due.pk).exists())
+        self.assertFalse(VaccinationEventLog.objects.filter(schedule_id=due.pk).exists())
+        deletes = ActivityLog.objects.filter(model='ImmunizationSchedule', action_type='delete')
+        self.assertEqual(list(deletes.values_list('baby_name', flat=True)), ['Baby 0', 'Baby 0'])
+        current = get_summary(baby)
+        self.assertEqual((current.due_count, current.done_count), (2, 1))
+
+
+@override_settings(NOTIFICATIONS_OUTBOX_KICK=False)
+class SummaryTests(TestCase):
+    def setUp(self):
+        make_masters()
+        self.baby = make_baby(date(2024, 1, 31))
+
+    def counts(self):
+        summary = get_summary(self.baby)
+        return summary.due_count, summary.done_count, summary.missed_count, summary.is_complete
+
+    def test_bulk_generated_schedule_is_summarised(self):
+        summary = ImmunizationSummary.objects.get(baby=self.baby)
+        self.assertEqual((summary.due_count, summary.next_due_date, summary.next_due_vaccine), (3, date(2024, 1, 31), 'BCG'))
+
+    def test_saves_update_the_summary(self):
+        for sched in ImmunizationSchedule.objects.filter(baby=self.baby).order_by('pk')[:2]:
+            sched.status = 'DONE'
+            sched.date_completed = sched.scheduled_date
+            sched.save()
+        self.assertEqual(self.counts(), (1, 2, 0, False))
+        last = ImmunizationSchedule.objects.get(baby=self.baby, status='DUE')
+        last.status = 'DONE'
+        last.save()
+        self.assertEqual(self.counts(), (0, 3, 0, True))
+
+    def test_deletes_update_the_summary(self):
+        ImmunizationSchedule.objects.filter(baby=self.baby, vaccine_name='BCG').delete()
+        summary = get_summary(self.baby)
+        self.assertEqual((summary.due_count, summary.next_due_vaccine), (2, 'Penta 1'))
+        # Removing the baby takes its summary with it instead of refreshing it per schedule
+        self.baby.delete()
+        self.assertFalse(ImmunizationSummary.objects.exists())
+
+    def test_missed_sweep_updates_the_summary(self):
+        self.assertEqual(mark_overdue_missed(today=date(2024, 3, 1), notify=False), 2)
+        self.assertEqual(self.counts(), (1, 0, 2, False))
+        self.assertEqual(get_summary(self.baby).next_due_vaccine, 'Measles')
+
+
+class KeysetCursorTests(TestCase):
+    def test_cursor_parsing(self):
+        self.assertEqual(_parse_cursor('2025-02-28.17'), (date(2025, 2, 28), 17))
+        for bad in (None, '', '2025-02-28', '2025-02-30.1', '2025-02-28.x', '2025-02-28.1.2', '17.2025-02-28'):
+            self.assertIsNone(_parse_cursor(bad), bad)
+
+    @override_settings(NOTIFICATIONS_OUTBOX_KICK=False)
+    def test_pages_cover_every_entry_once_across_equal_dates(self):
+        make_masters()
+        for n in range(3):
+            make_baby(date(2024, 1, 31), f'mother{n}@example.com', f'Baby {n}')
+        qs = ImmunizationSchedule.objects.all()
+        seen, cursor = [], None
+        while True:
+            items, next_cursor = _keyset_page(qs, _parse_cursor(cursor), 2)
+            seen += [sched.pk for sched in items]
+            if next_cursor is None:
+                break
+            cursor = next_cursor
+        self.assertEqual(seen, list(qs.order_by('scheduled_date', 'pk').values_list('pk', flat=True)))
@@ -1,16 +1,114 @@
-from datetime import datetime, timedelta
+from datetime import datetime
+from itertools import groupby
+from operator import attrgetter
+from django.conf import settings
+from django.db.models import Count, Q
 from django.shortcuts import render, redirect
+from django.template.loader import get_template, render_to_string
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.utils import timezone
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from io import BytesIO
 from reportlab.lib.pagesizes import A4
 from reportlab.pdfgen import canvas
+from .due_dates import due_date
 from .models import ImmunizationSchedule, ImmunizationMaster, ImmunizationApproval, ImmunizationCertificate
+from .summary import get_summary, summaries_for
 from patients.models import MotherProfile, BabyProfile
 from .forms import AddBabyImmunizationForm, AdministerImmunizationForm, ObservationForm, RescheduleForm
 from accounts.decorators import role_required
+from audit.pipeline import atomic as audit_atomic
+
+
+STATUSES = ('DUE', 'DONE', 'MISSED')
+# Placeholder in schedule.html that the streamed baby cards replace
+STREAM_MARKER = '<!-- schedule-groups -->'
+
+
+def _status_counts(qs) -> dict:
+    """DUE/DONE/MISSED totals of ``qs`` in one aggregate query."""
+    return qs.aggregate(**{status: Count('id', filter=Q(status=status)) for status in STATUSES})
+
+
+def _parse_cursor(value):
+    """``'<YYYY-MM-DD>.<id>'`` -> (date, id); None for a missing or malformed cursor."""
+    try:
+        day, pk = (value or '').split('.')
+        return datetime.strptime(day, '%Y-%m-%d').date(), int(pk)
+    except ValueError:
+        return None
+
+
+def _keyset_page(qs, cursor, page_size: int):
+    """Entries of ``qs`` after ``cursor`` in (scheduled_date, id) order; returns (items, next_cursor)."""
+    qs = qs.order_by('scheduled_date', 'pk')
+    if cursor:
+        day, pk = cursor
+        qs = qs.filter(Q(scheduled_date__gt=day) | Q(scheduled_date=day, pk__gt=pk))
+    items = list(qs[:page_size + 1])
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, f'{items[-1].scheduled_date.isoformat()}.{items[-1].pk}'
+
+
+def _group_by_baby(schedules) -> list[dict]:
+    """Group the entries of one page by baby, in order of first appearance."""
+    groups = {}
+    for s in schedules:
+        groups.setdefault(s.baby_id, {'baby': s.baby, 'items': []})['items'].append(s)
+    return list(groups.values())
+
+
+def _query_string(request, **params) -> str:
+    query = request.GET.copy()
+    for key, value in params.items():
+        if value is None:
+            query.pop(key, None)
+        else:
+            query[key] = value
+    return f'?{query.urlencode()}'
+
+
+def _render_schedule(request, qs, context):
+    """Render one keyset page of ``qs``, or every entry as a stream of baby cards with ``?stream=1``."""
+    context['first_url'] = _query_string(request, after=None, stream=None)
+    context['stream_url'] = _query_string(request, after=None, stream='1')
+    if request.GET.get('stream') == '1':
+        return StreamingHttpResponse(_stream_schedule(request, qs, context), content_type='text/html; charset=utf-8')
+
+    page_size = int(getattr(settings, 'IMMUNIZATION_SCHEDULE_PAGE_SIZE', 100))
+    cursor = _parse_cursor(request.GET.get('after'))
+    schedules, next_cursor = _keyset_page(qs, cursor, page_size)
+    grouped_by_baby = _group_by_baby(schedules)
+    context.setdefault('babies', [group['baby'] for group in grouped_by_baby])
+    context.update({
+        'schedules': schedules,
+        'grouped_by_baby': grouped_by_baby,
+        # Upcoming timeline: due items, soonest first (the page is already in date order)
+        'upcoming': [s for s in schedules if s.status == 'DUE'],
+        'is_first_page': cursor is None,
+        'next_url': _query_string(request, after=next_cursor) if next_cursor else None,
+    })
+    return render(request, 'immunization/schedule.html', context)
+
+
+def _stream_schedule(request, qs, context):
+    """Yield the page around the baby cards, one card per baby, without loading the whole set."""
+    context.update({'streaming': True, 'stream_marker': STREAM_MARKER})
+    head, tail = render_to_string('immunization/schedule.html', context, request).split(STREAM_MARKER, 1)
+    yield head
+    card = get_template('immunization/_schedule_group.html')
+    rows = qs.order_by('baby_id', 'scheduled_date', 'pk').iterator(chunk_size=2000)
+    empty = True
+    for _, items in groupby(rows, key=attrgetter('baby_id')):
+        items = list(items)
+        empty = False
+        yield card.render({'group': {'baby': items[0].baby, 'items': items}, 'user': request.user})
+    if empty:
+        yield '<p class="text-muted">No immunizations found.</p>'
+    yield tail
 
 
 @login_required
@@ -19,7 +117,7 @@ def schedule_view(request):
         user=request.user,
         defaults={'full_name': '', 'phone_number': request.user.phone_number or ''}
     )
-    babies = BabyProfile.objects.filter(mother=profile).order_by('date_of_birth')
+    babies = list(BabyProfile.objects.filter(mother=profile).order_by('date_of_birth'))
 
     # Filters
     status_filter = request.GET.get('status', 'ALL').upper()
@@ -36,48 +134,36 @@ def schedule_view(request):
         messages.error(request, 'Invalid date filter. Please use YYYY-MM-DD.')
 
     qs = ImmunizationSchedule.objects.filter(baby__in=babies).select_related('baby')
-    if status_filter in {'DUE', 'DONE', 'MISSED'}:
+    if status_filter in STATUSES:
         qs = qs.filter(status=status_filter)
     if start_date:
         qs = qs.filter(scheduled_date__gte=start_date)
     if end_date:
         qs = qs.filter(scheduled_date__lte=end_date)
 
-    schedules = qs.order_by('scheduled_date')
-
-    # Group schedules by baby for easier rendering
-    grouped_by_baby = []
-    babies_by_id = {b.id: b for b in babies}
-    items_by_baby = {}
-    for s in schedules:
-        items_by_baby.setdefault(s.baby_id, []).append(s)
-    for b_id, items in items_by_baby.items():
-        grouped_by_baby.append({'baby': babies_by_id.get(b_id), 'items': items})
-
     # Status summary counts (for current filtered set)
-    status_counts = {
-        'DUE': sum(1 for s in schedules if s.status == 'DUE'),
-        'DONE': sum(1 for s in schedules if s.status == 'DONE'),
-        'MISSED': sum(1 for s in schedules if s.status == 'MISSED'),
-    }
-
-    # Upcoming timeline: due items, soonest first
-    upcoming = sorted((s for s in schedules if s.status == 'DUE'), key=lambda x: x.scheduled_date)
-
-    return render(request, 'immunization/schedule.html', {
+    if start_date or end_date:
+        status_counts = _status_counts(qs)
+    else:
+        # No date window: the per-baby summaries already hold the totals
+        status_counts = dict.fromkeys(STATUSES, 0)
+        for summary in summaries_for(babies).values():
+            for status, count in summary.status_counts().items():
+                if status_filter not in STATUSES or status == status_filter:
+                    status_counts[status] += count
+
+    return _render_schedule(request, qs, {
         'profile': profile,
         'babies': babies,
-        'schedules': schedules,
-        'grouped_by_baby': grouped_by_baby,
         'status_counts': status_counts,
         'status_filter': status_filter,
         'start_date_filter': start_date_str or '',
         'end_date_filter': end_date_str or '',
-        'upcoming': upcoming,
     })
 
 
 @login_required
+@audit_atomic
 def update_schedule_status(request, pk):
     if request.method != 'POST':
         return redirect('immunization_schedule')
@@ -125,41 +211,21 @@ def schedule_all_view(request):
         return redirect('immunization_schedule')
 
     status_filter = request.GET.get('status', 'ALL').upper()
-    qs = ImmunizationSchedule.objects.select_related('baby', 'baby__mother').all()
-    if status_filter in {'DUE', 'DONE', 'MISSED'}:
+    qs = ImmunizationSchedule.objects.select_related('baby', 'baby__mother')
+    if status_filter in STATUSES:
         qs = qs.filter(status=status_filter)
-    schedules = qs.order_by('scheduled_date')
 
-    # Group by baby
-    grouped_by_baby = []
-    babies = BabyProfile.objects.all()
-    babies_by_id = {b.id: b for b in babies}
-    items_by_baby = {}
-    for s in schedules:
-        items_by_baby.setdefault(s.baby_id, []).append(s)
-    for b_id, items in items_by_baby.items():
-        grouped_by_baby.append({'baby': babies_by_id.get(b_id), 'items': items})
-
-    status_counts = {
-        'DUE': sum(1 for s in schedules if s.status == 'DUE'),
-        'DONE': sum(1 for s in schedules if s.status == 'DONE'),
-        'MISSED': sum(1 for s in schedules if s.status == 'MISSED'),
-    }
-
-    return render(request, 'immunization/schedule.html', {
+    return _render_schedule(request, qs, {
         'profile': None,
-        'babies': babies,
-        'schedules': schedules,
-        'grouped_by_baby': grouped_by_baby,
-        'status_counts': status_counts,
+        'status_counts': _status_counts(qs),
         'status_filter': status_filter,
         'start_date_filter': '',
         'end_date_filter': '',
-        'upcoming': sorted((s for s in schedules if s.status == 'DUE'), key=lambda x: x.scheduled_date),
     })
 
 
 @login_required
+@audit_atomic
 def manage_baby_immunizations(request, baby_id):
     if not request.user.is_staff:
         messages.error(request, 'Staff access only.')
@@ -189,15 +255,7 @@ def manage_baby_immunizations(request, baby_id):
             sd = form.cleaned_data.get('scheduled_date')
             notes = form.cleaned_data.get('notes') or ''
             if not sd:
-                dob = baby.date_of_birth
-                if imm.interval_unit == 'days':
-                    sd = dob + timedelta(days=imm.interval_value)
-                elif imm.interval_unit == 'weeks':
-                    sd = dob + timedelta(weeks=imm.interval_value)
-                elif imm.interval_unit == 'months':
-                    sd = dob + timedelta(days=imm.interval_value * 30)
-                else:
-                    sd = dob
+                sd = due_date(baby.date_of_birth, imm)
             ImmunizationSchedule.objects.create(
                 baby=baby,
                 vaccine_name=imm.name,
@@ -300,6 +358,7 @@ def baby_immunization_pdf(request, baby_id):
 
 
 @login_required
+@audit_atomic
 def immunization_approve(request, baby_id):
     if not request.user.is_staff:
         messages.error(request, 'Staff access only.')
@@ -322,6 +381,7 @@ def immunization_approve(request, baby_id):
 
 
 @role_required('DOCTOR', 'NURSE', 'ADMIN')
+@audit_atomic
 def immunization_complete(request, pk):
     try:
         schedule = ImmunizationSchedule.objects.select_related('baby').get(pk=pk)
@@ -358,6 +418,7 @@ def immunization_complete(request, pk):
 
 
 @role_required('DOCTOR', 'NURSE', 'ADMIN')
+@audit_atomic
 def immunization_observe(request, pk):
     try:
         schedule = ImmunizationSchedule.objects.select_related('baby').get(pk=pk)
@@ -383,6 +444,7 @@ def immunization_observe(request, pk):
 
 
 @login_required
+@audit_atomic
 def immunization_reschedule(request, pk):
     if not request.user.is_staff:
         messages.error(request, 'Staff access only.')
@@ -407,6 +469,7 @@ def immunization_reschedule(request, pk):
 
 
 @login_required
+@audit_atomic
 def immunization_certificate(request, baby_id):
     # Allow staff, or the baby's mother (account owner)
     try:
@@ -420,8 +483,8 @@ def immunization_certificate(request, baby_id):
         messages.error(request, 'You are not allowed to access this record.')
         return redirect('immunization_schedule' if not is_staff else 'immunization_schedule_all')
     # Ensure certificate exists if completed
-    items = ImmunizationSchedule.objects.filter(baby=baby).order_by('scheduled_date')
-    if items.exists() and not items.exclude(status='DONE').exists():
+    if get_summary(baby).is_complete:
+        items = ImmunizationSchedule.objects.filter(baby=baby).order_by('scheduled_date')
         snapshot = list(items.values('vaccine_name','scheduled_date','status','date_completed'))
         cert, _ = ImmunizationCertificate.objects.get_or_create(
             baby=baby,
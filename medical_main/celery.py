@@ -1,6 +1,7 @@
 import os
 from celery import Celery
 from celery.schedules import crontab
+from kombu import Queue
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medical_main.settings')
 
@@ -8,6 +9,41 @@ app = Celery('medical_main')
 app.config_from_object('django.conf:settings', namespace='CELERY')
 app.autodiscover_tasks()
 
+# Separate queues so the morning reminder burst cannot delay time-sensitive messages.
+# Run a dedicated worker for 'transactional' (see cele.txt); tasks not listed in
+# task_routes keep using the default 'celery' queue.
+app.conf.task_default_queue = 'celery'
+app.conf.task_queues = (
+    Queue('celery'),
+    Queue('transactional'),
+    Queue('reminders'),
+    Queue('bulk'),
+)
+app.conf.task_routes = {
+    # Confirmations triggered by a user action; the outbox drainer dispatches them here
+    'notifications.tasks.send_appointment_notifications': {'queue': 'transactional'},
+    'notifications.tasks.send_immunization_notifications': {'queue': 'transactional'},
+    'notifications.tasks.send_schedule_created_digest': {'queue': 'transactional'},
+    'notifications.tasks.drain_notification_outbox': {'queue': 'transactional'},
+    # Scheduled reminders and the daily dispatchers
+    'notifications.tasks.send_immunization_reminder': {'queue': 'reminders'},
+    'notifications.tasks.send_appointment_reminder': {'queue': 'reminders'},
+    'notifications.tasks.send_daily_immunization_pre3': {'queue': 'reminders'},
+    'notifications.tasks.send_daily_immunization_today': {'queue': 'reminders'},
+    'notifications.tasks.send_daily_immunization_missed2': {'queue': 'reminders'},
+    'notifications.tasks.send_daily_appointment_reminders': {'queue': 'reminders'},
+    # Fan-out chunks and housekeeping
+    'notifications.tasks.send_daily_immunization_chunk': {'queue': 'bulk'},
+    'notifications.tasks.aggregate_daily_immunization_chunks': {'queue': 'bulk'},
+    'notifications.tasks.mark_overdue_immunizations_missed': {'queue': 'bulk'},
+    'notifications.tasks.send_missed_immunization_digest': {'queue': 'bulk'},
+    'audit.tasks.archive_activity_logs': {'queue': 'bulk'},
+    'audit.tasks.update_activity_rollups': {'queue': 'bulk'},
+}
+# Reserve one message at a time so a worker serving several queues does not sit on
+# a backlog of bulk chunks while a confirmation waits
+app.conf.worker_prefetch_multiplier = 1
+
 # Default beat schedule: granular immunization reminders and housekeeping
 app.conf.beat_schedule = {
     'daily-immunization-pre3': {
@@ -26,6 +62,18 @@ app.conf.beat_schedule = {
         'task': 'notifications.tasks.send_daily_appointment_reminders',
         'schedule': crontab(hour=8, minute=30),
     },
+    'drain-notification-outbox': {
+        'task': 'notifications.tasks.drain_notification_outbox',
+        'schedule': 60.0,
+    },
+    'update-activity-rollups': {
+        'task': 'audit.tasks.update_activity_rollups',
+        'schedule': crontab(minute='*/15'),
+    },
+    'archive-activity-logs': {
+        'task': 'audit.tasks.archive_activity_logs',
+        'schedule': crontab(hour=2, minute=30),
+    },
     'mark-overdue-immunizations-missed': {
         'task': 'notifications.tasks.mark_overdue_immunizations_missed',
         'schedule': crontab(hour=0, minute=15),
@@ -211,6 +211,48 @@ EBULKSMS_API_KEY = os.getenv('EBULKSMS_API_KEY', '')
 EBULKSMS_SENDER = os.getenv('EBULKSMS_SENDER', '')
 EBULKSMS_BASE_URL = os.getenv('EBULKSMS_BASE_URL', 'https://api.ebulksms.com/sendsms.json')
 EBULKSMS_FORCE_DND = os.getenv('EBULKSMS_FORCE_DND', 'False').lower() == 'true'
+EBULKSMS_TIMEOUT = int(os.getenv('EBULKSMS_TIMEOUT', '10') or 10)
+EBULKSMS_RETRIES = int(os.getenv('EBULKSMS_RETRIES', '3') or 3)
+EBULKSMS_POOL_SIZE = int(os.getenv('EBULKSMS_POOL_SIZE', '10') or 10)
+# Max recipients grouped into one batch API call
+EBULKSMS_MAX_RECIPIENTS = int(os.getenv('EBULKSMS_MAX_RECIPIENTS', '100') or 100)
+# Async dispatcher: max in-flight requests (the request rate is NOTIFICATIONS_RATE_LIMITS['SMS'])
+EBULKSMS_CONCURRENCY = int(os.getenv('EBULKSMS_CONCURRENCY', '50') or 50)
+
+# Daily reminder fan-out: split the 08:00 runs into chunks of schedule IDs, one subtask each
+NOTIFICATIONS_REMINDER_FANOUT = os.getenv('NOTIFICATIONS_REMINDER_FANOUT', 'True').lower() == 'true'
+NOTIFICATIONS_REMINDER_CHUNK_SIZE = int(os.getenv('NOTIFICATIONS_REMINDER_CHUNK_SIZE', '200') or 200)
+# NotificationLog rows are buffered per task and written with bulk_create in batches of this size
+NOTIFICATIONS_LOG_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_LOG_BATCH_SIZE', '500') or 500)
+# How reminder chunks send SMS: 'batch' (grouped provider calls) or 'async' (concurrent aiohttp)
+NOTIFICATIONS_SMS_DISPATCHER = os.getenv('NOTIFICATIONS_SMS_DISPATCHER', 'batch')
+# Minutes before an unfinished reminder claim is considered abandoned and may be retried
+NOTIFICATIONS_LEDGER_CLAIM_TTL = int(os.getenv('NOTIFICATIONS_LEDGER_CLAIM_TTL', '30') or 30)
+# Transactional outbox drained by notifications.tasks.drain_notification_outbox
+NOTIFICATIONS_OUTBOX_BATCH_SIZE = int(os.getenv('NOTIFICATIONS_OUTBOX_BATCH_SIZE', '100') or 100)
+NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS = int(os.getenv('NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', '5') or 5)
+# Seconds before a PROCESSING row whose drainer died is claimed again
+NOTIFICATIONS_OUTBOX_CLAIM_TTL = int(os.getenv('NOTIFICATIONS_OUTBOX_CLAIM_TTL', '300') or 300)
+NOTIFICATIONS_OUTBOX_RETENTION_DAYS = int(os.getenv('NOTIFICATIONS_OUTBOX_RETENTION_DAYS', '7') or 7)
+# Nudge the drainer right after commit (best-effort, never retried inside the request)
+NOTIFICATIONS_OUTBOX_KICK = os.getenv('NOTIFICATIONS_OUTBOX_KICK', 'True').lower() == 'true'
+# Rows per transaction for set-based schedule transitions (immunization.services)
+IMMUNIZATION_BULK_CHUNK_SIZE = int(os.getenv('IMMUNIZATION_BULK_CHUNK_SIZE', '1000') or 1000)
+# Rows per INSERT/UPDATE statement when schedules and their audit/timeline rows are written in bulk
+IMMUNIZATION_BULK_BATCH_SIZE = int(os.getenv('IMMUNIZATION_BULK_BATCH_SIZE', '500') or 500)
+# Seconds a process keeps its compiled vaccine master list (immunization.due_dates);
+# saves in the same process clear it at once
+IMMUNIZATION_MASTER_CACHE_TTL = int(os.getenv('IMMUNIZATION_MASTER_CACHE_TTL', '300') or 300)
+# Schedule entries per page on the mother/staff schedule views ("Show all" streams the rest)
+IMMUNIZATION_SCHEDULE_PAGE_SIZE = int(os.getenv('IMMUNIZATION_SCHEDULE_PAGE_SIZE', '100') or 100)
+# Provider request quotas per channel ('<count>/s', '/m' or '/h'; empty disables).
+# Counters live in the default cache (CACHE_URL below); with a per-process cache they are not enforced.
+NOTIFICATIONS_RATE_LIMITS = {
+    'SMS': os.getenv('NOTIFICATIONS_SMS_RATE', '20/s'),
+    'EMAIL': os.getenv('NOTIFICATIONS_EMAIL_RATE', '10/s'),
+}
+# Share of each window only transactional (urgent) sends may use
+NOTIFICATIONS_RATE_URGENT_RESERVE = float(os.getenv('NOTIFICATIONS_RATE_URGENT_RESERVE', '0.2') or 0.2)
 
 # Jazzmin (minimal)
 JAZZMIN_SETTINGS = {
@@ -219,8 +261,52 @@ JAZZMIN_SETTINGS = {
     "welcome_sign": "Welcome to Medical Admin",
 }
 
+# Models audited by audit.signals: every model in these apps except the excluded ones
+# (logging models would otherwise generate logs). Per-model tracked fields and event
+# sampling go in AUDIT_MODEL_OPTIONS, see audit/registry.py
+AUDIT_TRACKED_APPS = ('immunization', 'patients', 'casefiles', 'appointments')
+AUDIT_EXCLUDED_MODELS = (
+    'immunization.VaccinationEventLog',
+    'immunization.AuditLog',
+    'immunization.ImmunizationSummary',
+    'casefiles.CaseActivityLog',
+    'casefiles.BabyCaseActivityLog',
+)
+AUDIT_MODEL_OPTIONS = {
+    # e.g. 'patients.VitalSigns': {'fields': ('systolic', 'diastolic'), 'events': {'update': 0.1}},
+}
+
+# Text values longer than this are stored in ActivityLog.changes as hash + length only
+AUDIT_DIFF_MAX_TEXT = int(os.getenv('AUDIT_DIFF_MAX_TEXT', '200') or 200)
+# Months older than this are moved to gzip'd JSONL archives by the daily retention task
+AUDIT_RETENTION_DAYS = int(os.getenv('AUDIT_RETENTION_DAYS', '365') or 365)
+AUDIT_ARCHIVE_DIR = Path(os.getenv('AUDIT_ARCHIVE_DIR', BASE_DIR / 'archive' / 'audit'))
+# Days a month loaded back with restore_activity_logs stays in the database
+AUDIT_RESTORE_HOLD_DAYS = int(os.getenv('AUDIT_RESTORE_HOLD_DAYS', '30') or 30)
+# PostgreSQL only, after `manage.py partition_activity_logs --convert`
+AUDIT_PARTITION_MONTHS_AHEAD = int(os.getenv('AUDIT_PARTITION_MONTHS_AHEAD', '3') or 3)
+# Daily activity rollups skip events younger than this, so late commits are not passed over
+AUDIT_ROLLUP_LAG_SECONDS = int(os.getenv('AUDIT_ROLLUP_LAG_SECONDS', '300') or 300)
+# Ids passed over by the rollup watermark are rechecked for this long (a transaction may still commit them)
+AUDIT_ROLLUP_GAP_SECONDS = int(os.getenv('AUDIT_ROLLUP_GAP_SECONDS', '86400') or 86400)
+
 # Celery (placeholders)
 CELERY_BROKER_URL = os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0')
+
+# Shared cache for every web and Celery process (notification rate-limit counters live here).
+# Defaults to the broker's Redis server, db 1; CACHE_URL='' falls back to per-process memory.
+CACHE_URL = os.getenv('CACHE_URL', 'redis://localhost:6379/1')
+if CACHE_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+            # A dead cache must not stall sends; the limiter fails open on errors
+            'OPTIONS': {'socket_connect_timeout': 1, 'socket_timeout': 1},
+        }
+    }
+else:
+    CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
 CELERY_RESULT_BACKEND = os.getenv('CELERY_RESULT_BACKEND', 'django-db')
 CELERY_TIMEZONE = os.getenv('CELERY_TIMEZONE', TIME_ZONE)
 CELERY_ENABLE_UTC = os.getenv('CELERY_ENABLE_UTC', 'True').lower() == 'true'
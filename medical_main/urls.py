@@ -87,6 +87,8 @@ urlpatterns = [
     path('billing/', include('billing.urls')),
     # Case Files
     path('casefiles/', include('casefiles.urls')),
+    # Audit reports
+    path('audit/', include('audit.urls')),
 ]
 
 if settings.DEBUG:
@@ -1,12 +1,13 @@
 from django.contrib import admin
 from django.db import models
 from ckeditor.widgets import CKEditorWidget
-from .models import NotificationLog
+from .models import NotificationLog, NotificationOutbox, ReminderLedger
 from django.urls import path
 from django import forms
 from django.shortcuts import render, redirect
 from django.contrib import messages
 from .utils import send_sms, send_email
+from .log_writer import NotificationLogWriter
 
 
 class RichTextAdmin(admin.ModelAdmin):
@@ -41,9 +42,10 @@ class NotificationLogAdmin(RichTextAdmin):
         if request.method == 'POST' and form.is_valid():
             to = form.cleaned_data['to_number']
             msg = form.cleaned_data['message']
-            ok, meta = send_sms(to, msg)
-            try:
-                NotificationLog.objects.create(
+            # Never sleep in the request for a rate-limit slot; report it instead
+            ok, meta = send_sms(to, msg, urgent=True, wait=False)
+            with NotificationLogWriter() as log:
+                log.add(
                     recipient=request.user,
                     channel='SMS',
                     type='HEALTH_ALERT',
@@ -51,10 +53,10 @@ class NotificationLogAdmin(RichTextAdmin):
                     success=ok,
                     meta=meta,
                 )
-            except Exception:
-                pass
             if ok:
                 messages.success(request, 'SMS sent successfully.')
+            elif meta.get('error') == 'rate_limited':
+                messages.warning(request, 'SMS provider quota reached; try again in a few seconds.')
             else:
                 messages.error(request, 'SMS failed. See NotificationLog meta for details.')
             return redirect('admin:notifications_test_sms')
@@ -67,9 +69,9 @@ class NotificationLogAdmin(RichTextAdmin):
             to = form.cleaned_data['to_email']
             subject = form.cleaned_data['subject']
             msg = form.cleaned_data['message']
-            ok_email = send_email(to, subject, msg, text_content=msg)
-            try:
-                NotificationLog.objects.create(
+            ok_email = send_email(to, subject, msg, text_content=msg, urgent=True, wait=False)
+            with NotificationLogWriter() as log:
+                log.add(
                     recipient=request.user,
                     channel='EMAIL',
                     type='HEALTH_ALERT',
@@ -77,8 +79,6 @@ class NotificationLogAdmin(RichTextAdmin):
                     success=ok_email,
                     meta={'backend': getattr(request, 'EMAIL_BACKEND', None) or 'smtp'},
                 )
-            except Exception:
-                pass
             if ok_email:
                 messages.success(request, 'Email sent successfully.')
             else:
@@ -86,3 +86,18 @@ class NotificationLogAdmin(RichTextAdmin):
             return redirect('admin:notifications_test_email')
         context = {'form': form, 'title': 'Test Email'}
         return render(request, 'admin/test_email.html', context)
+
+
+@admin.register(ReminderLedger)
+class ReminderLedgerAdmin(admin.ModelAdmin):
+    list_display = ('kind', 'target_type', 'target_id', 'day', 'status', 'updated_at')
+    list_filter = ('kind', 'target_type', 'status', 'day')
+    search_fields = ('target_id',)
+    readonly_fields = ('target_type', 'target_id', 'kind', 'day', 'claim_token', 'claimed_at', 'updated_at')
+
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    list_display = ('task_name', 'status', 'attempts', 'available_at', 'created_at', 'sent_at')
+    list_filter = ('status', 'task_name')
+    readonly_fields = ('created_at', 'sent_at', 'last_error', 'claim_token', 'claimed_at')
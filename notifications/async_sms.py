@@ -0,0 +1,110 @@
+import asyncio
+import json
+
+import aiohttp
+from django.conf import settings
+
+from .ratelimit import reserve_slot
+from .utils import _interpret_sms_response, _normalize_msisdn, _sms_config
+
+
+def _retry_delay(retry_after: str, attempt: int) -> float:
+    """Seconds to wait from a Retry-After header (seconds form), else exponential backoff."""
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        return 0.5 * (2 ** attempt)
+
+
+async def _post_sms(session, semaphore, config, recipient: str, body: str, retries: int, urgent: bool):
+    payload = {
+        'username': config['username'],
+        'apikey': config['apikey'],
+        'sender': config['sender'],
+        'messagetext': body,
+        'recipients': recipient,
+        'flash': '0',
+        'force_dnd': config['force_dnd'],
+    }
+    meta = {
+        'base_url': config['base_url'],
+        'sender': config['sender'],
+        'recipients': recipient,
+        'force_dnd': config['force_dnd'],
+        'dispatcher': 'async',
+    }
+    async with semaphore:
+        for attempt in range(retries + 1):
+            # Provider-wide SMS quota (NOTIFICATIONS_RATE_LIMITS), shared with every other sender.
+            # The limiter is a blocking cache round trip, so it runs in a worker thread
+            while (delay := await asyncio.to_thread(reserve_slot, 'SMS', urgent)):
+                await asyncio.sleep(delay)
+            try:
+                async with session.post(config['base_url'], data=payload) as resp:
+                    text = await resp.text()
+                    status_code = resp.status
+                    retry_after = resp.headers.get('Retry-After')
+            except aiohttp.ClientConnectionError as e:
+                # Connection never carried the request (or dropped it); safe to retry
+                if attempt < retries and not isinstance(e, aiohttp.ServerDisconnectedError):
+                    await asyncio.sleep(0.5 * (2 ** attempt))
+                    continue
+                return False, {'error': 'request_exception', 'detail': str(e), **meta}
+            except Exception as e:
+                # Timeouts and other errors are not retried: the provider may have accepted it
+                return False, {'error': 'request_exception', 'detail': str(e) or e.__class__.__name__, **meta}
+            # Only an explicit "come back later" is retried; a 502/504 may already have been delivered
+            if status_code in (429, 503) and retry_after and attempt < retries:
+                await asyncio.sleep(_retry_delay(retry_after, attempt))
+                continue
+            break
+    try:
+        data = json.loads(text)
+    except Exception:
+        data = None
+    return _interpret_sms_response(status_code, text, data, {'status_code': status_code, **meta})
+
+
+async def dispatch_sms_async(items, concurrency: int | None = None, urgent: bool = False):
+    """Send ``(to_number, body)`` pairs concurrently; returns ``(success, meta)`` per item, in order.
+
+    At most ``concurrency`` requests are in flight, and every request takes a slot
+    from the shared SMS rate limiter (``reserve_slot``, called off the event loop), so
+    throughput is bounded by the provider quota across all workers rather than by
+    round-trip latency.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    config = _sms_config()
+    concurrency = int(concurrency or getattr(settings, 'EBULKSMS_CONCURRENCY', 50))
+    retries = int(getattr(settings, 'EBULKSMS_RETRIES', 3))
+
+    pending = []
+    for index, (to_number, body) in enumerate(items):
+        if not to_number or not body:
+            results[index] = (False, {'error': 'missing_params'})
+        elif config is None:
+            results[index] = (False, {'error': 'missing_credentials'})
+        elif not _normalize_msisdn(to_number):
+            results[index] = (False, {'error': 'invalid_recipient'})
+        else:
+            pending.append((index, _normalize_msisdn(to_number), body))
+    if not pending:
+        return results
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+    timeout = aiohttp.ClientTimeout(total=config['timeout'])
+    connector = aiohttp.TCPConnector(limit=max(1, concurrency))
+    async with aiohttp.ClientSession(timeout=timeout, connector=connector) as session:
+        sent = await asyncio.gather(*(
+            _post_sms(session, semaphore, config, recipient, body, retries, urgent)
+            for _, recipient, body in pending
+        ))
+    for (index, _, _), outcome in zip(pending, sent):
+        results[index] = outcome
+    return results
+
+
+def send_sms_concurrent(items, concurrency: int | None = None, urgent: bool = False):
+    """Synchronous entry point for tasks; must not be called from inside a running event loop."""
+    return asyncio.run(dispatch_sms_async(items, concurrency=concurrency, urgent=urgent))
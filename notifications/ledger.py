@@ -0,0 +1,66 @@
+import uuid
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import ReminderLedger
+
+
+class Claim(frozenset):
+    """Target IDs owned by one claim, plus the token their results must be recorded with."""
+
+    def __new__(cls, target_ids=(), token: str = ''):
+        claim = super().__new__(cls, target_ids)
+        claim.token = token
+        return claim
+
+
+def claim_reminders(target_type: str, kind: str, day: date, target_ids) -> Claim:
+    """Claim (target, kind, day) keys before sending; returns the target IDs this caller now owns.
+
+    Keys already SENT, or CLAIMED by another worker, are not returned. FAILED keys and
+    CLAIMED keys older than NOTIFICATIONS_LEDGER_CLAIM_TTL minutes (a worker died
+    mid-send) are re-claimed so they get another attempt.
+    """
+    target_ids = list(set(target_ids))
+    if not target_ids:
+        return Claim()
+    token = uuid.uuid4().hex
+    key = {'target_type': target_type, 'kind': kind, 'day': day}
+    stale_before = timezone.now() - timedelta(minutes=int(getattr(settings, 'NOTIFICATIONS_LEDGER_CLAIM_TTL', 30)))
+    ReminderLedger.objects.filter(target_id__in=target_ids, status='FAILED', **key)\
+        .update(status='CLAIMED', claim_token=token, updated_at=timezone.now())
+    ReminderLedger.objects.filter(target_id__in=target_ids, status='CLAIMED', updated_at__lt=stale_before, **key)\
+        .update(claim_token=token, updated_at=timezone.now())
+    ReminderLedger.objects.bulk_create(
+        [ReminderLedger(target_id=target_id, claim_token=token, **key) for target_id in target_ids],
+        ignore_conflicts=True,
+    )
+    return Claim(ReminderLedger.objects.filter(claim_token=token).values_list('target_id', flat=True), token)
+
+
+def claim_reminder(target_type: str, kind: str, day: date, target_id: int) -> str:
+    """Claim one key; returns the claim token, or '' when another run owns or sent it."""
+    claim = claim_reminders(target_type, kind, day, [target_id])
+    return claim.token if target_id in claim else ''
+
+
+def record_reminder_results(target_type: str, kind: str, day: date, token: str, sent_ids=(), failed_ids=()):
+    """Mark keys still held by ``token`` SENT, or FAILED so a later run may retry them.
+
+    Keys whose claim expired and were re-claimed by another worker are left alone.
+    """
+    key = {'target_type': target_type, 'kind': kind, 'day': day, 'claim_token': token}
+    now = timezone.now()
+    if sent_ids:
+        ReminderLedger.objects.filter(target_id__in=list(sent_ids), **key).update(status='SENT', updated_at=now)
+    if failed_ids:
+        ReminderLedger.objects.filter(target_id__in=list(failed_ids), **key).update(status='FAILED', updated_at=now)
+
+
+def record_reminder_result(target_type: str, kind: str, day: date, target_id: int, token: str, success: bool):
+    if success:
+        record_reminder_results(target_type, kind, day, token, sent_ids=[target_id])
+    else:
+        record_reminder_results(target_type, kind, day, token, failed_ids=[target_id])
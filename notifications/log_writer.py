@@ -0,0 +1,52 @@
+from django.conf import settings
+
+from .models import NotificationLog
+
+
+class NotificationLogWriter:
+    """Buffers NotificationLog rows in memory and writes them with bulk_create.
+
+    Rows are flushed whenever the buffer reaches ``batch_size`` and once more when
+    the writer is closed, so use it as a context manager around a task body:
+
+        with NotificationLogWriter() as log:
+            log.add(recipient=user, channel='SMS', type='REMINDER', message=text, success=ok, meta=meta)
+    """
+
+    def __init__(self, batch_size: int | None = None):
+        self.batch_size = max(1, int(batch_size or getattr(settings, 'NOTIFICATIONS_LOG_BATCH_SIZE', 500)))
+        self._pending: list[NotificationLog] = []
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        return False
+
+    def add(self, **fields):
+        self._pending.append(NotificationLog(**fields))
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        rows, self._pending = self._pending, []
+        if not rows:
+            return 0
+        try:
+            NotificationLog.objects.bulk_create(rows, batch_size=self.batch_size)
+            self.written += len(rows)
+            return len(rows)
+        except Exception:
+            # Logging must never break delivery: retry row by row so one bad row
+            # (e.g. a recipient without a user) does not drop the whole batch
+            saved = 0
+            for row in rows:
+                try:
+                    row.save()
+                    saved += 1
+                except Exception:
+                    pass
+            self.written += saved
+            return saved
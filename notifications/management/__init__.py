@@ -0,0 +1 @@
+"""Notifications management commands package."""
\ No newline at end of file
@@ -0,0 +1,34 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.outbox import drain_outbox, purge_sent
+
+
+class Command(BaseCommand):
+    help = "Dispatch pending NotificationOutbox rows in batches (alternative to the beat drainer)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=None, help='Rows claimed and dispatched per batch')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after this many batches')
+        parser.add_argument('--loop', action='store_true', help='Keep polling instead of exiting when the outbox is empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds between polls with --loop')
+        parser.add_argument('--inline', action='store_true', help='Run each task in this process instead of queueing it (no broker)')
+
+    def handle(self, *args, **options):
+        while True:
+            totals = drain_outbox(
+                batch_size=options.get('batch_size'),
+                max_batches=options.get('max_batches'),
+                inline=options.get('inline', False),
+            )
+            if totals['processed']:
+                self.stdout.write(self.style.SUCCESS(
+                    f"Processed {totals['processed']} outbox rows; sent {totals['sent']}, failed {totals['failed']}"
+                ))
+            if not options.get('loop'):
+                break
+            time.sleep(options.get('interval') or 5.0)
+        purged = purge_sent()
+        if purged:
+            self.stdout.write(self.style.NOTICE(f"Purged {purged} delivered rows"))
@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-18 05:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0002_activitylog'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReminderLedger',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('target_type', models.CharField(help_text='e.g. schedule, appointment', max_length=32)),
+                ('target_id', models.BigIntegerField()),
+                ('kind', models.CharField(help_text='Reminder kind, e.g. pre3, today, missed2', max_length=32)),
+                ('day', models.DateField(help_text='Send day, or the scheduled date the daily reminder refers to')),
+                ('status', models.CharField(choices=[('CLAIMED', 'Claimed'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='CLAIMED', max_length=10)),
+                ('claim_token', models.CharField(blank=True, db_index=True, max_length=32)),
+                ('claimed_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='reminderledger',
+            constraint=models.UniqueConstraint(fields=('target_type', 'target_id', 'kind', 'day'), name='notifications_reminder_once_per_day'),
+        ),
+    ]
@@ -1,5 +1,6 @@
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 
 
 class NotificationLog(models.Model):
@@ -24,3 +25,69 @@ class NotificationLog(models.Model):
 
     def __str__(self):
         return f"{self.type} via {self.channel} to {self.recipient.email}"
+
+
+class ReminderLedger(models.Model):
+    """One row per (target, reminder kind, day) claimed for sending.
+
+    The unique key turns a duplicate dispatch (beat re-run, Celery retry, repeated
+    signal) into an indexed lookup instead of a second paid send.
+    """
+    STATUS_CHOICES = (
+        ('CLAIMED', 'Claimed'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    target_type = models.CharField(max_length=32, help_text='e.g. schedule, appointment')
+    target_id = models.BigIntegerField()
+    kind = models.CharField(max_length=32, help_text='Reminder kind, e.g. pre3, today, missed2')
+    day = models.DateField(help_text='Send day, or the scheduled date the daily reminder refers to')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='CLAIMED')
+    claim_token = models.CharField(max_length=32, blank=True, db_index=True)
+    claimed_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['target_type', 'target_id', 'kind', 'day'], name='notifications_reminder_once_per_day'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} for {self.target_type} #{self.target_id} on {self.day} ({self.status})"
+
+
+class NotificationOutbox(models.Model):
+    """Notification work written in the same DB transaction as the change that caused it.
+
+    A drainer (beat task or ``manage.py drain_notification_outbox``) hands rows to
+    their Celery queues in batches, so web requests never wait on SMTP/SMS and
+    nothing is lost while the broker is down.
+    """
+    STATUS_CHOICES = (
+        ('PENDING', 'Pending'),
+        ('PROCESSING', 'Processing'),
+        ('SENT', 'Sent'),
+        ('FAILED', 'Failed'),
+    )
+
+    task_name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='PENDING')
+    attempts = models.PositiveIntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    # Set when a drainer claims the row; results are only written under the same token
+    claim_token = models.CharField(max_length=32, blank=True)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'available_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.task_name}{tuple(self.args)} ({self.status})"
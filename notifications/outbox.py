@@ -0,0 +1,110 @@
+import uuid
+from datetime import timedelta
+
+from celery import current_app
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import NotificationOutbox
+
+
+def enqueue_notification(task, *args, **kwargs) -> NotificationOutbox:
+    """Record a notification task in the outbox as part of the caller's transaction.
+
+    Once the transaction commits the drainer is nudged; if the broker is unreachable
+    the row simply waits for the next scheduled drain.
+    """
+    row = NotificationOutbox.objects.create(task_name=task.name, args=list(args), kwargs=kwargs)
+    if getattr(settings, 'NOTIFICATIONS_OUTBOX_KICK', True):
+        transaction.on_commit(_kick_drainer)
+    return row
+
+
+def _kick_drainer():
+    try:
+        current_app.send_task('notifications.tasks.drain_notification_outbox', retry=False)
+    except Exception:
+        # Broker down: the beat schedule drains the outbox later
+        pass
+
+
+def drain_outbox(batch_size: int | None = None, max_batches: int | None = None, inline: bool = False) -> dict:
+    """Hand pending outbox rows to their Celery queues in batches; returns processed/sent/failed counts.
+
+    Each batch is claimed in its own short transaction: rows are locked with SKIP
+    LOCKED, marked PROCESSING under a fresh token and committed. Only then is each
+    task dispatched with ``apply_async`` (so it lands on its routed queue), and its
+    result is written back by a separate statement filtered on the token. A crash
+    mid-batch therefore never rolls back rows that already went out. Rows left
+    PROCESSING for NOTIFICATIONS_OUTBOX_CLAIM_TTL seconds are claimed again; the
+    reminder ledger keeps such a re-run from sending twice.
+
+    With ``inline=True`` (no broker available) each task runs in this process
+    instead, one row per transaction. A failing row is retried with exponential
+    backoff until NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS, then left as FAILED.
+    """
+    batch_size = batch_size or int(getattr(settings, 'NOTIFICATIONS_OUTBOX_BATCH_SIZE', 100))
+    max_attempts = int(getattr(settings, 'NOTIFICATIONS_OUTBOX_MAX_ATTEMPTS', 5))
+    totals = {'processed': 0, 'sent': 0, 'failed': 0}
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        token, rows = _claim(batch_size)
+        if not rows:
+            break
+        for row in rows:
+            _dispatch(row, token, max_attempts, inline, totals)
+        batches += 1
+        totals['processed'] += len(rows)
+    return totals
+
+
+def _claim(batch_size: int) -> tuple[str, list[NotificationOutbox]]:
+    """Mark up to ``batch_size`` due rows PROCESSING under a new token and commit."""
+    token = uuid.uuid4().hex
+    now = timezone.now()
+    stale_before = now - timedelta(seconds=int(getattr(settings, 'NOTIFICATIONS_OUTBOX_CLAIM_TTL', 300)))
+    with transaction.atomic():
+        ids = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='PENDING', available_at__lte=now) | Q(status='PROCESSING', claimed_at__lt=stale_before))
+            .order_by('id')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return token, []
+        NotificationOutbox.objects.filter(pk__in=ids).update(
+            status='PROCESSING', claim_token=token, claimed_at=now, attempts=F('attempts') + 1,
+        )
+    return token, list(NotificationOutbox.objects.filter(pk__in=ids, claim_token=token).order_by('id'))
+
+
+def _dispatch(row: NotificationOutbox, token: str, max_attempts: int, inline: bool, totals: dict):
+    now = timezone.now()
+    claimed = NotificationOutbox.objects.filter(pk=row.pk, claim_token=token, status='PROCESSING')
+    try:
+        task = current_app.tasks[row.task_name]
+        if inline:
+            with transaction.atomic():
+                task(*row.args, **row.kwargs)
+        else:
+            task.apply_async(args=row.args, kwargs=row.kwargs)
+    except Exception as e:
+        error = f"{e.__class__.__name__}: {e}"[:1000]
+        if row.attempts >= max_attempts:
+            claimed.update(status='FAILED', last_error=error)
+            totals['failed'] += 1
+        else:
+            retry_at = now + timedelta(seconds=30 * (2 ** (row.attempts - 1)))
+            claimed.update(status='PENDING', available_at=retry_at, last_error=error)
+        return
+    claimed.update(status='SENT', sent_at=now, last_error='')
+    totals['sent'] += 1
+
+
+def purge_sent(older_than_days: int | None = None) -> int:
+    days = older_than_days if older_than_days is not None else int(getattr(settings, 'NOTIFICATIONS_OUTBOX_RETENTION_DAYS', 7))
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = NotificationOutbox.objects.filter(status='SENT', sent_at__lt=cutoff).delete()
+    return deleted
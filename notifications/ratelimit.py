@@ -0,0 +1,97 @@
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache
+
+
+# Backends whose counters are private to one process; limits kept there would be
+# multiplied by the number of workers, so they are not enforced at all
+LOCAL_CACHE_BACKENDS = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def shared_cache_configured() -> bool:
+    backend = getattr(settings, 'CACHES', {}).get('default', {}).get('BACKEND', LOCAL_CACHE_BACKENDS[0])
+    return backend not in LOCAL_CACHE_BACKENDS
+
+
+@checks.register()
+def check_rate_limit_cache(app_configs, **kwargs):
+    limits = getattr(settings, 'NOTIFICATIONS_RATE_LIMITS', {})
+    if any(_parse_rate(rate)[0] for rate in limits.values()) and not shared_cache_configured():
+        return [checks.Warning(
+            'NOTIFICATIONS_RATE_LIMITS are set but the default cache is per-process, so they are not enforced.',
+            hint='Point CACHE_URL at a shared cache (e.g. the Redis server used by Celery).',
+            id='notifications.W001',
+        )]
+    return []
+
+
+def _parse_rate(rate) -> tuple[int, int]:
+    """``'10/s'``, ``'600/m'``, ``'1000/h'`` or a bare number per second -> ``(count, seconds)``."""
+    if rate in (None, '', 0):
+        return 0, 1
+    if isinstance(rate, (int, float)):
+        return int(rate), 1
+    count, _, unit = str(rate).partition('/')
+    period = {'s': 1, 'm': 60, 'h': 3600}.get((unit or 's').strip().lower()[:1], 1)
+    return int(float(count)), period
+
+
+def _channel_limit(channel: str, urgent: bool) -> tuple[int, int]:
+    count, period = _parse_rate(getattr(settings, 'NOTIFICATIONS_RATE_LIMITS', {}).get(channel))
+    if count and not urgent:
+        # Leave part of every window to transactional traffic so a reminder burst
+        # cannot use up the whole provider quota
+        reserve = float(getattr(settings, 'NOTIFICATIONS_RATE_URGENT_RESERVE', 0.2))
+        count = max(1, int(count * (1 - reserve)))
+    return count, period
+
+
+def reserve_slot(channel: str, urgent: bool = False) -> float:
+    """Try to take one request slot for ``channel`` in the current window.
+
+    Returns 0 when the slot was taken, otherwise the seconds until the window resets.
+    Counters live in the default cache, so the limit is shared by every worker using
+    the same cache backend. Unconfigured channels are not limited, and neither is
+    anything while the default cache is per-process (see ``check_rate_limit_cache``).
+    """
+    limit, period = _channel_limit(channel, urgent)
+    if not limit or not shared_cache_configured():
+        return 0.0
+    now = time.time()
+    window = int(now // period)
+    key = f"notifications:rate:{channel}:{window}"
+    try:
+        cache.add(key, 0, timeout=period * 2)
+        used = cache.incr(key)
+    except Exception:
+        # Cache unavailable: fail open rather than stall deliveries
+        return 0.0
+    if used <= limit:
+        return 0.0
+    # Hand the slot back so rejected attempts do not eat into the urgent headroom
+    try:
+        cache.decr(key)
+    except Exception:
+        pass
+    return max(0.01, (window + 1) * period - now)
+
+
+def throttle(channel: str, urgent: bool = False, max_wait: float | None = None) -> bool:
+    """Block until a slot for ``channel`` is free; returns False if ``max_wait`` ran out first.
+
+    Web requests should pass ``max_wait=0`` so they fail fast instead of sleeping.
+    """
+    waited = 0.0
+    while True:
+        delay = reserve_slot(channel, urgent)
+        if not delay:
+            return True
+        if max_wait is not None and waited + delay > max_wait:
+            return False
+        time.sleep(delay)
+        waited += delay
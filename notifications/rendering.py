@@ -0,0 +1,148 @@
+from dataclasses import dataclass
+
+from django.template import Context, engines
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from immunization.models import ImmunizationMaster
+
+
+@dataclass(frozen=True)
+class RenderedNotification:
+    subject: str
+    html: str
+    text: str
+    sms: str
+
+
+class NotificationTemplate:
+    """Subject, HTML, plain-text and SMS templates for one kind of notification.
+
+    Subject, text and SMS are ``str.format`` patterns (``{schedule.vaccine_name}``,
+    ``{schedule.scheduled_date:%Y-%m-%d}``); the HTML body is a Django template that
+    is compiled on first use and kept for the life of the worker process. All parts
+    are rendered from the same context in one call.
+    """
+
+    def __init__(self, subject: str, html: str, sms: str, text: str | None = None):
+        self.subject = subject
+        self.html = html
+        self.sms = sms
+        self.text = text
+        self._html_template = None
+
+    def compile(self):
+        if self._html_template is None:
+            self._html_template = engines['django'].engine.get_template(self.html)
+        return self._html_template
+
+    def render(self, context: dict) -> RenderedNotification:
+        html_template = self.compile()
+        sms = self.sms.format_map(context)
+        return RenderedNotification(
+            subject=self.subject.format_map(context),
+            html=html_template.render(Context(context)),
+            text=self.text.format_map(context) if self.text else sms,
+            sms=sms,
+        )
+
+
+NOTIFICATION_TEMPLATES = {
+    'appointment_scheduled': NotificationTemplate(
+        subject='Appointment {appointment_type} scheduled',
+        html='notifications/email_appointment_scheduled.html',
+        sms='Appointment {appointment_type} at {appointment.scheduled_at:%Y-%m-%d %H:%M}',
+    ),
+    'appointment_reminder': NotificationTemplate(
+        subject='Reminder: {appointment_type} at {appointment.scheduled_at:%Y-%m-%d %H:%M}',
+        html='notifications/email_appointment_reminder.html',
+        sms='Reminder: {appointment_type} at {appointment.scheduled_at:%Y-%m-%d %H:%M}',
+    ),
+    'immunization_scheduled': NotificationTemplate(
+        subject='Immunization scheduled: {schedule.vaccine_name}',
+        html='notifications/email_immunization_scheduled.html',
+        sms='{baby.name}: {schedule.vaccine_name} on {schedule.scheduled_date:%Y-%m-%d}',
+    ),
+    'immunization_reminder': NotificationTemplate(
+        subject='Reminder: {schedule.vaccine_name} on {schedule.scheduled_date:%Y-%m-%d}',
+        html='notifications/email_immunization_reminder.html',
+        sms='Reminder: {schedule.vaccine_name} on {schedule.scheduled_date:%Y-%m-%d}',
+    ),
+    'immunization_pre3': NotificationTemplate(
+        subject='In 3 days: {schedule.vaccine_name} for {baby.name}',
+        html='notifications/email_immunization_pre3.html',
+        sms='In 3 days: {baby.name} • {schedule.vaccine_name} on {schedule.scheduled_date:%Y-%m-%d}',
+    ),
+    'immunization_today': NotificationTemplate(
+        subject='Today: {schedule.vaccine_name} for {baby.name}',
+        html='notifications/email_immunization_today.html',
+        sms='Today: {baby.name} • {schedule.vaccine_name}',
+    ),
+    'immunization_missed2': NotificationTemplate(
+        subject='Missed immunization: {schedule.vaccine_name} for {baby.name}',
+        html='notifications/email_missed_immunization.html',
+        sms='Missed: {baby.name} • {schedule.vaccine_name} ({schedule.scheduled_date:%Y-%m-%d})',
+    ),
+    # One message per baby for a newly generated schedule; ``first`` is the earliest entry
+    'immunization_schedule_created': NotificationTemplate(
+        subject='Immunization schedule for {baby.name} ({count} vaccines)',
+        html='notifications/email_immunization_schedule_created.html',
+        sms='{baby.name}: immunization schedule created ({count} vaccines). First: {first.vaccine_name} on {first.scheduled_date:%Y-%m-%d}',
+    ),
+    # One message per mother for a batch of schedules marked MISSED; ``summary`` lists them
+    'immunization_missed_digest': NotificationTemplate(
+        subject='Missed immunizations ({count})',
+        html='notifications/email_missed_immunization_digest.html',
+        sms='Missed: {summary}. Please contact the clinic to reschedule.',
+    ),
+}
+
+
+def get_notification_template(name: str) -> NotificationTemplate:
+    try:
+        return NOTIFICATION_TEMPLATES[name]
+    except KeyError:
+        raise ValueError(f"Unknown notification template: {name}")
+
+
+class NotificationRenderer:
+    """Renders registered notification templates for many recipients.
+
+    Fragments that do not depend on the recipient (e.g. the vaccine description
+    block) are rendered once per renderer and reused, so create one renderer per
+    task or chunk.
+    """
+
+    def __init__(self):
+        self._fragments = {}
+        self._descriptions = None
+
+    def fragment(self, key, build):
+        if key not in self._fragments:
+            self._fragments[key] = build()
+        return self._fragments[key]
+
+    def vaccine_info(self, vaccine_name: str):
+        return self.fragment(('vaccine_info', vaccine_name), lambda: self._render_vaccine_info(vaccine_name))
+
+    def _render_vaccine_info(self, vaccine_name: str):
+        if self._descriptions is None:
+            self._descriptions = {}
+            for name, description in ImmunizationMaster.objects.filter(is_active=True).values_list('name', 'description'):
+                self._descriptions.setdefault(name, description)
+        description = self._descriptions.get(vaccine_name)
+        if not description:
+            return ''
+        return mark_safe(render_to_string('notifications/_vaccine_info.html', {
+            'vaccine_name': vaccine_name,
+            'description': description,
+        }))
+
+    def render(self, name: str, **context) -> RenderedNotification:
+        schedule = context.get('schedule')
+        if schedule is not None:
+            context.setdefault('vaccine_info', self.vaccine_info(schedule.vaccine_name))
+        appointment = context.get('appointment')
+        if appointment is not None:
+            context.setdefault('appointment_type', appointment.get_appointment_type_display())
+        return get_notification_template(name).render(context)
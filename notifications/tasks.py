@@ -1,13 +1,16 @@
 from datetime import date, timedelta
-from celery import shared_task
+from celery import chord, shared_task
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 from django.conf import settings
 from appointments.models import Appointment
 from immunization.models import ImmunizationSchedule
-from notifications.utils import send_email, send_sms
-from notifications.models import NotificationLog
-from django.template.loader import render_to_string
+from notifications.utils import send_email, send_emails, send_sms, send_sms_batch
+from notifications.async_sms import send_sms_concurrent
+from notifications.ledger import claim_reminder, claim_reminders, record_reminder_result, record_reminder_results
+from notifications.log_writer import NotificationLogWriter
+from notifications.outbox import drain_outbox, purge_sent
+from notifications.rendering import NotificationRenderer
 
 User = get_user_model()
 
@@ -23,24 +26,14 @@ def send_appointment_notifications(appointment_id: int):
     email = getattr(user, 'email', '')
     phone = patient.phone_number or getattr(user, 'phone_number', '')
 
-    subject = f"Appointment {appt.get_appointment_type_display()} scheduled"
-    html = f"""
-    <p>Hello {patient.full_name},</p>
-    <p>Your appointment ({appt.get_appointment_type_display()}) is scheduled at {appt.scheduled_at:%Y-%m-%d %H:%M}.</p>
-    {f'<p>Assigned doctor: {appt.doctor.email}</p>' if appt.doctor else ''}
-    <p>Thank you.</p>
-    """
-    ok_email = send_email(email, subject, html)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='EMAIL', type='APPOINTMENT', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-    except Exception:
-        pass
-    sms_text = f"Appointment {appt.get_appointment_type_display()} at {appt.scheduled_at:%Y-%m-%d %H:%M}"
-    ok_sms, meta_sms = send_sms(phone, sms_text)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='SMS', type='APPOINTMENT', message=sms_text, success=ok_sms, meta=meta_sms)
-    except Exception:
-        pass
+    msg = NotificationRenderer().render('appointment_scheduled', patient=patient, appointment=appt)
+    log = NotificationLogWriter()
+    # Transactional: may use the rate-limit headroom kept free of reminder traffic
+    ok_email = send_email(email, msg.subject, msg.html, msg.text, urgent=True)
+    log.add(recipient=user, channel='EMAIL', type='APPOINTMENT', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+    ok_sms, meta_sms = send_sms(phone, msg.sms, urgent=True)
+    log.add(recipient=user, channel='SMS', type='APPOINTMENT', message=msg.sms, success=ok_sms, meta=meta_sms)
+    log.flush()
     return True
 
 
@@ -55,26 +48,20 @@ def send_immunization_notifications(schedule_id: int):
     email = getattr(user, 'email', '')
     phone = mother.phone_number or getattr(user, 'phone_number', '')
 
-    subject = f"Immunization scheduled: {sched.vaccine_name}"
-    html = render_to_string(
-        'notifications/email_immunization_scheduled.html',
-        {
-            'mother': mother,
-            'baby': sched.baby,
-            'schedule': sched,
-        },
-    )
-    ok_email = send_email(email, subject, html)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-    except Exception:
-        pass
-    sms_text = f"{sched.baby.name}: {sched.vaccine_name} on {sched.scheduled_date:%Y-%m-%d}"
-    ok_sms, meta_sms = send_sms(phone, sms_text)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-    except Exception:
-        pass
+    # The post_save signal fires on every update_fields save; send each status at most once per day
+    day = date.today()
+    kind = f"status_{sched.status.lower()}"
+    token = claim_reminder('schedule', kind, day, sched.pk)
+    if not token:
+        return False
+    msg = NotificationRenderer().render('immunization_scheduled', mother=mother, baby=sched.baby, schedule=sched)
+    log = NotificationLogWriter()
+    ok_email = send_email(email, msg.subject, msg.html, msg.text, urgent=True)
+    log.add(recipient=user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+    ok_sms, meta_sms = send_sms(phone, msg.sms, urgent=True)
+    log.add(recipient=user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+    record_reminder_result('schedule', kind, day, sched.pk, token, ok_email or ok_sms)
+    log.flush()
     return True
 
 
@@ -94,26 +81,17 @@ def send_immunization_reminder(schedule_id: int):
     email = getattr(user, 'email', '')
     phone = mother.phone_number or getattr(user, 'phone_number', '')
 
-    subject = f"Reminder: {sched.vaccine_name} on {sched.scheduled_date:%Y-%m-%d}"
-    html = render_to_string(
-        'notifications/email_immunization_reminder.html',
-        {
-            'mother': mother,
-            'baby': sched.baby,
-            'schedule': sched,
-        },
-    )
-    ok_email = send_email(email, subject, html)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-    except Exception:
-        pass
-    sms_text = f"Reminder: {sched.vaccine_name} on {sched.scheduled_date:%Y-%m-%d}"
-    ok_sms, meta_sms = send_sms(phone, sms_text)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-    except Exception:
-        pass
+    token = claim_reminder('schedule', 'reminder', today, sched.pk)
+    if not token:
+        return False
+    msg = NotificationRenderer().render('immunization_reminder', mother=mother, baby=sched.baby, schedule=sched)
+    log = NotificationLogWriter()
+    ok_email = send_email(email, msg.subject, msg.html, msg.text)
+    log.add(recipient=user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+    ok_sms, meta_sms = send_sms(phone, msg.sms)
+    log.add(recipient=user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+    record_reminder_result('schedule', 'reminder', today, sched.pk, token, ok_email or ok_sms)
+    log.flush()
     return True
 
 
@@ -134,140 +112,214 @@ def send_appointment_reminder(appointment_id: int):
     email = getattr(user, 'email', '')
     phone = patient.phone_number or getattr(user, 'phone_number', '')
 
-    subject = f"Reminder: {appt.get_appointment_type_display()} at {appt.scheduled_at:%Y-%m-%d %H:%M}"
-    html = f"""
-    <p>Hello {patient.full_name},</p>
-    <p>Reminder: Your appointment ({appt.get_appointment_type_display()}) is at {appt.scheduled_at:%Y-%m-%d %H:%M}.</p>
-    """
-    ok_email = send_email(email, subject, html)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-    except Exception:
-        pass
-    sms_text = f"Reminder: {appt.get_appointment_type_display()} at {appt.scheduled_at:%Y-%m-%d %H:%M}"
-    ok_sms, meta_sms = send_sms(phone, sms_text)
-    try:
-        NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-    except Exception:
-        pass
+    token = claim_reminder('appointment', 'reminder', now.date(), appt.pk)
+    if not token:
+        return False
+    msg = NotificationRenderer().render('appointment_reminder', patient=patient, appointment=appt)
+    log = NotificationLogWriter()
+    ok_email = send_email(email, msg.subject, msg.html, msg.text)
+    log.add(recipient=user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+    ok_sms, meta_sms = send_sms(phone, msg.sms)
+    log.add(recipient=user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+    record_reminder_result('appointment', 'reminder', now.date(), appt.pk, token, ok_email or ok_sms)
+    log.flush()
     return True
 
 
+def _daily_reminder_target(kind: str, today: date | None = None) -> date:
+    today = today or date.today()
+    if kind == 'pre3':
+        # 3 days before due date
+        return today + timedelta(days=3)
+    if kind == 'today':
+        # On exact date
+        return today
+    if kind == 'missed2':
+        # If missed, 2 days after scheduled date, and not completed
+        return today - timedelta(days=2)
+    raise ValueError(f"Unknown daily reminder kind: {kind}")
+
+
+def _daily_reminder_queryset(kind: str, target: date):
+    qs = ImmunizationSchedule.objects.filter(scheduled_date=target)
+    if kind == 'missed2':
+        return qs.exclude(status='DONE')
+    return qs.filter(status='DUE')
+
+
+def _send_sms_many(items, urgent: bool = False):
+    # 'async' sends each recipient concurrently (bounded by EBULKSMS_CONCURRENCY and the
+    # shared SMS rate limit); 'batch' groups recipients sharing the same text into one call
+    if getattr(settings, 'NOTIFICATIONS_SMS_DISPATCHER', 'batch') == 'async':
+        return send_sms_concurrent(items, urgent=urgent)
+    return send_sms_batch(items, urgent=urgent)
+
+
+def _send_daily_reminders(kind: str, target: date, schedule_ids=None) -> int:
+    qs = _daily_reminder_queryset(kind, target)\
+        .select_related('baby', 'baby__mother', 'baby__mother__user')
+    if schedule_ids is not None:
+        # Re-apply the kind filter so rows completed since dispatch are skipped
+        qs = qs.filter(pk__in=schedule_ids)
+    schedules = list(qs)
+    # Skip schedules already reminded for this (kind, day) by an earlier run or retry
+    claimed = claim_reminders('schedule', kind, target, [sched.pk for sched in schedules])
+    renderer = NotificationRenderer()
+    outgoing = [
+        (sched, renderer.render(f'immunization_{kind}', mother=sched.baby.mother, baby=sched.baby, schedule=sched))
+        for sched in schedules if sched.pk in claimed
+    ]
+    # One backend connection for the whole chunk instead of one per recipient
+    email_results = send_emails([
+        (getattr(sched.baby.mother.user, 'email', ''), msg.subject, msg.html, msg.text)
+        for sched, msg in outgoing
+    ])
+    sms_results = _send_sms_many([
+        (sched.baby.mother.phone_number or getattr(sched.baby.mother.user, 'phone_number', ''), msg.sms)
+        for sched, msg in outgoing
+    ])
+    sent_ids, failed_ids = [], []
+    with NotificationLogWriter() as log:
+        for (sched, msg), ok_email, (ok_sms, meta_sms) in zip(outgoing, email_results, sms_results):
+            user = sched.baby.mother.user
+            log.add(recipient=user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+            log.add(recipient=user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+            (sent_ids if ok_email or ok_sms else failed_ids).append(sched.pk)
+    record_reminder_results('schedule', kind, target, claimed.token, sent_ids=sent_ids, failed_ids=failed_ids)
+    return len(outgoing)
+
+
+def _fan_out_daily_reminders(kind: str) -> int:
+    """Split the day's reminders into chunks of schedule IDs and send each chunk as its own subtask.
+
+    With fan-out disabled (``NOTIFICATIONS_REMINDER_FANOUT = False``) everything is sent
+    inline, as before. Otherwise the chunks run as a chord whose callback sums the
+    per-chunk counts; the return value is the number of schedules dispatched.
+    """
+    target = _daily_reminder_target(kind)
+    if not getattr(settings, 'NOTIFICATIONS_REMINDER_FANOUT', True):
+        return _send_daily_reminders(kind, target)
+
+    chunk_size = max(1, int(getattr(settings, 'NOTIFICATIONS_REMINDER_CHUNK_SIZE', 200)))
+    ids = list(_daily_reminder_queryset(kind, target).order_by('pk').values_list('pk', flat=True))
+    if not ids:
+        return 0
+    header = [
+        send_daily_immunization_chunk.s(kind, ids[i:i + chunk_size], target.isoformat())
+        for i in range(0, len(ids), chunk_size)
+    ]
+    chord(header)(aggregate_daily_immunization_chunks.s(kind))
+    return len(ids)
+
+
+@shared_task
+def send_daily_immunization_chunk(kind: str, schedule_ids: list[int], target: str):
+    return _send_daily_reminders(kind, date.fromisoformat(target), schedule_ids)
+
+
+@shared_task
+def aggregate_daily_immunization_chunks(counts: list[int], kind: str):
+    return {'kind': kind, 'chunks': len(counts), 'sent': sum(c or 0 for c in counts)}
+
+
 @shared_task
 def send_daily_immunization_pre3():
-    # 3 days before due date
-    target = date.today() + timedelta(days=3)
-    qs = ImmunizationSchedule.objects.select_related('baby', 'baby__mother', 'baby__mother__user')\
-        .filter(status='DUE', scheduled_date=target)
-    count = 0
-    for sched in qs:
-        mother = sched.baby.mother
-        user = mother.user
-        email = getattr(user, 'email', '')
-        phone = mother.phone_number or getattr(user, 'phone_number', '')
-        subject = f"In 3 days: {sched.vaccine_name} for {sched.baby.name}"
-        html = f"""
-        <p>Hello {mother.full_name},</p>
-        <p>This is a reminder that {sched.vaccine_name} for {sched.baby.name} is scheduled on {sched.scheduled_date:%Y-%m-%d} (in 3 days).</p>
-        """
-        ok_email = send_email(email, subject, html)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-        except Exception:
-            pass
-        sms_text = f"In 3 days: {sched.baby.name} • {sched.vaccine_name} on {sched.scheduled_date:%Y-%m-%d}"
-        ok_sms, meta_sms = send_sms(phone, sms_text)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-        except Exception:
-            pass
-        count += 1
-    return count
+    return _fan_out_daily_reminders('pre3')
 
 
 @shared_task
 def send_daily_immunization_today():
-    # On exact date
-    target = date.today()
-    qs = ImmunizationSchedule.objects.select_related('baby', 'baby__mother', 'baby__mother__user')\
-        .filter(status='DUE', scheduled_date=target)
-    count = 0
-    for sched in qs:
-        mother = sched.baby.mother
-        user = mother.user
-        email = getattr(user, 'email', '')
-        phone = mother.phone_number or getattr(user, 'phone_number', '')
-        subject = f"Today: {sched.vaccine_name} for {sched.baby.name}"
-        html = render_to_string(
-            'notifications/email_immunization_today.html',
-            {
-                'mother': mother,
-                'baby': sched.baby,
-                'schedule': sched,
-            },
-        )
-        ok_email = send_email(email, subject, html)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-        except Exception:
-            pass
-        sms_text = f"Today: {sched.baby.name} • {sched.vaccine_name}"
-        ok_sms, meta_sms = send_sms(phone, sms_text)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-        except Exception:
-            pass
-        count += 1
-    return count
+    return _fan_out_daily_reminders('today')
 
 
 @shared_task
 def send_daily_immunization_missed2():
-    # If missed, 2 days after scheduled date, and not completed
-    target = date.today() - timedelta(days=2)
-    qs = ImmunizationSchedule.objects.select_related('baby', 'baby__mother', 'baby__mother__user')\
-        .filter(scheduled_date=target).exclude(status='DONE')
-    count = 0
-    for sched in qs:
-        mother = sched.baby.mother
-        user = mother.user
-        email = getattr(user, 'email', '')
-        phone = mother.phone_number or getattr(user, 'phone_number', '')
-        subject = f"Missed immunization: {sched.vaccine_name} for {sched.baby.name}"
-        html = render_to_string(
-            'notifications/email_missed_immunization.html',
-            {
-                'mother': mother,
-                'baby': sched.baby,
-                'schedule': sched,
-            },
-        )
-        ok_email = send_email(email, subject, html)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='EMAIL', type='REMINDER', message=subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
-        except Exception:
-            pass
-        sms_text = f"Missed: {sched.baby.name} • {sched.vaccine_name} ({sched.scheduled_date:%Y-%m-%d})"
-        ok_sms, meta_sms = send_sms(phone, sms_text)
-        try:
-            NotificationLog.objects.create(recipient=user, channel='SMS', type='REMINDER', message=sms_text, success=ok_sms, meta=meta_sms)
-        except Exception:
-            pass
-        count += 1
-    return count
+    return _fan_out_daily_reminders('missed2')
 
 
 @shared_task
 def mark_overdue_immunizations_missed():
     # Auto-mark as MISSED if scheduled date has passed and not completed
+    from immunization.services import mark_overdue_missed
+    return mark_overdue_missed()
+
+
+@shared_task
+def send_schedule_created_digest(schedule_ids: list[int]):
+    """One email/SMS per baby listing the schedule entries just generated for it."""
+    today = date.today()
+    schedules = list(
+        ImmunizationSchedule.objects.select_related('baby', 'baby__mother', 'baby__mother__user')
+        .filter(pk__in=schedule_ids, status='DUE')
+        .order_by('baby_id', 'scheduled_date', 'pk')
+    )
+    # Same ledger kind as send_immunization_notifications for a new DUE entry
+    claimed = claim_reminders('schedule', 'status_due', today, [sched.pk for sched in schedules])
+    by_baby = {}
+    for sched in schedules:
+        if sched.pk in claimed:
+            by_baby.setdefault(sched.baby, []).append(sched)
+    renderer = NotificationRenderer()
+    outgoing = []
+    for baby, items in by_baby.items():
+        msg = renderer.render('immunization_schedule_created', mother=baby.mother, baby=baby, schedules=items,
+                              count=len(items), first=items[0])
+        outgoing.append((baby.mother, items, msg))
+    email_results = send_emails([
+        (getattr(mother.user, 'email', ''), msg.subject, msg.html, msg.text)
+        for mother, _, msg in outgoing
+    ], urgent=True)
+    sms_results = _send_sms_many([
+        (mother.phone_number or getattr(mother.user, 'phone_number', ''), msg.sms)
+        for mother, _, msg in outgoing
+    ], urgent=True)
+    sent_ids, failed_ids = [], []
+    with NotificationLogWriter() as log:
+        for (mother, items, msg), ok_email, (ok_sms, meta_sms) in zip(outgoing, email_results, sms_results):
+            log.add(recipient=mother.user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+            log.add(recipient=mother.user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+            (sent_ids if ok_email or ok_sms else failed_ids).extend(s.pk for s in items)
+    record_reminder_results('schedule', 'status_due', today, claimed.token, sent_ids=sent_ids, failed_ids=failed_ids)
+    return len(outgoing)
+
+
+@shared_task
+def send_missed_immunization_digest(schedule_ids: list[int]):
+    """One email/SMS per mother listing the schedules just marked MISSED in bulk."""
     today = date.today()
-    qs = ImmunizationSchedule.objects.filter(status='DUE', scheduled_date__lt=today)
-    updated = 0
-    for s in qs:
-        s.status = 'MISSED'
-        s.save(update_fields=['status'])
-        updated += 1
-    return updated
+    schedules = list(
+        ImmunizationSchedule.objects.select_related('baby', 'baby__mother', 'baby__mother__user')
+        .filter(pk__in=schedule_ids, status='MISSED')
+        .order_by('baby__mother_id', 'scheduled_date', 'pk')
+    )
+    # Same ledger kind as send_immunization_notifications, so neither path repeats the other
+    claimed = claim_reminders('schedule', 'status_missed', today, [sched.pk for sched in schedules])
+    by_mother = {}
+    for sched in schedules:
+        if sched.pk in claimed:
+            by_mother.setdefault(sched.baby.mother, []).append(sched)
+    renderer = NotificationRenderer()
+    outgoing = []
+    for mother, items in by_mother.items():
+        summary = '; '.join(f"{s.baby.name} • {s.vaccine_name} ({s.scheduled_date:%Y-%m-%d})" for s in items)
+        msg = renderer.render('immunization_missed_digest', mother=mother, schedules=items, count=len(items), summary=summary)
+        outgoing.append((mother, items, msg))
+    email_results = send_emails([
+        (getattr(mother.user, 'email', ''), msg.subject, msg.html, msg.text)
+        for mother, _, msg in outgoing
+    ])
+    sms_results = _send_sms_many([
+        (mother.phone_number or getattr(mother.user, 'phone_number', ''), msg.sms)
+        for mother, _, msg in outgoing
+    ])
+    sent_ids, failed_ids = [], []
+    with NotificationLogWriter() as log:
+        for (mother, items, msg), ok_email, (ok_sms, meta_sms) in zip(outgoing, email_results, sms_results):
+            log.add(recipient=mother.user, channel='EMAIL', type='REMINDER', message=msg.subject, success=ok_email, meta={'backend': settings.EMAIL_BACKEND})
+            log.add(recipient=mother.user, channel='SMS', type='REMINDER', message=msg.sms, success=ok_sms, meta=meta_sms)
+            (sent_ids if ok_email or ok_sms else failed_ids).extend(s.pk for s in items)
+    record_reminder_results('schedule', 'status_missed', today, claimed.token, sent_ids=sent_ids, failed_ids=failed_ids)
+    return len(outgoing)
 
 
 @shared_task
@@ -279,4 +331,11 @@ def send_daily_appointment_reminders():
     for appt in qs:
         send_appointment_reminder.delay(appt.pk)
         count += 1
-    return count
\ No newline at end of file
+    return count
+
+
+@shared_task
+def drain_notification_outbox():
+    totals = drain_outbox()
+    totals['purged'] = purge_sent()
+    return totals
@@ -1,3 +1,189 @@
-from django.test import TestCase
+import asyncio
+import tempfile
+import threading
+from datetime import date, timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import async_sms, outbox, ratelimit
+from .ledger import claim_reminder, claim_reminders, record_reminder_results
+from .models import NotificationOutbox, ReminderLedger
+from .tasks import send_immunization_notifications
+from .utils import send_sms
+
+
+class ReminderLedgerTests(TestCase):
+    day = date(2026, 3, 1)
+
+    def test_claimed_keys_are_not_claimed_again(self):
+        first = claim_reminders('schedule', 'pre3', self.day, [1, 2])
+        second = claim_reminders('schedule', 'pre3', self.day, [1, 2, 3])
+        self.assertEqual(first, {1, 2})
+        self.assertEqual(second, {3})
+        self.assertNotEqual(first.token, second.token)
+
+    def test_sent_keys_stay_sent(self):
+        claim = claim_reminders('schedule', 'pre3', self.day, [1])
+        record_reminder_results('schedule', 'pre3', self.day, claim.token, sent_ids=[1])
+        self.assertEqual(claim_reminder('schedule', 'pre3', self.day, 1), '')
+        self.assertEqual(ReminderLedger.objects.get().status, 'SENT')
+
+    def test_failed_keys_can_be_reclaimed(self):
+        claim = claim_reminders('schedule', 'pre3', self.day, [1])
+        record_reminder_results('schedule', 'pre3', self.day, claim.token, failed_ids=[1])
+        self.assertTrue(claim_reminder('schedule', 'pre3', self.day, 1))
+
+    def test_expired_claim_cannot_overwrite_the_new_owner(self):
+        stale = claim_reminders('schedule', 'pre3', self.day, [1])
+        ReminderLedger.objects.update(updated_at=timezone.now() - timedelta(days=1))
+        fresh = claim_reminders('schedule', 'pre3', self.day, [1])
+        self.assertEqual(fresh, {1})
+
+        record_reminder_results('schedule', 'pre3', self.day, fresh.token, failed_ids=[1])
+        # The worker whose claim expired finishes late and must not mark the key SENT
+        record_reminder_results('schedule', 'pre3', self.day, stale.token, sent_ids=[1])
+        self.assertEqual(ReminderLedger.objects.get().status, 'FAILED')
+
+
+@override_settings(NOTIFICATIONS_OUTBOX_KICK=False)
+class OutboxDrainTests(TestCase):
+    def enqueue(self, *args):
+        return outbox.enqueue_notification(send_immunization_notifications, *args)
+
+    def test_rows_are_dispatched_to_their_queue_not_run_inline(self):
+        row = self.enqueue(42)
+        with mock.patch.object(send_immunization_notifications, 'apply_async') as apply_async, \
+                mock.patch.object(send_immunization_notifications, 'run') as run:
+            totals = outbox.drain_outbox()
+        apply_async.assert_called_once_with(args=[42], kwargs={})
+        run.assert_not_called()
+        row.refresh_from_db()
+        self.assertEqual((row.status, row.attempts), ('SENT', 1))
+        self.assertEqual(totals, {'processed': 1, 'sent': 1, 'failed': 0})
+
+    def test_dispatch_failure_backs_off(self):
+        row = self.enqueue(42)
+        with mock.patch.object(send_immunization_notifications, 'apply_async', side_effect=ConnectionError('broker down')):
+            outbox.drain_outbox()
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'PENDING')
+        self.assertGreater(row.available_at, timezone.now())
+        self.assertIn('broker down', row.last_error)
+
+    def test_crash_mid_batch_keeps_earlier_rows_sent(self):
+        first, second = self.enqueue(1), self.enqueue(2)
+        dispatch = outbox._dispatch
+
+        def crash_on_second(row, *args):
+            if row.pk == second.pk:
+                raise SystemExit('worker killed')
+            dispatch(row, *args)
+
+        with mock.patch.object(send_immunization_notifications, 'apply_async'), \
+                mock.patch.object(outbox, '_dispatch', side_effect=crash_on_second):
+            with self.assertRaises(SystemExit):
+                outbox.drain_outbox()
+        first.refresh_from_db()
+        second.refresh_from_db()
+        # The first message already went out and must not be sent again
+        self.assertEqual(first.status, 'SENT')
+        self.assertEqual(second.status, 'PROCESSING')
+
+        with mock.patch.object(send_immunization_notifications, 'apply_async') as apply_async:
+            outbox.drain_outbox()
+        apply_async.assert_not_called()
+
+        # Once the claim expires the orphaned row is picked up again
+        NotificationOutbox.objects.filter(pk=second.pk).update(claimed_at=timezone.now() - timedelta(hours=1))
+        with mock.patch.object(send_immunization_notifications, 'apply_async') as apply_async:
+            outbox.drain_outbox()
+        apply_async.assert_called_once_with(args=[2], kwargs={})
+        second.refresh_from_db()
+        self.assertEqual((second.status, second.attempts), ('SENT', 2))
+
+    def test_inline_mode_runs_the_task_here(self):
+        row = self.enqueue(999999)
+        with mock.patch.object(send_immunization_notifications, 'apply_async') as apply_async:
+            outbox.drain_outbox(inline=True)
+        apply_async.assert_not_called()
+        row.refresh_from_db()
+        self.assertEqual(row.status, 'SENT')
+
+
+SHARED_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': tempfile.mkdtemp()}}
+LOCAL_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=SHARED_CACHE, NOTIFICATIONS_RATE_LIMITS={'SMS': '2/h'}, NOTIFICATIONS_RATE_URGENT_RESERVE=0.5)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        ratelimit.cache.clear()
+
+    def test_urgent_traffic_keeps_its_reserve(self):
+        self.assertEqual(ratelimit.reserve_slot('SMS'), 0)
+        self.assertGreater(ratelimit.reserve_slot('SMS'), 0)
+        self.assertEqual(ratelimit.reserve_slot('SMS', urgent=True), 0)
+        self.assertGreater(ratelimit.reserve_slot('SMS', urgent=True), 0)
+
+    @override_settings(CACHES=LOCAL_CACHE)
+    def test_per_process_cache_does_not_enforce_limits(self):
+        self.assertEqual([ratelimit.reserve_slot('SMS') for _ in range(5)], [0] * 5)
+        self.assertEqual([w.id for w in ratelimit.check_rate_limit_cache(None)], ['notifications.W001'])
+
+    @override_settings(EBULKSMS_USERNAME='u', EBULKSMS_API_KEY='k', EBULKSMS_SENDER='s')
+    def test_request_paths_fail_fast_instead_of_sleeping(self):
+        ratelimit.reserve_slot('SMS', urgent=True)
+        ratelimit.reserve_slot('SMS', urgent=True)
+        with mock.patch.object(ratelimit.time, 'sleep') as sleep, \
+                mock.patch('notifications.utils.get_sms_session') as session:
+            ok, meta = send_sms('08012345678', 'hello', urgent=True, wait=False)
+        self.assertEqual((ok, meta), (False, {'error': 'rate_limited'}))
+        sleep.assert_not_called()
+        session.assert_not_called()
+
+
+class _FakeResponse:
+    status = 200
+    headers = {}
+
+    async def text(self):
+        return '{}'
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class _FakeSession:
+    def __init__(self, *args, **kwargs):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def post(self, url, data):
+        return _FakeResponse()
+
+
+@override_settings(EBULKSMS_USERNAME='u', EBULKSMS_API_KEY='k', EBULKSMS_SENDER='s')
+class AsyncDispatchTests(TestCase):
+    def test_rate_limiter_runs_off_the_event_loop(self):
+        threads = []
+
+        def reserve(channel, urgent=False):
+            threads.append(threading.current_thread())
+            return 0.0
+
+        with mock.patch.object(async_sms, 'reserve_slot', side_effect=reserve), \
+                mock.patch.object(async_sms.aiohttp, 'ClientSession', _FakeSession):
+            results = asyncio.run(async_sms.dispatch_sms_async([('08012345678', 'hi'), ('08012345679', 'hi')], urgent=True))
+        self.assertEqual(len(results), 2)
+        self.assertEqual(len(threads), 2)
+        self.assertNotIn(threading.main_thread(), threads)
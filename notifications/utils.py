@@ -1,15 +1,30 @@
 from django.conf import settings
-from django.core.mail import EmailMultiAlternatives
+from django.core.mail import EmailMultiAlternatives, get_connection
+import uuid
+
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
+from .ratelimit import throttle
 
-def send_email(to_email: str, subject: str, html_content: str, text_content: str | None = None):
-    if not to_email:
-        return False
+
+def _build_email(to_email: str, subject: str, html_content: str, text_content: str | None = None, connection=None):
     text = text_content or 'You have a new notification.'
-    msg = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [to_email])
+    msg = EmailMultiAlternatives(subject, text, settings.DEFAULT_FROM_EMAIL, [to_email], connection=connection)
     if html_content:
         msg.attach_alternative(html_content, "text/html")
+    return msg
+
+
+def send_email(to_email: str, subject: str, html_content: str, text_content: str | None = None, urgent: bool = False,
+               wait: bool = True):
+    # wait=False (web requests): give up at once instead of sleeping when the channel is rate limited
+    if not to_email:
+        return False
+    msg = _build_email(to_email, subject, html_content, text_content)
+    if not throttle('EMAIL', urgent, max_wait=None if wait else 0):
+        return False
     try:
         msg.send()
         return True
@@ -17,6 +32,63 @@ def send_email(to_email: str, subject: str, html_content: str, text_content: str
         return False
 
 
+class EmailSender:
+    """Sends many emails over one email backend connection.
+
+    The connection is opened once and reused for every message; if a send fails the
+    connection is dropped and the message is retried once on a fresh connection.
+    Every message waits for an EMAIL slot from the channel rate limiter.
+    """
+
+    def __init__(self, connection=None, urgent: bool = False):
+        self.connection = connection or get_connection()
+        self.urgent = urgent
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def open(self):
+        try:
+            self.connection.open()
+        except Exception:
+            # send_messages() opens its own connection if this one never came up
+            pass
+
+    def close(self):
+        try:
+            self.connection.close()
+        except Exception:
+            pass
+
+    def send(self, to_email: str, subject: str, html_content: str, text_content: str | None = None) -> bool:
+        if not to_email:
+            return False
+        msg = _build_email(to_email, subject, html_content, text_content, connection=self.connection)
+        throttle('EMAIL', self.urgent)
+        for attempt in range(2):
+            try:
+                return bool(self.connection.send_messages([msg]))
+            except Exception:
+                self.close()
+                if attempt == 0:
+                    self.open()
+        return False
+
+
+def send_emails(items, connection=None, urgent: bool = False) -> list[bool]:
+    """Send ``(to_email, subject, html_content[, text_content])`` tuples over one connection.
+
+    Returns one success flag per item, in order.
+    """
+    with EmailSender(connection, urgent=urgent) as sender:
+        return [sender.send(*item) for item in items]
+
+
 def _normalize_msisdn(number: str) -> str:
     if not number:
         return ''
@@ -25,18 +97,94 @@ def _normalize_msisdn(number: str) -> str:
     return digits
 
 
-def send_sms(to_number: str, body: str):
+def _sms_config():
+    """EbulkSMS credentials and endpoint from settings, or None when credentials are missing."""
+    config = {
+        'username': getattr(settings, 'EBULKSMS_USERNAME', ''),
+        'apikey': getattr(settings, 'EBULKSMS_API_KEY', ''),
+        'sender': getattr(settings, 'EBULKSMS_SENDER', ''),
+        'base_url': getattr(settings, 'EBULKSMS_BASE_URL', 'https://api.ebulksms.com/sendsms.json'),
+        'force_dnd': '1' if getattr(settings, 'EBULKSMS_FORCE_DND', False) else '0',
+        'timeout': getattr(settings, 'EBULKSMS_TIMEOUT', 10),
+    }
+    if not config['username'] or not config['apikey'] or not config['sender']:
+        return None
+    return config
+
+
+_sms_session = None
+
+
+class _SendRetry(Retry):
+    """Retry a throttled/unavailable response only when the provider sends Retry-After.
+
+    Without it, a 429/503 on a send request cannot be told apart from a gateway
+    that already handed the message on, and a retry could bill it twice.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code in (self.status_forcelist or ()) and not has_retry_after:
+            return False
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+def get_sms_session() -> requests.Session:
+    """Process-wide HTTP session for the SMS provider (keep-alive pool + retry/backoff).
+
+    Connection errors are retried (nothing reached the provider). Read errors and
+    502/504 are not, since the provider may already have accepted the message;
+    429/503 are retried only when the response carries Retry-After.
+    """
+    global _sms_session
+    if _sms_session is None:
+        retries = int(getattr(settings, 'EBULKSMS_RETRIES', 3))
+        retry = _SendRetry(
+            total=retries,
+            connect=retries,
+            read=0,
+            status=retries,
+            backoff_factor=0.5,
+            status_forcelist=(429, 503),
+            allowed_methods=frozenset({'POST'}),
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=int(getattr(settings, 'EBULKSMS_POOL_SIZE', 10)), max_retries=retry)
+        session = requests.Session()
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        _sms_session = session
+    return _sms_session
+
+
+def _interpret_sms_response(status_code: int, text: str, data, meta: dict):
+    """Map a provider response onto the ``(success, meta)`` contract used for logging."""
+    if status_code != 200:
+        meta['response_text'] = (text or '')[:500]
+        return False, meta
+    if data is None:
+        # Non-JSON but 200, assume accepted
+        meta['response_text'] = (text or '')[:500]
+        return True, meta
+    meta['response_json'] = data
+    body = data.get('response', data) if isinstance(data, dict) else {}
+    status = str(body.get('status', '') if isinstance(body, dict) else '').lower()
+    if 'success' in status or status == 'ok':
+        return True, meta
+    if status:
+        # Provider answered with an explicit error status (e.g. INSUFFICIENT_CREDIT)
+        return False, meta
+    # Fallback: treat 200 without a status as best-effort
+    return True, meta
+
+
+def send_sms(to_number: str, body: str, urgent: bool = False, wait: bool = True):
     # Return tuple: (success: bool, meta: dict) for logging
+    # wait=False (web requests): fail with 'rate_limited' instead of sleeping for a free slot
     if not to_number or not body:
         return False, {'error': 'missing_params'}
 
-    username = getattr(settings, 'EBULKSMS_USERNAME', '')
-    apikey = getattr(settings, 'EBULKSMS_API_KEY', '')
-    sender = getattr(settings, 'EBULKSMS_SENDER', '')
-    base_url = getattr(settings, 'EBULKSMS_BASE_URL', 'https://api.ebulksms.com/sendsms.json')
-    force_dnd = '1' if getattr(settings, 'EBULKSMS_FORCE_DND', False) else '0'
-
-    if not username or not apikey or not sender:
+    config = _sms_config()
+    if config is None:
         return False, {'error': 'missing_credentials'}
 
     recipient = _normalize_msisdn(to_number)
@@ -44,42 +192,94 @@ def send_sms(to_number: str, body: str):
         return False, {'error': 'invalid_recipient'}
 
     payload = {
-        'username': username,
-        'apikey': apikey,
-        'sender': sender,
+        'username': config['username'],
+        'apikey': config['apikey'],
+        'sender': config['sender'],
         'messagetext': body,
         'recipients': recipient,
         'flash': '0',
-        'force_dnd': force_dnd,
+        'force_dnd': config['force_dnd'],
     }
 
+    if not throttle('SMS', urgent, max_wait=None if wait else 0):
+        return False, {'error': 'rate_limited'}
     try:
-        resp = requests.post(base_url, data=payload, timeout=10)
+        resp = get_sms_session().post(config['base_url'], data=payload, timeout=config['timeout'])
     except Exception as e:
         return False, {'error': 'request_exception', 'detail': str(e)}
 
     meta = {
         'status_code': resp.status_code,
-        'base_url': base_url,
-        'sender': sender,
+        'base_url': config['base_url'],
+        'sender': config['sender'],
         'recipients': recipient,
-        'force_dnd': force_dnd,
+        'force_dnd': config['force_dnd'],
     }
-
-    if resp.status_code != 200:
-        meta['response_text'] = (getattr(resp, 'text', '') or '')[:500]
-        return False, meta
-
-    # Try to interpret JSON response
     try:
         data = resp.json()
-        meta['response_json'] = data
-        status = str(data.get('status', '')).lower()
-        if 'success' in status or status == 'ok':
-            return True, meta
-        # Fallback: treat 200 without explicit success as best-effort
-        return True, meta
     except Exception:
-        # Non-JSON but 200, assume accepted
-        meta['response_text'] = (getattr(resp, 'text', '') or '')[:500]
-        return True, meta
\ No newline at end of file
+        data = None
+    return _interpret_sms_response(resp.status_code, getattr(resp, 'text', ''), data, meta)
+
+
+def send_sms_batch(items, urgent: bool = False):
+    """Send ``(to_number, body)`` pairs, grouping recipients that share a body into one API call.
+
+    Templated messages should be rendered before calling; identical rendered texts end
+    up in the same request (at most ``EBULKSMS_MAX_RECIPIENTS`` numbers per call).
+    Returns one ``(success, meta)`` tuple per item, in order. Each meta carries the
+    recipient, its msgid and the batch it was sent in, for NotificationLog.meta.
+    Each API call takes one SMS slot from the channel rate limiter.
+    """
+    items = list(items)
+    results = [None] * len(items)
+    config = _sms_config()
+
+    groups = {}
+    for index, (to_number, body) in enumerate(items):
+        if not to_number or not body:
+            results[index] = (False, {'error': 'missing_params'})
+            continue
+        if config is None:
+            results[index] = (False, {'error': 'missing_credentials'})
+            continue
+        recipient = _normalize_msisdn(to_number)
+        if not recipient:
+            results[index] = (False, {'error': 'invalid_recipient'})
+            continue
+        groups.setdefault(body, []).append((index, recipient))
+
+    max_recipients = max(1, int(getattr(settings, 'EBULKSMS_MAX_RECIPIENTS', 100)))
+    for body, members in groups.items():
+        for start in range(0, len(members), max_recipients):
+            batch = members[start:start + max_recipients]
+            for index, meta in _send_sms_group(config, body, batch, urgent):
+                results[index] = meta
+    return results
+
+
+def _send_sms_group(config: dict, body: str, members, urgent: bool = False):
+    batch_id = uuid.uuid4().hex[:12]
+    gsm = [{'msidn': recipient, 'msgid': f"{batch_id}-{n}"} for n, (_, recipient) in enumerate(members)]
+    payload = {
+        'SMS': {
+            'auth': {'username': config['username'], 'apikey': config['apikey']},
+            'message': {'sender': config['sender'], 'messagetext': body, 'flash': '0'},
+            'recipients': {'gsm': gsm},
+            'dndsender': int(config['force_dnd']),
+        }
+    }
+    batch_meta = {'batch_id': batch_id, 'batch_size': len(members), 'base_url': config['base_url'], 'sender': config['sender']}
+    throttle('SMS', urgent)
+    try:
+        resp = get_sms_session().post(config['base_url'], json=payload, timeout=config['timeout'])
+    except Exception as e:
+        ok, shared = False, {'error': 'request_exception', 'detail': str(e), **batch_meta}
+    else:
+        try:
+            data = resp.json()
+        except Exception:
+            data = None
+        ok, shared = _interpret_sms_response(resp.status_code, getattr(resp, 'text', ''), data, {'status_code': resp.status_code, **batch_meta})
+    for (index, recipient), entry in zip(members, gsm):
+        yield index, (ok, {**shared, 'recipients': recipient, 'msgid': entry['msgid']})
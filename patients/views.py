@@ -14,6 +14,7 @@ from datetime import datetime, date
 from barcode import Code128
 from barcode.writer import ImageWriter
 from django.db.models import Q
+from audit.pipeline import atomic as audit_atomic
 
 
 @login_required
@@ -64,8 +65,15 @@ def dashboard(request):
         recent_invoices = []
         outstanding_invoices = []
 
-    # Babies linked to this mother
-    babies = BabyProfile.objects.filter(mother=profile).order_by('date_of_birth')
+    # Babies linked to this mother, each with its immunization summary
+    babies = list(BabyProfile.objects.filter(mother=profile).order_by('date_of_birth'))
+    try:
+        from immunization.summary import summaries_for
+        summaries = summaries_for(babies)
+    except Exception:
+        summaries = {}
+    for b in babies:
+        b.summary = summaries.get(b.id)
 
     return render(request, 'patients/dashboard.html', {
         'profile': profile,
@@ -124,6 +132,7 @@ def baby_profile_view(request):
 
 
 @login_required
+@audit_atomic
 def profile_complete(request):
     profile = MotherProfile.objects.get(user=request.user)
     if request.method == 'POST':
@@ -158,6 +167,7 @@ def profile_complete(request):
 
 
 @login_required
+@audit_atomic
 def profile_edit(request):
     profile, _ = MotherProfile.objects.get_or_create(
         user=request.user,
@@ -0,0 +1,83 @@
+import os
+import sys
+import time
+from datetime import date
+
+import django
+
+"""
+Run with: python scripts/benchmark_notification_render.py [iterations]
+Compares per-message render cost of the old per-recipient path (f-strings plus
+render_to_string for every email) with the compiled NotificationRenderer.
+No messages are sent and nothing is written to the database.
+"""
+
+# Ensure project base dir is on sys.path
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BASE_DIR not in sys.path:
+    sys.path.insert(0, BASE_DIR)
+
+# Setup Django
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'medical_main.settings')
+django.setup()
+
+from django.template.loader import render_to_string
+from patients.models import MotherProfile, BabyProfile
+from immunization.models import ImmunizationSchedule
+from notifications.rendering import NotificationRenderer
+
+
+def build_recipients(n):
+    rows = []
+    for i in range(n):
+        mother = MotherProfile(full_name=f"Mother {i}", phone_number=f"0803{i:07d}")
+        baby = BabyProfile(mother=mother, name=f"Baby {i}", date_of_birth=date(2025, 1, 1))
+        sched = ImmunizationSchedule(baby=baby, vaccine_name=f"VAC{i % 6}", scheduled_date=date(2025, 3, 1))
+        rows.append(sched)
+    return rows
+
+
+def legacy(schedules):
+    for sched in schedules:
+        mother = sched.baby.mother
+        subject = f"Missed immunization: {sched.vaccine_name} for {sched.baby.name}"
+        html = render_to_string(
+            'notifications/email_missed_immunization.html',
+            {
+                'mother': mother,
+                'baby': sched.baby,
+                'schedule': sched,
+            },
+        )
+        sms_text = f"Missed: {sched.baby.name} • {sched.vaccine_name} ({sched.scheduled_date:%Y-%m-%d})"
+        yield subject, html, sms_text
+
+
+def compiled(schedules):
+    renderer = NotificationRenderer()
+    for sched in schedules:
+        msg = renderer.render('immunization_missed2', mother=sched.baby.mother, baby=sched.baby, schedule=sched)
+        yield msg.subject, msg.html, msg.sms
+
+
+def measure(label, fn, schedules):
+    start = time.perf_counter()
+    count = sum(1 for _ in fn(schedules))
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {count} messages in {elapsed:.3f}s  ->  {elapsed / count * 1e6:.1f} µs/message")
+    return elapsed
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    schedules = build_recipients(n)
+    # Warm both paths so template loading is not counted for either
+    list(legacy(schedules[:10]))
+    list(compiled(schedules[:10]))
+    before = measure('legacy', legacy, schedules)
+    after = measure('compiled', compiled, schedules)
+    print(f"speed-up: {before / after:.2f}x")
+
+
+if __name__ == '__main__':
+    main()
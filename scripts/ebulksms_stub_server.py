@@ -0,0 +1,84 @@
+"""
+Local stand-in for the EbulkSMS sendsms.json endpoint, for testing SMS delivery offline.
+
+Run with: python scripts/ebulksms_stub_server.py --port 8025
+Then point the app at it:
+    EBULKSMS_BASE_URL=http://127.0.0.1:8025/sendsms.json
+    EBULKSMS_USERNAME=stub EBULKSMS_API_KEY=stub EBULKSMS_SENDER=Medical
+
+Accepts both the single-recipient form POST used by send_sms() and the JSON batch
+payload used by send_sms_batch(). Numbers starting with --fail-prefix are rejected,
+and --delay adds latency per request to simulate a slow provider.
+"""
+import argparse
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    fail_prefix = None
+    delay = 0.0
+    requests_seen = 0
+
+    def do_POST(self):
+        StubHandler.requests_seen += 1
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length).decode('utf-8') if length else ''
+        if self.delay:
+            time.sleep(self.delay)
+
+        if 'application/json' in (self.headers.get('Content-Type') or ''):
+            try:
+                sms = json.loads(raw)['SMS']
+                recipients = [r.get('msidn', '') for r in sms['recipients']['gsm']]
+                text = sms['message']['messagetext']
+            except Exception:
+                return self._reply(400, {'response': {'status': 'INVALID_JSON'}})
+        else:
+            form = parse_qs(raw)
+            recipients = ','.join(form.get('recipients', [''])).split(',')
+            text = form.get('messagetext', [''])[0]
+
+        recipients = [r for r in recipients if r]
+        if not recipients or not text:
+            return self._reply(200, {'response': {'status': 'MISSING_RECIPIENT'}})
+        if self.fail_prefix and any(r.startswith(self.fail_prefix) for r in recipients):
+            return self._reply(200, {'response': {'status': 'INVALID_RECIPIENT'}})
+        return self._reply(200, {'response': {'status': 'SUCCESS', 'totalsent': len(recipients), 'cost': len(recipients)}})
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):
+        print(f"[stub #{StubHandler.requests_seen}] {fmt % args}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EbulkSMS stub server')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8025)
+    parser.add_argument('--fail-prefix', default=None, help='Reject batches containing numbers with this prefix')
+    parser.add_argument('--delay', type=float, default=0.0, help='Seconds of latency added to each request')
+    args = parser.parse_args()
+
+    StubHandler.fail_prefix = args.fail_prefix
+    StubHandler.delay = args.delay
+    server = ThreadingHTTPServer((args.host, args.port), StubHandler)
+    print(f"EbulkSMS stub listening on http://{args.host}:{args.port}/sendsms.json")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == '__main__':
+    main()